@@ -12,34 +12,174 @@ class Settings(BaseSettings):
 
     # --- LLM Settings ---
     # Значения по умолчанию стоят для локальной разработки
+    # Несколько реплик — через запятую: вызов уходит на наименее загруженную
     OLLAMA_HOST: str = "http://localhost:11434/v1"
+    # Потолок одновременных вызовов Ollama — это значение × число реплик,
+    # если JUDGE_CONCURRENCY_LIMITS["ollama"] не задан явно
+    OLLAMA_CONCURRENCY_PER_REPLICA: int = 2
     OLLAMA_MODEL: str = "qwen2.5:7b"
+    # Сколько модель остаётся в памяти Ollama после запроса (вместе с KV-кэшем общего префикса промпта)
+    OLLAMA_KEEP_ALIVE: str = "30m"
+    # num_ctx подбирается под длину промпта степенью двойки в этих пределах и только растёт:
+    # каждое новое значение num_ctx заставляет Ollama перезагрузить модель.
+    # OLLAMA_NUM_CTX_MIN = OLLAMA_NUM_CTX_MAX закрепляет одно окно с первого запроса
+    OLLAMA_NUM_CTX_MIN: int = 4096
+    OLLAMA_NUM_CTX_MAX: int = 32768
+    # Стриминг ответа: запрос обрывается, как только модель выдала оценку, — без ожидания пояснений
+    OLLAMA_STREAMING: bool = False
+    OLLAMA_HEALTH_CHECK_INTERVAL_SECONDS: float = 15.0  # Как часто проверять реплики (GET /api/version)
+    # Hedging: если реплика отвечает дольше своего p95, тот же запрос дублируется на другую,
+    # берётся первый ответ. p95 считается после OLLAMA_HEDGE_MIN_SAMPLES замеров
+    OLLAMA_HEDGING: bool = False
+    OLLAMA_HEDGE_MIN_SAMPLES: int = 20
 
     @field_validator('OLLAMA_HOST')
     @classmethod
     def validate_ollama_host(cls, v: str) -> str:
-        """Проверяет что OLLAMA_HOST является валидным HTTP/HTTPS URL"""
-        v = v.strip()
-        if not v:
+        """Проверяет что OLLAMA_HOST — валидный HTTP/HTTPS URL или несколько URL через запятую"""
+        hosts = [host.strip() for host in v.split(',') if host.strip()]
+        if not hosts:
             raise ValueError('OLLAMA_HOST cannot be empty')
-        if not (v.startswith('http://') or v.startswith('https://')):
-            raise ValueError(
-                f'OLLAMA_HOST must start with http:// or https://, got: {v}'
-            )
-        return v
+        for host in hosts:
+            if not (host.startswith('http://') or host.startswith('https://')):
+                raise ValueError(
+                    f'OLLAMA_HOST must start with http:// or https://, got: {host}'
+                )
+        return ','.join(hosts)
 
     # --- Credentials (Optional) ---
     # Pydantic сам поймет, что если в .env пусто, то будет None
     GIGACHAT_CREDENTIALS: str | None = None
     GIGACHAT_VERIFY_SSL: bool = True  # Добавлено для контроля проверки SSL
+    GIGACHAT_MODEL: str = "GigaChat"  # Модель по умолчанию для GigaChat (как в SDK)
     GEMINI_API_KEY: str | None = None
     GEMINI_MODEL: str = "gemini-1.5-flash"  # Модель по умолчанию для Gemini
     QWEN_API_KEY: str | None = None  # Добавлено для QwenJudge
     QWEN_MODEL: str = "qwen-turbo"  # Модель по умолчанию для Qwen
+    # OpenAI-совместимый эндпоинт DashScope (международный: https://dashscope-intl.aliyuncs.com/compatible-mode/v1)
+    QWEN_BASE_URL: str = "https://dashscope.aliyuncs.com/compatible-mode/v1"
 
     # --- Local Metrics Settings ---
     # Модель для вычисления семантического сходства кода и документации
     CODEBERT_MODEL_NAME: str = "microsoft/codebert-base"
+    # Бэкенд инференса эмбеддера: torch | onnx | onnx-int8
+    # Ожидаемый (пока не измеренный) допуск относительно torch по cosine similarity пары
+    # код/док — EXPECTED_MAX_COSINE_DELTA в embedding_backends.py:
+    #   onnx      — |Δ| <= 1e-4 (тот же fp32-граф)
+    #   onnx-int8 — |Δ| <= 0.02, т.е. не более ±0.2 балла semantic_score по шкале 0-10
+    # Проверяется tests/test_embedding_backends.py при установленном onnxruntime и скачанной модели;
+    # латентность — benchmarks/bench_embedding_backends.py
+    EMBEDDING_BACKEND: str = "torch"
+    EMBEDDING_ONNX_CACHE_DIR: str = "models/onnx"  # Куда один раз экспортируется ONNX-граф
+    EMBEDDING_ONNX_QUANTIZATION: str = "avx2"  # arm64 | avx2 | avx512 | avx512_vnni (для onnx-int8)
+
+    @field_validator('EMBEDDING_BACKEND')
+    @classmethod
+    def validate_embedding_backend(cls, v: str) -> str:
+        """Проверяет что бэкенд эмбеддера поддерживается"""
+        v = v.strip().lower()
+        if v not in ('torch', 'onnx', 'onnx-int8'):
+            raise ValueError(f"EMBEDDING_BACKEND must be one of 'torch', 'onnx', 'onnx-int8', got: {v}")
+        return v
+
+    @field_validator('EMBEDDING_ONNX_QUANTIZATION')
+    @classmethod
+    def validate_embedding_onnx_quantization(cls, v: str) -> str:
+        """Проверяет что конфигурация int8-квантизации известна onnxruntime"""
+        if v not in ('arm64', 'avx2', 'avx512', 'avx512_vnni'):
+            raise ValueError(
+                f"EMBEDDING_ONNX_QUANTIZATION must be one of 'arm64', 'avx2', 'avx512', 'avx512_vnni', got: {v}"
+            )
+        return v
+
+    # Пул воркеров для локальных метрик, чтобы CodeBERT не блокировал event loop
+    LOCAL_METRICS_EXECUTOR: str = "thread"  # thread | process
+    # Количество воркеров; None — 8 потоков (с батчингом большую часть времени ждут батч)
+    # или min(CPU, 2) процессов: каждый процесс держит свою копию CodeBERT
+    # (~0.5 GB весов fp32 у codebert-base плюс рантайм torch)
+    LOCAL_METRICS_POOL_SIZE: int | None = None
+    LOCAL_METRICS_QUEUE_DEPTH: int = 32  # Макс. задач в пуле (выполняются + ждут), сверх — 503
+
+    @field_validator('LOCAL_METRICS_EXECUTOR')
+    @classmethod
+    def validate_local_metrics_executor(cls, v: str) -> str:
+        """Проверяет что тип пула поддерживается"""
+        v = v.strip().lower()
+        if v not in ('thread', 'process'):
+            raise ValueError(f"LOCAL_METRICS_EXECUTOR must be 'thread' or 'process', got: {v}")
+        return v
+
+    @field_validator('LOCAL_METRICS_POOL_SIZE')
+    @classmethod
+    def validate_local_metrics_pool_size(cls, v: int | None) -> int | None:
+        """Проверяет что размер пула положительный (None — по умолчанию для режима пула)"""
+        if v is not None and v < 1:
+            raise ValueError(f'LOCAL_METRICS_POOL_SIZE must be >= 1, got {v}')
+        return v
+
+    # Sliding-window чанкинг длинных текстов (вместо обрезки до max_seq_length энкодера)
+    EMBEDDING_CHUNKING_ENABLED: bool = True
+    EMBEDDING_CHUNK_OVERLAP_TOKENS: int = 64  # Перекрытие соседних окон в токенах
+    EMBEDDING_MAX_WINDOWS: int = 16  # Потолок окон на текст — ограничивает стоимость запроса
+
+    @field_validator('EMBEDDING_CHUNK_OVERLAP_TOKENS')
+    @classmethod
+    def validate_embedding_chunk_overlap(cls, v: int) -> int:
+        """Проверяет что перекрытие окон неотрицательное"""
+        if v < 0:
+            raise ValueError(f'EMBEDDING_CHUNK_OVERLAP_TOKENS must be non-negative, got {v}')
+        return v
+
+    # Micro-batching эмбеддингов: encode-вызовы конкурентных запросов склеиваются в один батч
+    EMBEDDING_BATCH_ENABLED: bool = True
+    EMBEDDING_BATCH_MAX_SIZE: int = 32  # Макс. текстов в одном батче
+    EMBEDDING_BATCH_WAIT_MS: float = 10.0  # Окно ожидания попутчиков для батча
+
+    # Content-addressed кэш эмбеддингов: (модель, sha256 текста) -> вектор
+    EMBEDDING_CACHE_ENABLED: bool = True
+    EMBEDDING_CACHE_MAX_MB: float = 64.0  # Объём in-memory LRU в мегабайтах
+    EMBEDDING_CACHE_DISK_PATH: str | None = None  # Путь к SQLite-файлу; None — только память
+
+    @field_validator('EMBEDDING_CACHE_MAX_MB')
+    @classmethod
+    def validate_embedding_cache_size(cls, v: float) -> float:
+        """Проверяет что размер кэша положительный"""
+        if v <= 0:
+            raise ValueError(f'EMBEDDING_CACHE_MAX_MB must be positive, got {v}')
+        return v
+
+    @field_validator('EMBEDDING_BATCH_WAIT_MS')
+    @classmethod
+    def validate_embedding_batch_wait(cls, v: float) -> float:
+        """Проверяет что окно батчинга неотрицательное и не добавляет заметной задержки"""
+        if v < 0 or v > 1000:
+            raise ValueError(f'EMBEDDING_BATCH_WAIT_MS must be between 0 and 1000, got {v}')
+        return v
+
+    # --- Batch evaluation (/evaluate/batch) ---
+    EVALUATE_BATCH_MAX_ITEMS: int = 100  # Максимум пар в одном запросе
+    EVALUATE_BATCH_CONCURRENCY: int = 4  # Сколько пар батча одновременно опрашивают LLM-судей
+
+    # --- Multi-worker ---
+    APP_WORKERS: int = 1  # Число воркеров uvicorn при запуске через `python -m app.main`
+    # Общий процесс инференса: воркеры не грузят модель сами, а ходят к нему по сокету.
+    # При APP_WORKERS > 1 адрес и ключ генерируются автоматически, если не заданы.
+    EMBEDDING_SERVER_ADDRESS: str | None = None
+    EMBEDDING_SERVER_AUTHKEY: str | None = None
+
+    @field_validator(
+        'LOCAL_METRICS_QUEUE_DEPTH', 'EMBEDDING_BATCH_MAX_SIZE', 'EMBEDDING_MAX_WINDOWS',
+        'APP_WORKERS', 'EVALUATE_BATCH_MAX_ITEMS', 'EVALUATE_BATCH_CONCURRENCY', 'CIRCUIT_BREAKER_FAILURE_THRESHOLD',
+        'VERDICT_CACHE_MAX_ENTRIES', 'JUDGE_MAX_CONCURRENCY',
+        'JUDGE_RATE_LIMIT_BURST', 'OLLAMA_NUM_CTX_MIN', 'OLLAMA_NUM_CTX_MAX',
+        'JUDGE_MAX_OUTPUT_TOKENS', 'OLLAMA_HEDGE_MIN_SAMPLES', 'OLLAMA_CONCURRENCY_PER_REPLICA'
+    )
+    @classmethod
+    def validate_positive_limits(cls, v: int, info) -> int:
+        """Проверяет что размеры пулов, очередей и батчей, лимиты и пороги положительные"""
+        if v < 1:
+            raise ValueError(f'{info.field_name} must be >= 1, got {v}')
+        return v
 
     # --- Weights (Настройка баланса) ---
     WEIGHT_SEMANTIC: float = 0.15
@@ -56,7 +196,7 @@ class Settings(BaseSettings):
         return v
 
     def model_post_init(self, __context) -> None:
-        """Проверяет что сумма всех весов = 1.0"""
+        """Проверяет что сумма всех весов = 1.0 и что у сервера эмбеддингов задан ключ"""
         total = self.WEIGHT_SEMANTIC + self.WEIGHT_COVERAGE + self.WEIGHT_READABILITY + self.WEIGHT_LLM
         if not (0.99 <= total <= 1.01):  # Допускаем небольшую погрешность
             raise ValueError(
@@ -64,11 +204,92 @@ class Settings(BaseSettings):
                 f'(SEMANTIC={self.WEIGHT_SEMANTIC}, COVERAGE={self.WEIGHT_COVERAGE}, '
                 f'READABILITY={self.WEIGHT_READABILITY}, LLM={self.WEIGHT_LLM})'
             )
+        if self.EMBEDDING_SERVER_ADDRESS and not self.EMBEDDING_SERVER_AUTHKEY:
+            raise ValueError('EMBEDDING_SERVER_AUTHKEY is required when EMBEDDING_SERVER_ADDRESS is set')
 
     # --- Advanced Settings ---
     SELF_CONSISTENCY_ROUNDS: int = 1
+    # fixed — все раунды сразу; adaptive — SELF_CONSISTENCY_ROUNDS становится максимумом,
+    # следующий раунд запускается, только если дисперсия оценок судей выше порога
+    SELF_CONSISTENCY_MODE: str = "fixed"
+    SELF_CONSISTENCY_VARIANCE_THRESHOLD: float = 1.0
+    # Раунды одной волны — одним вызовом провайдера (n / candidate_count) у судей, которые это умеют;
+    # выборки берутся при средней температуре раундов, так что разброс температур внутри вызова теряется
+    SELF_CONSISTENCY_MULTI_SAMPLE: bool = False
+    # Общий дедлайн на всех судей: успевшие оценки сохраняются, зависшие вызовы отменяются
+    JUDGE_DEADLINE_SECONDS: float = 60.0
     RATE_LIMIT_PER_MINUTE: int = 30  # Лимит запросов к /evaluate в минуту
 
+    # Кворум: ответ не ждёт отстающих судей, если JUDGE_QUORUM судей уже ответили и их
+    # оценки расходятся не больше чем на JUDGE_QUORUM_MAX_SPREAD балла. 0 — ждать всех
+    JUDGE_QUORUM: int = 0
+    JUDGE_QUORUM_MAX_SPREAD: float = 1.0
+
+    # Circuit breaker судей: после N сбоев подряд провайдер пропускается, через RECOVERY — пробный вызов
+    CIRCUIT_BREAKER_ENABLED: bool = True
+    CIRCUIT_BREAKER_FAILURE_THRESHOLD: int = 3
+    CIRCUIT_BREAKER_RECOVERY_SECONDS: float = 30.0
+
+    # Потолок токенов ответа судьи: ответ — JSON {"score": 7.5}, это около 10 токенов
+    JUDGE_MAX_OUTPUT_TOKENS: int = 20
+
+    # Bulkhead судей: не больше N одновременных вызовов одного провайдера, остальные ждут в очереди.
+    # JUDGE_CONCURRENCY_LIMITS переопределяет потолок для отдельных судей (env — JSON: {"gemini": 4});
+    # для Ollama по умолчанию — OLLAMA_CONCURRENCY_PER_REPLICA на реплику
+    JUDGE_MAX_CONCURRENCY: int = 8
+    JUDGE_CONCURRENCY_LIMITS: dict[str, int] = {}
+    # AIMD: лимит растёт, пока латентность ровная, и уменьшается вдвое на таймаутах и 429/503
+    JUDGE_CONCURRENCY_ADAPTIVE: bool = False
+
+    # Token bucket судей: не больше N вызовов провайдера в минуту (под квоту тарифа), сверх — ждут.
+    # Env — JSON: {"gemini": 15, "qwen": 60}. Судьи без записи не ограничены, но Retry-After
+    # из ответов 429/503 и исчерпанная квота (x-ratelimit-*) соблюдаются всегда
+    JUDGE_RATE_LIMITS: dict[str, float] = {}
+    JUDGE_RATE_LIMIT_BURST: int = 4  # Сколько вызовов можно отправить подряд без ожидания
+
+    @field_validator('JUDGE_CONCURRENCY_LIMITS', 'JUDGE_RATE_LIMITS')
+    @classmethod
+    def validate_judge_limits(cls, v: dict, info) -> dict:
+        """Проверяет что потолки конкурентности и ставки вызовов судей положительные"""
+        for name, limit in v.items():
+            if limit <= 0:
+                raise ValueError(f'{info.field_name}[{name}] must be positive, got {limit}')
+        return v
+
+    # Кэш вердиктов судей (SQLite). None — выключен: при температуре > 0 повторный вызов
+    # судьи даёт новую выборку, кэш фиксирует первую — включается осознанно
+    VERDICT_CACHE_PATH: str | None = None
+    VERDICT_CACHE_TTL_HOURS: float = 24.0 * 7
+    VERDICT_CACHE_MAX_ENTRIES: int = 100_000
+
+    @field_validator(
+        'JUDGE_DEADLINE_SECONDS', 'CIRCUIT_BREAKER_RECOVERY_SECONDS', 'VERDICT_CACHE_TTL_HOURS',
+        'OLLAMA_HEALTH_CHECK_INTERVAL_SECONDS'
+    )
+    @classmethod
+    def validate_judge_timings(cls, v: float, info) -> float:
+        """Проверяет что дедлайн судей, время восстановления breaker, TTL кэша вердиктов и интервал проверки реплик положительные"""
+        if v <= 0:
+            raise ValueError(f'{info.field_name} must be positive, got {v}')
+        return v
+
+    @field_validator('SELF_CONSISTENCY_MODE')
+    @classmethod
+    def validate_consistency_mode(cls, v: str) -> str:
+        """Проверяет что режим self-consistency поддерживается"""
+        v = v.strip().lower()
+        if v not in ('fixed', 'adaptive'):
+            raise ValueError(f"SELF_CONSISTENCY_MODE must be 'fixed' or 'adaptive', got: {v}")
+        return v
+
+    @field_validator('SELF_CONSISTENCY_VARIANCE_THRESHOLD', 'JUDGE_QUORUM', 'JUDGE_QUORUM_MAX_SPREAD')
+    @classmethod
+    def validate_judge_thresholds(cls, v: float, info) -> float:
+        """Проверяет что порог дисперсии, размер кворума и допустимый разброс неотрицательные"""
+        if v < 0:
+            raise ValueError(f'{info.field_name} must be non-negative, got {v}')
+        return v
+
     @field_validator('SELF_CONSISTENCY_ROUNDS')
     @classmethod
     def validate_consistency_rounds(cls, v: int) -> int:
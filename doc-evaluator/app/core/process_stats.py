@@ -0,0 +1,29 @@
+import os
+import sys
+
+BYTES_IN_MB = 1024 * 1024
+
+
+def current_rss_mb() -> float | None:
+    """
+    Текущий RSS процесса в мегабайтах.
+
+    На Linux читается из /proc/self/statm (текущее значение), на других
+    Unix — пиковый RSS из getrusage. Если платформа не даёт ни того, ни другого
+    (Windows) — None.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+        return round(resident_pages * os.sysconf("SC_PAGE_SIZE") / BYTES_IN_MB, 1)
+    except (OSError, ValueError, AttributeError):
+        pass
+
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss: килобайты на Linux, байты на macOS
+    divider = BYTES_IN_MB if sys.platform == "darwin" else 1024
+    return round(peak / divider, 1)
@@ -1,17 +1,26 @@
 import logging
+import os
+import secrets
+import subprocess
+import sys
+import time
 from contextlib import asynccontextmanager
 from functools import lru_cache
-from fastapi import FastAPI, Depends, Request
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, Depends, HTTPException, Request
+from fastapi.responses import JSONResponse, StreamingResponse
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 import uvicorn
 
 from app.core.config import get_settings
-from app.schemas.evaluation import EvaluateRequest, EvaluateResponse
+from app.core.process_stats import current_rss_mb
+from app.schemas.evaluation import EvaluateBatchItemResult, EvaluateBatchRequest, EvaluateRequest, EvaluateResponse
 from app.services.orchestrator import EvaluationOrchestrator
 from app.services.local_metrics import LocalMetricsService
+from app.services.local_metrics_pool import LocalMetricsOverloadedError, LocalMetricsPool
+from app.services.embedding_server import RemoteEmbedder, default_server_address
+from app.services.verdict_cache import get_verdict_cache
 
 logger = logging.getLogger(__name__)
 
@@ -24,23 +33,30 @@ limiter = Limiter(key_func=get_remote_address)
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # 1. Загружаем ML модели в память (CPU/GPU)
-    logger.info("Startup: Warming up ML models...")
-    try:
-        LocalMetricsService.get_instance()
-        logger.info("Startup: ML models loaded successfully")
-    except Exception as e:
-        logger.error("Startup: Failed to load ML models: %s", e)
-        raise
+    if settings.LOCAL_METRICS_EXECUTOR == LocalMetricsPool.MODE_PROCESS:
+        # Модель загружает каждый процесс-воркер пула; копия в родителе не использовалась бы
+        logger.info("Startup: ML models are loaded by local metrics worker processes")
+    else:
+        logger.info("Startup: Warming up ML models...")
+        try:
+            LocalMetricsService.get_instance()
+            logger.info("Startup: ML models loaded successfully (pid=%d, RSS=%s MB)", os.getpid(), current_rss_mb())
+        except Exception as e:
+            logger.error("Startup: Failed to load ML models: %s", e)
+            raise
 
     yield
 
-    # 2. Закрываем ресурсы судей (aiohttp sessions и т.д.)
+    # 2. Закрываем ресурсы судей (aiohttp sessions, клиент GigaChat и т.д.)
     logger.info("Shutdown: Cleaning up resources...")
     try:
         orchestrator = get_orchestrator()
         for _, judge in orchestrator.judges:
             if hasattr(judge, 'close'):
                 await judge.close()
+        orchestrator.local_pool.shutdown()
+        if get_verdict_cache() is not None:
+            get_verdict_cache().close()
         logger.info("Shutdown: All judge resources released")
     except Exception as e:
         logger.warning("Shutdown: Error during cleanup: %s", e)
@@ -63,6 +79,14 @@ async def rate_limit_handler(request: Request, exc: RateLimitExceeded):
     )
 
 
+@app.exception_handler(LocalMetricsOverloadedError)
+async def local_metrics_overloaded_handler(request: Request, exc: LocalMetricsOverloadedError):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Service is overloaded. Please try again later."}
+    )
+
+
 # --- DEPENDENCY INJECTION ---
 @lru_cache
 def get_orchestrator() -> EvaluationOrchestrator:
@@ -76,6 +100,60 @@ async def health_check():
     return {"status": "ok", "service": "Doc Evaluator"}
 
 
+@app.get("/stats/embedding-cache", tags=["System"])
+async def embedding_cache_stats():
+    """Счётчики попаданий/промахов кэша эмбеддингов"""
+    local = get_orchestrator().local
+    if local is None:
+        # Режим process: кэши живут в процессах-воркерах пула, у родителя своего нет
+        return {"enabled": settings.EMBEDDING_CACHE_ENABLED, "executor": LocalMetricsPool.MODE_PROCESS}
+    return local.embedding_cache_stats()
+
+
+@app.get("/stats/memory", tags=["System"])
+def memory_stats():
+    """RSS воркера и общего процесса инференса (в многопроцессном режиме)"""
+    local = get_orchestrator().local
+    if local is None:
+        return {"pid": os.getpid(), "rss_mb": current_rss_mb(), "model_loaded": False,
+                "executor": LocalMetricsPool.MODE_PROCESS}
+    return local.memory_stats()
+
+
+@app.get("/stats/verdict-cache", tags=["System"])
+async def verdict_cache_stats():
+    """Счётчики кэша вердиктов LLM-судей"""
+    cache = get_verdict_cache()
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.stats()}
+
+
+@app.get("/stats/circuit-breakers", tags=["System"])
+async def circuit_breaker_stats(orchestrator: EvaluationOrchestrator = Depends(get_orchestrator)):
+    """Состояние circuit breaker каждого LLM-судьи (closed / open / half_open)"""
+    return {name: judge.breaker.snapshot() for name, judge in orchestrator.judges}
+
+
+@app.get("/stats/bulkheads", tags=["System"])
+async def bulkhead_stats(orchestrator: EvaluationOrchestrator = Depends(get_orchestrator)):
+    """Лимит одновременных вызовов каждого LLM-судьи, занятые слоты и очередь"""
+    return {name: judge.bulkhead.snapshot() for name, judge in orchestrator.judges}
+
+
+@app.get("/stats/rate-limits", tags=["System"])
+async def rate_limit_stats(orchestrator: EvaluationOrchestrator = Depends(get_orchestrator)):
+    """Token bucket каждого LLM-судьи: ставка, остаток токенов и пауза по Retry-After"""
+    return {name: judge.rate_limiter.snapshot() for name, judge in orchestrator.judges}
+
+
+@app.get("/stats/ollama-replicas", tags=["System"])
+async def ollama_replica_stats(orchestrator: EvaluationOrchestrator = Depends(get_orchestrator)):
+    """Реплики Ollama: здоровье, запросы в полёте и p95 латентности"""
+    judge = dict(orchestrator.judges).get("ollama")
+    return judge.replicas.snapshot() if judge is not None else {}
+
+
 @app.post("/evaluate", response_model=EvaluateResponse, tags=["Evaluation"])
 @limiter.limit(f"{settings.RATE_LIMIT_PER_MINUTE}/minute")
 async def evaluate_endpoint(
@@ -90,11 +168,89 @@ async def evaluate_endpoint(
     return await orchestrator.evaluate(body)
 
 
+@app.post("/evaluate/batch", tags=["Evaluation"], response_class=StreamingResponse)
+@limiter.limit(f"{settings.RATE_LIMIT_PER_MINUTE}/minute")
+async def evaluate_batch_endpoint(
+        request: Request,
+        body: EvaluateBatchRequest,
+        orchestrator: EvaluationOrchestrator = Depends(get_orchestrator)
+):
+    """
+    Оценивает набор пар (код, документация) одним запросом.
+    Ответ — NDJSON (application/x-ndjson): по строке EvaluateBatchItemResult
+    на пару в порядке готовности; ошибка пары приходит в её строке.
+    """
+    if len(body.items) > settings.EVALUATE_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch is too large: {len(body.items)} items, max {settings.EVALUATE_BATCH_MAX_ITEMS}"
+        )
+
+    results = orchestrator.evaluate_batch(body.items)
+
+    async def ndjson_lines():
+        async for index, response, error in results:
+            line = EvaluateBatchItemResult(
+                index=index,
+                result=response,
+                error=f"{type(error).__name__}: {error}" if error is not None else None,
+            )
+            yield line.model_dump_json() + "\n"
+
+    return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+
+
+def _wait_for_embedding_server(server: subprocess.Popen, address: str, authkey: bytes, timeout: float = 300.0):
+    """Ждёт, пока общий процесс инференса загрузит модель и начнёт принимать соединения."""
+    client = RemoteEmbedder(address, authkey)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"Embedding server exited with code {server.returncode}")
+        try:
+            client.stats()
+            return
+        except ConnectionError:
+            time.sleep(0.5)
+    raise RuntimeError(f"Embedding server did not start within {timeout:.0f}s")
+
+
+def run_multi_worker():
+    """
+    Запускает общий процесс инференса и N воркеров uvicorn.
+
+    Каждый воркер — отдельный интерпретатор; без общего процесса каждый
+    загрузил бы свою копию CodeBERT.
+    """
+    address = settings.EMBEDDING_SERVER_ADDRESS or default_server_address()
+    authkey = settings.EMBEDDING_SERVER_AUTHKEY or secrets.token_hex(16)
+    # Воркеры и сервер читают настройки из окружения
+    os.environ["EMBEDDING_SERVER_ADDRESS"] = address
+    os.environ["EMBEDDING_SERVER_AUTHKEY"] = authkey
+
+    server = subprocess.Popen([sys.executable, "-m", "app.services.embedding_server"])
+    try:
+        _wait_for_embedding_server(server, address, authkey.encode())
+        logger.info("Embedding server is ready at '%s', starting %d workers", address, settings.APP_WORKERS)
+        uvicorn.run(
+            "app.main:app",
+            host=settings.APP_HOST,
+            port=settings.APP_PORT,
+            workers=settings.APP_WORKERS,
+        )
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+
 # --- ENTRY POINT ---
 if __name__ == "__main__":
-    uvicorn.run(
-        "app.main:app",
-        host=settings.APP_HOST,
-        port=settings.APP_PORT,
-        reload=settings.DEBUG,
-    )
+    if settings.APP_WORKERS > 1:
+        run_multi_worker()
+    else:
+        uvicorn.run(
+            "app.main:app",
+            host=settings.APP_HOST,
+            port=settings.APP_PORT,
+            reload=settings.DEBUG,
+        )
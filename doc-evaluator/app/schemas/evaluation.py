@@ -25,4 +25,18 @@ class EvaluateResponse(BaseModel):
 
     score_variance: float = Field(..., ge=0, description="Дисперсия не может быть отрицательной")
 
-    confidence_score: float = Field(..., ge=0, le=1, description="Уверенность в оценке (0-1)")
\ No newline at end of file
+    confidence_score: float = Field(..., ge=0, le=1, description="Уверенность в оценке (0-1)")
+
+    timed_out_judges: list[str] = Field(default_factory=list, description="Судьи, не уложившиеся в дедлайн")
+    skipped_judges: list[str] = Field(default_factory=list, description="Судьи, пропущенные открытым circuit breaker")
+    self_consistency_rounds: int = Field(1, ge=0, description="Сколько раундов судей было запущено")
+    contributing_judges: list[str] = Field(default_factory=list, description="Судьи, чьи оценки вошли в итог")
+
+class EvaluateBatchRequest(BaseModel):
+    items: list[EvaluateRequest] = Field(..., min_length=1, description="Пары (код, документация) для оценки")
+
+class EvaluateBatchItemResult(BaseModel):
+    # Одна строка NDJSON-ответа /evaluate/batch; строки идут в порядке готовности
+    index: int = Field(..., ge=0, description="Позиция пары в items запроса")
+    result: EvaluateResponse | None = None
+    error: str | None = Field(None, description="Ошибка оценки этой пары (остальные пары не затрагивает)")
@@ -0,0 +1,169 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+
+logger = logging.getLogger(__name__)
+
+# Ответы провайдера, означающие «слишком много запросов» — сигнал снизить конкурентность
+OVERLOAD_STATUSES = frozenset({429, 503})
+
+
+class ProviderError(RuntimeError):
+    """
+    Провайдер ответил ошибкой (5xx, 401/403, 404 и т.п.): вызов не повторяется
+    и считается сбоем для circuit breaker, а не успешным ответом.
+    """
+
+    def __init__(self, provider: str, status: int, detail: str = ""):
+        message = f"{provider} returned HTTP {status}"
+        if detail:
+            message += f": {detail[:200]}"
+        super().__init__(message)
+        self.status = status
+
+
+class ProviderOverloadedError(ProviderError):
+    """Провайдер ответил 429/503: запрос можно повторить позже (через retry_after секунд, если он их назвал)."""
+
+    def __init__(self, provider: str, status: int, retry_after: float | None = None):
+        message = f"{provider} is overloaded (HTTP {status})"
+        if retry_after is not None:
+            message += f", retry after {retry_after:.1f}s"
+        RuntimeError.__init__(self, message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+class Bulkhead:
+    """
+    Ограничение одновременных вызовов одного провайдера LLM-судьи.
+
+    Без адаптации работает как семафор на max_limit слотов. В адаптивном режиме
+    (AIMD) лимит стартует с половины потолка:
+      +1 — после `limit` успешных вызовов подряд с ровной латентностью
+           (не выше LATENCY_TOLERANCE × базовой);
+      ×DECREASE_FACTOR — на таймаут или 429/503, не чаще раза за базовую латентность,
+           чтобы пачка одновременных отказов не обнуляла лимит.
+
+    Работает в одном event loop, поэтому без блокировок.
+    """
+
+    LATENCY_TOLERANCE = 1.5
+    DECREASE_FACTOR = 0.5
+    # Базовая латентность сразу опускается до меньшего замера и медленно догоняет бо́льшие
+    BASELINE_ALPHA = 0.1
+
+    def __init__(self, name: str, max_limit: int, adaptive: bool = False, min_limit: int = 1):
+        self.name = name
+        self.max_limit = max_limit
+        self.min_limit = min(min_limit, max_limit)
+        self.adaptive = adaptive
+        self.limit = max(self.min_limit, max_limit // 2) if adaptive else max_limit
+
+        self._in_flight = 0
+        self._waiters = deque()
+        self._baseline = None  # секунд
+        self._flat_successes = 0
+        self._last_decrease = float("-inf")
+        self._overloads = 0
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @asynccontextmanager
+    async def slot(self):
+        """Занимает слот на время вызова провайдера; при заполненном лимите ждёт в очереди (FIFO)."""
+        await self._acquire()
+        try:
+            yield
+        finally:
+            self._release()
+
+    async def _acquire(self):
+        if self._in_flight < self.limit and not self._waiters:
+            self._in_flight += 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self._release()  # слот выдан, но вызов уже отменён
+            elif waiter in self._waiters:
+                self._waiters.remove(waiter)
+            raise
+
+    def try_acquire(self) -> bool:
+        """
+        Занимает слот без ожидания — для необязательных вызовов (hedge): они не должны
+        ни превышать лимит, ни обгонять очередь. Слот освобождается release().
+        """
+        if self._in_flight < self.limit and not self._waiters:
+            self._in_flight += 1
+            return True
+        return False
+
+    def release(self):
+        """Освобождает слот, занятый try_acquire()."""
+        self._release()
+
+    def _release(self):
+        self._in_flight -= 1
+        self._wake_waiters()
+
+    def _wake_waiters(self):
+        while self._waiters and self._in_flight < self.limit:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self._in_flight += 1
+                waiter.set_result(None)
+
+    def record_success(self, latency: float):
+        """Успешный вызов за latency секунд; в адаптивном режиме может поднять лимит."""
+        if not self.adaptive:
+            return
+        if self._baseline is None or latency < self._baseline:
+            self._baseline = latency
+        else:
+            self._baseline += self.BASELINE_ALPHA * (latency - self._baseline)
+
+        if latency > self._baseline * self.LATENCY_TOLERANCE:
+            self._flat_successes = 0
+            return
+        self._flat_successes += 1
+        if self._flat_successes >= self.limit and self.limit < self.max_limit:
+            self._flat_successes = 0
+            self.limit += 1
+            logger.debug("Bulkhead '%s' limit raised to %d", self.name, self.limit)
+            self._wake_waiters()
+
+    def record_overload(self):
+        """Таймаут или 429/503; в адаптивном режиме снижает лимит."""
+        self._overloads += 1
+        self._flat_successes = 0
+        if not self.adaptive:
+            return
+        now = time.monotonic()
+        if now - self._last_decrease < (self._baseline or 0.0):
+            return  # отказы одной «волны» уже учтены
+        self._last_decrease = now
+        new_limit = max(self.min_limit, int(self.limit * self.DECREASE_FACTOR))
+        if new_limit < self.limit:
+            logger.warning("Bulkhead '%s' limit cut from %d to %d: provider overloaded",
+                           self.name, self.limit, new_limit)
+            self.limit = new_limit
+
+    def snapshot(self) -> dict:
+        """Состояние для /stats/bulkheads."""
+        return {
+            "adaptive": self.adaptive,
+            "limit": self.limit,
+            "max_limit": self.max_limit,
+            "in_flight": self._in_flight,
+            "queued": sum(1 for waiter in self._waiters if not waiter.done()),
+            "overloads": self._overloads,
+        }
@@ -0,0 +1,99 @@
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(RuntimeError):
+    """Вызов судьи пропущен: circuit breaker провайдера открыт."""
+    pass
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker провайдера LLM-судьи.
+
+    closed    — вызовы идут как обычно, считаются подряд идущие сбои
+    open      — после failure_threshold сбоев подряд вызовы пропускаются сразу
+    half_open — через recovery_seconds пропускается один пробный вызов:
+                успех закрывает breaker, сбой снова открывает его
+
+    Сбой — исчерпанные retry, исключение провайдера или дедлайн оркестратора.
+    Работает в одном event loop, поэтому без блокировок.
+    """
+
+    STATE_CLOSED = "closed"
+    STATE_OPEN = "open"
+    STATE_HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int, recovery_seconds: float, enabled: bool = True):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_seconds = recovery_seconds
+        self.enabled = enabled
+
+        self._state = self.STATE_CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probe_started_at = None
+        self._skipped = 0
+
+    @property
+    def state(self) -> str:
+        if self._state == self.STATE_OPEN and time.monotonic() - self._opened_at >= self.recovery_seconds:
+            return self.STATE_HALF_OPEN
+        return self._state
+
+    def allow_request(self) -> bool:
+        """Можно ли сейчас вызвать провайдера. В half_open разрешает один пробный вызов."""
+        if not self.enabled:
+            return True
+
+        state = self.state
+        if state == self.STATE_CLOSED:
+            return True
+
+        now = time.monotonic()
+        # Проба, которая не отчиталась за recovery_seconds (например, отменена), считается потерянной
+        probe_in_flight = self._probe_started_at is not None and now - self._probe_started_at < self.recovery_seconds
+        if state == self.STATE_HALF_OPEN and not probe_in_flight:
+            self._probe_started_at = now
+            logger.info("Circuit breaker '%s' is half-open, sending a probe", self.name)
+            return True
+
+        self._skipped += 1
+        return False
+
+    def record_success(self):
+        if self._state != self.STATE_CLOSED:
+            logger.info("Circuit breaker '%s' closed: provider recovered", self.name)
+        self._state = self.STATE_CLOSED
+        self._consecutive_failures = 0
+        self._probe_started_at = None
+
+    def record_failure(self):
+        self._consecutive_failures += 1
+        was_probe = self._probe_started_at is not None
+        self._probe_started_at = None
+        if was_probe or self._consecutive_failures >= self.failure_threshold:
+            if self._state != self.STATE_OPEN or was_probe:
+                logger.warning(
+                    "Circuit breaker '%s' opened after %d consecutive failures (retry in %.0fs)",
+                    self.name, self._consecutive_failures, self.recovery_seconds
+                )
+            self._state = self.STATE_OPEN
+            self._opened_at = time.monotonic()
+
+    def snapshot(self) -> dict:
+        """Состояние для /stats/circuit-breakers."""
+        state = self.state
+        retry_in = 0.0
+        if state == self.STATE_OPEN:
+            retry_in = max(0.0, self.recovery_seconds - (time.monotonic() - self._opened_at))
+        return {
+            "enabled": self.enabled,
+            "state": state,
+            "consecutive_failures": self._consecutive_failures,
+            "retry_in_seconds": round(retry_in, 1),
+            "skipped_calls": self._skipped,
+        }
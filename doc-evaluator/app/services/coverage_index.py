@@ -0,0 +1,56 @@
+import re
+from bisect import bisect_right
+from collections import Counter
+
+# Идентификаторы кода — ASCII [A-Za-z0-9_], поэтому их вхождение в документацию
+# (в нижнем регистре) целиком лежит внутри одного «слова» из [a-z0-9_]
+DOC_WORD_PATTERN = re.compile(r'[a-z0-9_]+')
+WORD_SEPARATOR = "\n"
+
+
+class DocTokenIndex:
+    """
+    Индекс слов документации, строится одним проходом regex по тексту.
+
+    Семантика совпадает с `keyword.lower() in doc.lower()`: точное слово
+    проверяется по словарю за O(1), частичное вхождение (user -> users) ищется
+    по уникальным словам, склеенным через разделитель, — на длинной
+    сгенерированной документации это в разы меньше исходного текста.
+    """
+
+    def __init__(self, doc: str):
+        self.words = Counter(DOC_WORD_PATTERN.findall(doc.lower()))
+        # Разделитель не может встретиться в идентификаторе, поэтому совпадений через границу слов нет
+        self._joined = WORD_SEPARATOR.join(self.words)
+        self._starts = None  # Смещения слов в _joined, нужны только для детализации
+
+    def contains(self, keyword: str) -> bool:
+        """Встречается ли keyword (в нижнем регистре) в документации как подстрока."""
+        return keyword in self.words or keyword in self._joined
+
+    def occurrences(self, keyword: str) -> int:
+        """Сколько слов документации содержат keyword (точное слово или его часть)."""
+        position = self._joined.find(keyword)
+        if position < 0:
+            return 0
+        if self._starts is None:
+            self._counts = list(self.words.values())
+            self._starts = []
+            offset = 0
+            for word in self.words:
+                self._starts.append(offset)
+                offset += len(word) + len(WORD_SEPARATOR)
+        # Позиции совпадений в склеенной строке -> номера слов; поиск продолжается со следующего слова
+        total = 0
+        while position >= 0:
+            word_index = bisect_right(self._starts, position) - 1
+            total += self._counts[word_index]
+            if word_index + 1 == len(self._starts):
+                break
+            position = self._joined.find(keyword, self._starts[word_index + 1])
+        return total
+
+
+def keyword_hits(keywords: set[str], index: DocTokenIndex) -> dict[str, int]:
+    """Число попаданий каждого идентификатора в документацию; 0 — не найден."""
+    return {keyword: index.occurrences(keyword.lower()) for keyword in sorted(keywords)}
@@ -0,0 +1,81 @@
+import logging
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+BACKEND_TORCH = "torch"
+BACKEND_ONNX = "onnx"
+BACKEND_ONNX_INT8 = "onnx-int8"
+SUPPORTED_BACKENDS = (BACKEND_TORCH, BACKEND_ONNX, BACKEND_ONNX_INT8)
+
+# Ожидаемое максимальное отклонение cosine similarity пары код/док от torch-пути.
+# Это цель, а не замер: проверяется тестом только там, где есть onnxruntime и модель
+EXPECTED_MAX_COSINE_DELTA = {
+    BACKEND_ONNX: 1e-4,  # тот же fp32-граф
+    BACKEND_ONNX_INT8: 0.02,  # ±0.2 балла semantic_score по шкале 0-10
+}
+
+ONNX_SUBFOLDER = "onnx"
+ONNX_MODEL_FILE = "model.onnx"
+
+
+def quantized_file_name(quantization: str) -> str:
+    """Имя файла, которое sentence-transformers даёт int8-графу (model_qint8_<config>.onnx)."""
+    return f"model_qint8_{quantization}.onnx"
+
+
+def onnx_model_dir(cache_dir: str, model_name: str) -> Path:
+    """Локальная папка с экспортированным ONNX-графом конкретной модели."""
+    return Path(cache_dir) / model_name.replace("/", "__")
+
+
+def load_embedder(
+    model_name: str,
+    backend: str = BACKEND_TORCH,
+    onnx_cache_dir: str = "models/onnx",
+    quantization: str = "avx2",
+):
+    """
+    Загружает эмбеддер с выбранным бэкендом инференса.
+
+    torch     — обычный SentenceTransformer на PyTorch
+    onnx      — тот же граф, экспортированный в ONNX и выполняемый через onnxruntime
+    onnx-int8 — ONNX-граф с динамической int8-квантизацией весов
+
+    Экспорт и квантизация выполняются один раз: результат сохраняется в
+    onnx_cache_dir и при следующих стартах просто загружается с диска.
+    """
+    # sentence_transformers тянет torch и transformers (секунды импорта) — только при загрузке модели
+    from sentence_transformers import SentenceTransformer
+
+    if backend == BACKEND_TORCH:
+        return SentenceTransformer(model_name)
+
+    if backend not in SUPPORTED_BACKENDS:
+        raise ValueError(f"Unsupported embedding backend: {backend}")
+
+    local_dir = onnx_model_dir(onnx_cache_dir, model_name)
+    if not (local_dir / ONNX_SUBFOLDER / ONNX_MODEL_FILE).exists():
+        logger.info("Exporting '%s' to ONNX into '%s' (one-time)", model_name, local_dir)
+        exported = SentenceTransformer(model_name, backend="onnx")
+        exported.save(str(local_dir))
+
+    if backend == BACKEND_ONNX:
+        return SentenceTransformer(str(local_dir), backend="onnx")
+
+    file_name = quantized_file_name(quantization)
+    if not (local_dir / ONNX_SUBFOLDER / file_name).exists():
+        from sentence_transformers import export_dynamic_quantized_onnx_model
+
+        logger.info("Quantizing ONNX graph of '%s' to int8 (%s, one-time)", model_name, quantization)
+        export_dynamic_quantized_onnx_model(
+            SentenceTransformer(str(local_dir), backend="onnx"),
+            quantization,
+            str(local_dir),
+        )
+
+    return SentenceTransformer(
+        str(local_dir),
+        backend="onnx",
+        model_kwargs={"file_name": file_name},
+    )
@@ -0,0 +1,109 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Sequence
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingBatcher:
+    """
+    Micro-batching планировщик для encode() эмбеддера.
+
+    Вызовы encode() из разных потоков складываются в очередь. Фоновый поток
+    собирает их в течение короткого окна (max_wait_ms) или до max_batch_size
+    текстов, делает один батчевый encode и раздаёт векторы обратно ожидающим
+    future. N параллельных запросов = один forward pass вместо N.
+    """
+
+    def __init__(
+        self,
+        encode_fn: Callable[[list[str]], Sequence[Any]],
+        max_batch_size: int = 32,
+        max_wait_ms: float = 10.0,
+    ):
+        self._encode_fn = encode_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+
+        self._queue: queue.Queue = queue.Queue()
+        self._closed = False
+        self._worker = threading.Thread(
+            target=self._run, name="embedding-batcher", daemon=True
+        )
+        self._worker.start()
+
+    def encode(self, texts: list[str]) -> list[Any]:
+        """
+        Блокирующий encode: ставит тексты в очередь и ждёт свой кусок батча.
+
+        Returns:
+            Список эмбеддингов в порядке входных текстов
+        """
+        return self.submit(texts).result()
+
+    def submit(self, texts: list[str]) -> Future:
+        """Ставит тексты в очередь на батчевый encode и возвращает Future со списком векторов."""
+        if self._closed:
+            raise RuntimeError("EmbeddingBatcher is closed")
+        future: Future = Future()
+        self._queue.put((list(texts), future))
+        return future
+
+    def close(self):
+        """Останавливает фоновый поток. Уже поставленные запросы будут обработаны."""
+        if not self._closed:
+            self._closed = True
+            self._queue.put(None)
+            self._worker.join(timeout=5)
+
+    def _collect_batch(self, first) -> tuple[list, bool]:
+        """Собирает батч начиная с first, пока не истечёт окно или не наберётся max_batch_size."""
+        batch = [first]
+        size = len(first[0])
+        deadline = time.monotonic() + self.max_wait
+
+        while size < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+            size += len(item[0])
+
+        return batch, False
+
+    def _run(self):
+        stop = False
+        while not stop:
+            first = self._queue.get()
+            if first is None:
+                break
+
+            batch, stop = self._collect_batch(first)
+            # Запросы, которые уже отменены, не тратят forward pass
+            batch = [(texts, future) for texts, future in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            all_texts = [text for texts, _ in batch for text in texts]
+            try:
+                vectors = self._encode_fn(all_texts)
+            except Exception as e:
+                logger.error("Batched encode of %d texts failed: %s", len(all_texts), e)
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            logger.debug("Encoded batch: %d requests, %d texts", len(batch), len(all_texts))
+            offset = 0
+            for texts, future in batch:
+                future.set_result([vectors[i] for i in range(offset, offset + len(texts))])
+                offset += len(texts)
@@ -0,0 +1,138 @@
+import hashlib
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingCache:
+    """
+    Content-addressed кэш эмбеддингов.
+
+    Ключ — (имя модели, вид текста, sha256 текста); эмбеддинги кода и документации
+    хранятся раздельно (kind = "code" / "doc"). Два уровня:
+        1. In-memory LRU, ограниченный по объёму в MB (а не по числу записей)
+        2. Опциональный SQLite на диске — переживает рестарт сервиса
+
+    Потокобезопасен: вызывается из воркеров пула локальных метрик.
+    """
+
+    BYTES_IN_MB = 1024 * 1024
+
+    def __init__(self, model_name: str, max_memory_mb: float, disk_path: str | None = None):
+        self.model_name = model_name
+        self.max_memory_bytes = int(max_memory_mb * self.BYTES_IN_MB)
+
+        self._memory: OrderedDict[str, np.ndarray] = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._db = None
+        if disk_path:
+            self._db = sqlite3.connect(disk_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "key TEXT PRIMARY KEY, dtype TEXT NOT NULL, vector BLOB NOT NULL)"
+            )
+            self._db.commit()
+            logger.info("Embedding disk cache opened at '%s'", disk_path)
+
+    def _key(self, kind: str, text: str) -> str:
+        text_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        return f"{self.model_name}:{kind}:{text_hash}"
+
+    def get(self, kind: str, text: str) -> np.ndarray | None:
+        """Возвращает эмбеддинг из памяти или с диска, иначе None."""
+        key = self._key(kind, text)
+        with self._lock:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return vector
+
+            vector = self._load_from_disk(key)
+            if vector is not None:
+                self.disk_hits += 1
+                self._put_memory(key, vector)
+                return vector
+
+            self.misses += 1
+            return None
+
+    def put(self, kind: str, text: str, vector: np.ndarray):
+        """Кладёт эмбеддинг в память и (если включён) на диск."""
+        key = self._key(kind, text)
+        vector = np.asarray(vector, dtype=np.float32)
+        with self._lock:
+            self._put_memory(key, vector)
+            self._store_to_disk(key, vector)
+
+    def _put_memory(self, key: str, vector: np.ndarray):
+        if vector.nbytes > self.max_memory_bytes:
+            return
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_bytes -= old.nbytes
+        self._memory[key] = vector
+        self._memory_bytes += vector.nbytes
+
+        while self._memory_bytes > self.max_memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted.nbytes
+
+    def _load_from_disk(self, key: str) -> np.ndarray | None:
+        if self._db is None:
+            return None
+        try:
+            row = self._db.execute(
+                "SELECT dtype, vector FROM embeddings WHERE key = ?", (key,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning("Failed to read embedding from disk cache: %s", e)
+            return None
+        if row is None:
+            return None
+        return np.frombuffer(row[1], dtype=row[0]).copy()
+
+    def _store_to_disk(self, key: str, vector: np.ndarray):
+        if self._db is None:
+            return
+        try:
+            self._db.execute(
+                "INSERT OR REPLACE INTO embeddings (key, dtype, vector) VALUES (?, ?, ?)",
+                (key, vector.dtype.str, vector.tobytes()),
+            )
+            self._db.commit()
+        except sqlite3.Error as e:
+            logger.warning("Failed to write embedding to disk cache: %s", e)
+
+    def stats(self) -> dict:
+        """Счётчики попаданий/промахов и текущий размер кэша."""
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "model": self.model_name,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "memory_mb": round(self._memory_bytes / self.BYTES_IN_MB, 3),
+                "max_memory_mb": round(self.max_memory_bytes / self.BYTES_IN_MB, 3),
+                "disk_enabled": self._db is not None,
+            }
+
+    def close(self):
+        """Закрывает SQLite-соединение."""
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
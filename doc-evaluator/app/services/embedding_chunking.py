@@ -0,0 +1,56 @@
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def split_into_windows(
+    text: str,
+    tokenizer,
+    window_tokens: int,
+    overlap_tokens: int,
+    max_windows: int,
+) -> list[tuple[str, int]]:
+    """
+    Режет длинный текст на перекрывающиеся окна по токенам энкодера.
+
+    Окна вырезаются из исходной строки по offset_mapping токенизатора, поэтому
+    текст окна совпадает с оригиналом (без артефактов decode). Если окон больше
+    max_windows, берутся равномерно распределённые по тексту — стоимость запроса
+    ограничена сверху независимо от длины кода.
+
+    Returns:
+        Список (текст окна, число токенов в окне). Короткий текст — одно окно.
+    """
+    try:
+        encoding = tokenizer(text, add_special_tokens=False, return_offsets_mapping=True)
+    except (NotImplementedError, TypeError) as e:
+        # Медленные (не fast) токенизаторы не отдают offsets — энкодер сам обрежет текст
+        logger.debug("Tokenizer does not support offsets, chunking disabled: %s", e)
+        return [(text, window_tokens)]
+
+    offsets = encoding["offset_mapping"]
+    total = len(offsets)
+    if total <= window_tokens:
+        return [(text, max(total, 1))]
+
+    stride = max(1, window_tokens - overlap_tokens)
+    starts = list(range(0, total - overlap_tokens, stride))
+    if len(starts) > max_windows:
+        step = (len(starts) - 1) / (max_windows - 1) if max_windows > 1 else 0
+        starts = [starts[round(i * step)] for i in range(max_windows)]
+
+    windows = []
+    for start in starts:
+        end = min(start + window_tokens, total)
+        windows.append((text[offsets[start][0]:offsets[end - 1][1]], end - start))
+    return windows
+
+
+def pool_windows(vectors, token_counts: list[int]) -> np.ndarray:
+    """Mean pooling векторов окон, взвешенный по числу токенов в окне."""
+    matrix = np.asarray([np.asarray(v, dtype=np.float32) for v in vectors])
+    if len(matrix) == 1:
+        return matrix[0]
+    weights = np.asarray(token_counts, dtype=np.float32)
+    return (matrix * weights[:, None]).sum(axis=0) / weights.sum()
@@ -0,0 +1,144 @@
+"""
+Общий процесс инференса эмбеддера для многопроцессного режима.
+
+Веса CodeBERT загружаются один раз в этом процессе, а воркеры uvicorn
+обращаются к нему через локальный сокет (multiprocessing.connection).
+Запросы всех воркеров проходят через один EmbeddingBatcher, поэтому
+батчинг работает и поперёк процессов.
+
+Запуск вручную:
+    EMBEDDING_SERVER_ADDRESS=/tmp/doc-evaluator-embed.sock \\
+    EMBEDDING_SERVER_AUTHKEY=<secret> python -m app.services.embedding_server
+Обычно стартует сам через `python -m app.main` при APP_WORKERS > 1.
+"""
+import logging
+import os
+import sys
+import tempfile
+import threading
+from multiprocessing.connection import Client, Listener
+from app.core.config import get_settings
+from app.core.process_stats import current_rss_mb
+
+logger = logging.getLogger(__name__)
+
+
+def default_server_address() -> str:
+    """Адрес сокета по умолчанию: unix-сокет во временной папке или named pipe на Windows."""
+    name = f"doc-evaluator-embed-{os.getpid()}"
+    if sys.platform == "win32":
+        return rf"\\.\pipe\{name}"
+    return os.path.join(tempfile.gettempdir(), f"{name}.sock")
+
+
+class EmbeddingServer:
+    """Обслуживает запросы embed/stats от воркеров; по потоку на соединение."""
+
+    def __init__(self, service, address: str, authkey: bytes):
+        self._service = service
+        self.address = address
+        self._authkey = authkey
+        self._listener = None
+        self._stopped = threading.Event()
+
+    def serve_forever(self):
+        self._listener = Listener(self.address, authkey=self._authkey)
+        logger.info("Embedding server listening on '%s' (pid=%d, RSS=%s MB)",
+                    self.address, os.getpid(), current_rss_mb())
+        try:
+            while not self._stopped.is_set():
+                try:
+                    conn = self._listener.accept()
+                except OSError:
+                    if self._stopped.is_set():
+                        break
+                    logger.warning("Failed to accept embedding client connection", exc_info=True)
+                    continue
+                threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+        finally:
+            self._listener.close()
+
+    def shutdown(self):
+        """Останавливает serve_forever (закрывает слушающий сокет)."""
+        self._stopped.set()
+        if self._listener is not None:
+            self._listener.close()
+
+    def _handle(self, conn):
+        with conn:
+            while True:
+                try:
+                    request = conn.recv()
+                except (EOFError, OSError):
+                    return
+                conn.send(self._dispatch(request))
+
+    def _dispatch(self, request) -> tuple:
+        operation = request[0]
+        try:
+            if operation == "embed":
+                return "ok", self._service.embed_texts(request[1])
+            if operation == "stats":
+                return "ok", {"pid": os.getpid(), "rss_mb": current_rss_mb()}
+            return "error", f"Unknown operation: {operation}"
+        except Exception as e:
+            logger.error("Embedding server failed to handle '%s': %s", operation, e)
+            return "error", str(e)
+
+
+class RemoteEmbedder:
+    """
+    Клиент общего процесса инференса.
+
+    Connection не потокобезопасен, поэтому у каждого потока пула
+    локальных метрик своё соединение.
+    """
+
+    def __init__(self, address: str, authkey: bytes):
+        self.address = address
+        self._authkey = authkey
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or conn.closed:
+            conn = Client(self.address, authkey=self._authkey)
+            self._local.conn = conn
+        return conn
+
+    def _call(self, *request):
+        try:
+            conn = self._connection()
+            conn.send(request)
+            status, payload = conn.recv()
+        except (EOFError, OSError) as e:
+            self._local.conn = None
+            raise ConnectionError(f"Embedding server at '{self.address}' is unavailable: {e}") from e
+        if status != "ok":
+            raise RuntimeError(f"Embedding server error: {payload}")
+        return payload
+
+    def embed_texts(self, texts: list[str]) -> list:
+        return self._call("embed", list(texts))
+
+    def stats(self) -> dict:
+        return self._call("stats")
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    settings = get_settings()
+    if not settings.EMBEDDING_SERVER_ADDRESS:
+        raise SystemExit("EMBEDDING_SERVER_ADDRESS is not set")
+
+    from app.services.local_metrics import LocalMetricsService
+
+    service = LocalMetricsService(use_embedding_server=False)
+    address = settings.EMBEDDING_SERVER_ADDRESS
+    if not address.startswith("\\\\") and os.path.exists(address):
+        os.unlink(address)  # сокет от прошлого запуска
+    EmbeddingServer(service, address, settings.EMBEDDING_SERVER_AUTHKEY.encode()).serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,29 +1,32 @@
 import re
+import json
+import math
 import asyncio
+import contextvars
+import hashlib
 import logging
+import time
 from abc import ABC, abstractmethod
-from gigachat import GigaChat
-import google.generativeai as genai
-import aiohttp
+from contextlib import contextmanager
 from app.core.config import get_settings
-import dashscope
+from app.services.bulkhead import OVERLOAD_STATUSES, Bulkhead, ProviderError, ProviderOverloadedError
+from app.services.circuit_breaker import CircuitBreaker, CircuitOpenError
+from app.services.replica_pool import Replica, ReplicaPool
+from app.services.rate_limiter import TokenBucket, exhausted_quota_delay, retry_after_from_headers
+from app.services.verdict_cache import VerdictCache, get_verdict_cache
 from http import HTTPStatus
 
+# SDK провайдеров (gigachat, google.generativeai, aiohttp) импортируются лениво —
+# при первом вызове настроенного судьи. Старт сервиса, CLI и сбор тестов их не грузят.
+
 logger = logging.getLogger(__name__)
 
-JUDGE_PROMPT = """
+# Рубрика — отдельное system-сообщение, одинаковое для всех запросов, а переменные код и
+# документация идут последними в user-сообщении. Так общий префикс промпта не меняется
+# между запросами, и локальный Ollama/llama.cpp переиспользует для него KV-кэш.
+JUDGE_SYSTEM_PROMPT = """
 Ты — Senior Technical Writer с 10-летним опытом.
-Оцени качество документации к данному коду.
-
-Код:
-```
-{code}
-```
-
-Документация:
-```
-{doc}
-```
+Оцени качество документации к коду из сообщения пользователя.
 
 Критерии оценки:
 1. Полнота — описаны ли все параметры, возвращаемое значение, исключения, побочные эффекты?
@@ -38,8 +41,108 @@ JUDGE_PROMPT = """
 7-8: хорошая документация, мелкие недочёты
 9-10: отличная документация, полная и точная
 
-Верни ТОЛЬКО одно число от 0 до 10 (допускается дробное, например 7.5).
-"""
+Верни ТОЛЬКО JSON вида {"score": 7.5} — оценку от 0 до 10 (допускается дробная), без пояснений.
+""".strip()
+
+JUDGE_USER_PROMPT = """
+Код:
+```
+{code}
+```
+
+Документация:
+```
+{doc}
+```
+""".strip()
+
+# Structured output: Ollama (format) и Gemini (response_schema) генерируют только такой объект.
+# Диапазон в схему не входит (Gemini его не поддерживает) — его проверяет parse_score
+SCORE_SCHEMA = {
+    "type": "object",
+    "properties": {"score": {"type": "number"}},
+    "required": ["score"],
+}
+SCORE_PATTERN = re.compile(r'-?\d+(?:\.\d+)?')
+# Число в потоке завершено, когда за ним пришёл символ, который не может его продолжить
+COMPLETE_SCORE_PATTERN = re.compile(r'-?\d+(?:\.\d+)?(?=[^\d.])')
+MIN_SCORE, MAX_SCORE = 0.0, 10.0
+
+# Версия промпта для ключа кэша вердиктов: правка рубрики или шаблона инвалидирует старые оценки
+JUDGE_PROMPT_VERSION = hashlib.sha256(
+    (JUDGE_SYSTEM_PROMPT + "\0" + JUDGE_USER_PROMPT).encode("utf-8")
+).hexdigest()[:16]
+
+
+# Отрендеренные user-сообщения текущего запроса; задачи судей наследуют контекст оркестратора
+_request_prompts = contextvars.ContextVar("judge_request_prompts", default=None)
+
+
+@contextmanager
+def request_prompt_scope():
+    """
+    Область одного запроса: внутри неё user-сообщение (до мегабайта) собирается
+    один раз на всех судей и раунды и освобождается вместе с запросом.
+    """
+    token = _request_prompts.set({})
+    try:
+        yield
+    finally:
+        _request_prompts.reset(token)
+
+
+def render_user_prompt(code: str, doc: str) -> str:
+    """User-сообщение судьи; вне request_prompt_scope собирается на каждый вызов."""
+    prompts = _request_prompts.get()
+    if prompts is None:
+        return JUDGE_USER_PROMPT.format(code=code, doc=doc)
+    prompt = prompts.get((code, doc))
+    if prompt is None:
+        prompt = prompts[(code, doc)] = JUDGE_USER_PROMPT.format(code=code, doc=doc)
+    return prompt
+
+
+def parse_score(text: str | None) -> float | None:
+    """
+    Оценка судьи из ответа провайдера.
+
+    Ожидается JSON {"score": x}; у провайдеров без structured output и в
+    ответе, обрезанном лимитом токенов, берётся первое число текста.
+    Нечисловая оценка или оценка вне шкалы 0-10 — None, а не подрезанное значение.
+    """
+    if not text:
+        return None
+    value = None
+    try:
+        data = json.loads(text)
+    except ValueError:
+        data = None
+    if isinstance(data, dict):
+        value = data.get("score")
+    elif isinstance(data, (int, float)):
+        value = data
+    if value is None or isinstance(value, bool):
+        match = SCORE_PATTERN.search(text)
+        value = match.group() if match else None
+
+    try:
+        score = float(value)
+    except (TypeError, ValueError):
+        logger.warning("Judge answer has no score: %.100r", text)
+        return None
+    if not math.isfinite(score) or not MIN_SCORE <= score <= MAX_SCORE:
+        logger.warning("Judge score %s is outside the %.0f-%.0f scale", score, MIN_SCORE, MAX_SCORE)
+        return None
+    return score
+
+
+def judge_messages(code: str, doc: str) -> list[dict]:
+    """Сообщения в формате chat API (Ollama, OpenAI-совместимые): рубрика, затем код и документация."""
+    return [
+        {"role": "system", "content": JUDGE_SYSTEM_PROMPT},
+        {"role": "user", "content": render_user_prompt(code, doc)},
+    ]
+
 
 # Максимальное количество попыток при transient-ошибках
 MAX_RETRIES = 2
@@ -47,141 +150,532 @@ RETRY_DELAY_SECONDS = 1.0
 
 
 class BaseJudge(ABC):
+    NAME = "judge"
+    # Сколько оценок провайдер отдаёт за один вызов; 1 — раунды self-consistency идут отдельными вызовами
+    MAX_SAMPLES_PER_CALL = 1
+
+    def __init__(self):
+        settings = get_settings()
+        self.breaker = CircuitBreaker(
+            self.NAME,
+            failure_threshold=settings.CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+            recovery_seconds=settings.CIRCUIT_BREAKER_RECOVERY_SECONDS,
+            enabled=settings.CIRCUIT_BREAKER_ENABLED,
+        )
+        self.bulkhead = Bulkhead(
+            self.NAME,
+            max_limit=self._concurrency_limit(settings),
+            adaptive=settings.JUDGE_CONCURRENCY_ADAPTIVE,
+        )
+        self.rate_limiter = TokenBucket(
+            self.NAME,
+            rate_per_minute=settings.JUDGE_RATE_LIMITS.get(self.NAME),
+            burst=settings.JUDGE_RATE_LIMIT_BURST,
+        )
+        self._verdict_cache = get_verdict_cache()
+        # Задача -> когда её вызов получил слот bulkhead и ушёл к провайдеру
+        self._at_provider = {}
+
+    def _concurrency_limit(self, settings) -> int:
+        """Потолок одновременных вызовов провайдера для bulkhead."""
+        return settings.JUDGE_CONCURRENCY_LIMITS.get(self.NAME, settings.JUDGE_MAX_CONCURRENCY)
+
+    def provider_seconds(self, task: asyncio.Task) -> float | None:
+        """
+        Сколько секунд вызов задачи уже у провайдера; None — вызов в очереди
+        bulkhead или rate limiter (или в backoff) и провайдера не нагружает.
+        """
+        started = self._at_provider.get(task)
+        return time.monotonic() - started if started is not None else None
+
+    @property
+    def model_name(self) -> str:
+        """Модель провайдера — часть ключа кэша вердиктов."""
+        return self.NAME
+
     @abstractmethod
     async def evaluate(self, code: str, doc: str, temperature: float = 0.1) -> float | None:
         pass
 
-    def _extract_score(self, text: str) -> float | None:
-        """Парсит число из ответа LLM"""
-        try:
-            match = re.search(r'\d+(\.\d+)?', text)
-            if match:
-                score = float(match.group())
-                return min(10.0, max(0.0, score))
-        except (ValueError, AttributeError) as e:
-            logger.warning("Failed to extract score from text: %s", e)
-        return None
+    async def evaluate_samples(self, code: str, doc: str, temperature: float, n: int) -> list[float]:
+        """
+        n оценок за один вызов провайдера (n / candidate_count); без оценок — пустой список.
+
+        Переопределяют судьи с MAX_SAMPLES_PER_CALL > 1, остальные делают один обычный вызов.
+        """
+        score = await self.evaluate(code, doc, temperature=temperature)
+        return [score] if score is not None else []
+
+    def _cache_key(self, code: str, doc: str, temperature: float, sample: int | None = None) -> str | None:
+        """Ключ кэша вердиктов; None, если кэш выключен."""
+        if self._verdict_cache is None:
+            return None
+        return VerdictCache.key(self.NAME, self.model_name, temperature, JUDGE_PROMPT_VERSION, code, doc, sample)
+
+    async def _cached_score(self, key: str | None) -> float | None:
+        return await self._verdict_cache.aget(key) if key is not None else None
+
+    async def guarded_evaluate(self, code: str, doc: str, temperature: float = 0.1) -> float | None:
+        """
+        Точка входа оркестратора: кэш вердиктов -> circuit breaker -> evaluate.
+
+        Raises:
+            CircuitOpenError: Провайдер недавно падал, вызов пропущен
+        """
+        key = self._cache_key(code, doc, temperature)
+        cached = await self._cached_score(key)
+        if cached is not None:
+            return cached
+
+        if not self.breaker.allow_request():
+            raise CircuitOpenError(f"Circuit breaker for '{self.NAME}' is open")
+
+        score = await self.evaluate(code, doc, temperature=temperature)
+        if key is not None and score is not None:
+            await self._verdict_cache.aput(key, score)
+        return score
+
+    async def guarded_evaluate_samples(self, code: str, doc: str, temperatures: list[float]) -> list[float]:
+        """
+        Несколько раундов self-consistency одним вызовом: кэш вердиктов -> circuit breaker -> evaluate_samples.
+
+        Раунды, уже оценённые отдельными вызовами при своей температуре, берутся
+        из кэша. Остальные провайдер оценивает одним вызовом при средней
+        температуре этих раундов: разброс температур между ними теряется, и
+        разнообразие выборок обеспечивает только сэмплирование при этой
+        температуре. Выборки кэшируются под ней с номером выборки, а не под
+        температурами раундов — раунд t=0.1 не получит выборку при t=0.3.
+
+        Если провайдер вернул меньше выборок, чем запрошено, недостающие раунды
+        считаются несостоявшимися, как вызов guarded_evaluate без оценки.
+
+        Raises:
+            CircuitOpenError: Провайдер недавно падал, вызов пропущен
+        """
+        scores, missing = [], []
+        for temperature in temperatures:
+            cached = await self._cached_score(self._cache_key(code, doc, temperature))
+            if cached is not None:
+                scores.append(cached)
+            else:
+                missing.append(temperature)
+        if not missing:
+            return scores
+
+        temperature = sum(missing) / len(missing)
+        needed = []  # номера выборок, которых нет в кэше
+        for sample in range(len(missing)):
+            cached = await self._cached_score(self._cache_key(code, doc, temperature, sample=sample))
+            if cached is not None:
+                scores.append(cached)
+            else:
+                needed.append(sample)
+        if not needed:
+            return scores
+
+        if not self.breaker.allow_request():
+            raise CircuitOpenError(f"Circuit breaker for '{self.NAME}' is open")
+
+        samples = (await self.evaluate_samples(code, doc, temperature=temperature, n=len(needed)))[:len(needed)]
+        if len(samples) < len(needed):
+            logger.warning("Judge %s returned %d of %d samples, the rest count as failed rounds",
+                           self.NAME, len(samples), len(needed))
+        if self._verdict_cache is not None:
+            for sample, score in zip(needed, samples):
+                await self._verdict_cache.aput(self._cache_key(code, doc, temperature, sample=sample), score)
+        return scores + samples
+
+    def _observe_quota(self, headers):
+        """Успешный ответ сообщил, что квота исчерпана, — следующие вызовы ждут её сброса."""
+        delay = exhausted_quota_delay(headers)
+        if delay:
+            self.rate_limiter.pause(delay)
 
     async def _retry_evaluate(self, func, retries: int = MAX_RETRIES):
-        """Обёртка с retry и exponential backoff для transient-ошибок"""
+        """
+        Обёртка с retry и exponential backoff для transient-ошибок.
+
+        Перед каждой попыткой берётся токен rate limiter провайдера, затем слот
+        bulkhead — только на время самого запроса, backoff слот не держит.
+        Если провайдер назвал время ожидания (Retry-After), вместо backoff
+        rate limiter ставится на паузу; ожидание дольше дедлайна судей
+        бессмысленно — такой вызов сразу считается неудачным.
+        Прочие ошибки, в том числе ответы провайдера не-200 (ProviderError),
+        не повторяются и записываются в circuit breaker как сбой.
+        """
         last_error = None
         for attempt in range(retries + 1):
             try:
-                return await func()
-            except (asyncio.TimeoutError, ConnectionError, OSError) as e:
+                await self.rate_limiter.acquire()
+                async with self.bulkhead.slot():
+                    task = asyncio.current_task()
+                    started = self._at_provider[task] = time.monotonic()
+                    try:
+                        result = await func()
+                    finally:
+                        self._at_provider.pop(task, None)
+                self.bulkhead.record_success(time.monotonic() - started)
+                self.breaker.record_success()
+                return result
+            except (asyncio.TimeoutError, ProviderOverloadedError, ConnectionError, OSError) as e:
                 last_error = e
-                if attempt < retries:
+                if isinstance(e, (asyncio.TimeoutError, ProviderOverloadedError)):
+                    self.bulkhead.record_overload()
+                retry_after = getattr(e, "retry_after", None)
+                if retry_after is not None:
+                    self.rate_limiter.pause(retry_after)
+                    if retry_after > get_settings().JUDGE_DEADLINE_SECONDS:
+                        logger.error("%s asked to wait %.0fs, longer than the judge deadline", self.NAME, retry_after)
+                        break
+                if attempt < retries and retry_after is not None:
+                    # Ждём не здесь, а в rate_limiter.acquire — вместе с остальными вызовами провайдера
+                    logger.warning(
+                        "Retry %d/%d after error: %s (provider asked to wait %.1fs)",
+                        attempt + 1, retries, e, retry_after
+                    )
+                elif attempt < retries:
                     delay = RETRY_DELAY_SECONDS * (2 ** attempt)
                     logger.warning(
                         "Retry %d/%d after error: %s (waiting %.1fs)",
                         attempt + 1, retries, e, delay
                     )
                     await asyncio.sleep(delay)
+            except Exception:
+                self.breaker.record_failure()
+                raise
         logger.error("All %d retries exhausted. Last error: %s", retries, last_error)
+        self.breaker.record_failure()
         return None
 
 
 class GigaChatJudge(BaseJudge):
+    NAME = "gigachat"
+    MAX_SAMPLES_PER_CALL = 4  # Chat.n
     def __init__(self):
+        super().__init__()
         self._settings = get_settings()
+        self._client = None
+
+    def _get_client(self):
+        """
+        Один клиент GigaChat на процесс, создаётся при первом вызове.
+
+        Клиент держит пул соединений и OAuth-токен: SDK запрашивает новый токен
+        только когда текущий истекает (или получен 401), а не на каждый вызов.
+        """
+        if self._client is None:
+            from gigachat import GigaChat
+            self._client = GigaChat(
+                credentials=self._settings.GIGACHAT_CREDENTIALS,
+                model=self._settings.GIGACHAT_MODEL,
+                verify_ssl_certs=self._settings.GIGACHAT_VERIFY_SSL
+            )
+        return self._client
+
+    async def close(self):
+        """Закрывает клиент GigaChat. Вызывается при shutdown приложения."""
+        if self._client is not None:
+            client, self._client = self._client, None
+            await client.aclose()
+
+    @property
+    def model_name(self) -> str:
+        return self._settings.GIGACHAT_MODEL
 
     async def evaluate(self, code: str, doc: str, temperature: float = 0.1) -> float | None:
+        scores = await self.evaluate_samples(code, doc, temperature=temperature, n=1)
+        return scores[0] if scores else None
+
+    async def evaluate_samples(self, code: str, doc: str, temperature: float, n: int) -> list[float]:
         if not self._settings.GIGACHAT_CREDENTIALS:
-            return None
+            return []
 
         async def _call():
+            from gigachat.exceptions import ResponseError
             from gigachat.models import Chat, Messages, MessagesRole
 
-            async with GigaChat(
-                credentials=self._settings.GIGACHAT_CREDENTIALS,
-                verify_ssl_certs=self._settings.GIGACHAT_VERIFY_SSL
-            ) as giga:
-                payload = Chat(
-                    messages=[
-                        Messages(
-                            role=MessagesRole.USER,
-                            content=JUDGE_PROMPT.format(code=code, doc=doc)
-                        )
-                    ],
-                    temperature=temperature
-                )
-                response = await giga.achat(payload)
-                return self._extract_score(response.choices[0].message.content)
+            payload = Chat(
+                messages=[
+                    Messages(role=MessagesRole.SYSTEM, content=JUDGE_SYSTEM_PROMPT),
+                    Messages(role=MessagesRole.USER, content=render_user_prompt(code, doc)),
+                ],
+                temperature=temperature,
+                max_tokens=self._settings.JUDGE_MAX_OUTPUT_TOKENS,
+                n=n if n > 1 else None,
+            )
+            try:
+                response = await self._get_client().achat(payload)
+            except ResponseError as e:
+                if e.status_code in OVERLOAD_STATUSES:
+                    retry_after = retry_after_from_headers(e.headers)
+                    raise ProviderOverloadedError(self.NAME, e.status_code, retry_after) from e
+                raise
+            return [parse_score(choice.message.content) for choice in response.choices]
 
         try:
-            return await self._retry_evaluate(_call)
+            scores = await self._retry_evaluate(_call)
         except Exception as e:
             logger.error("GigaChat Error: %s", e, exc_info=True)
-            return None
+            return []
+        return [score for score in scores or [] if score is not None]
 
 
 class GeminiJudge(BaseJudge):
+    NAME = "gemini"
+    MAX_SAMPLES_PER_CALL = 8  # GenerationConfig.candidate_count
     def __init__(self):
+        super().__init__()
         self._settings = get_settings()
-        if self._settings.GEMINI_API_KEY:
+        self._genai = None
+        self._model = None
+
+    def _get_genai(self):
+        """Импортирует и конфигурирует SDK Gemini при первом вызове."""
+        if self._genai is None:
+            import google.generativeai as genai
             genai.configure(api_key=self._settings.GEMINI_API_KEY)
+            self._genai = genai
+        return self._genai
+
+    def _get_model(self):
+        """Один GenerativeModel на судью с рубрикой в system_instruction; температура — в каждом запросе."""
+        if self._model is None:
+            self._model = self._get_genai().GenerativeModel(
+                self._settings.GEMINI_MODEL,
+                system_instruction=JUDGE_SYSTEM_PROMPT,
+            )
+        return self._model
+
+    @property
+    def model_name(self) -> str:
+        return self._settings.GEMINI_MODEL
+
+    @staticmethod
+    def _retry_delay(error) -> float | None:
+        """Задержка из google.rpc.RetryInfo, которую Gemini прикладывает к ResourceExhausted."""
+        for detail in getattr(error, "details", None) or ():
+            retry_delay = getattr(detail, "retry_delay", None)
+            if retry_delay is not None:
+                return retry_delay.seconds + retry_delay.nanos / 1e9
+        return None
 
     async def evaluate(self, code: str, doc: str, temperature: float = 0.1) -> float | None:
+        scores = await self.evaluate_samples(code, doc, temperature=temperature, n=1)
+        return scores[0] if scores else None
+
+    async def evaluate_samples(self, code: str, doc: str, temperature: float, n: int) -> list[float]:
         if not self._settings.GEMINI_API_KEY:
-            return None
+            return []
+        genai = self._get_genai()
+        model = self._get_model()
 
         async def _call():
-            model = genai.GenerativeModel(self._settings.GEMINI_MODEL)
-            response = await asyncio.to_thread(
-                model.generate_content,
-                JUDGE_PROMPT.format(code=code, doc=doc),
-                generation_config=genai.types.GenerationConfig(temperature=temperature)
-            )
-            return self._extract_score(response.text)
+            from google.api_core.exceptions import GoogleAPICallError
+
+            # Нативный async-клиент SDK: вызов не занимает поток default executor
+            try:
+                response = await model.generate_content_async(
+                    render_user_prompt(code, doc),
+                    generation_config=genai.types.GenerationConfig(
+                        temperature=temperature,
+                        max_output_tokens=self._settings.JUDGE_MAX_OUTPUT_TOKENS,
+                        response_mime_type="application/json",
+                        response_schema=SCORE_SCHEMA,
+                        candidate_count=n if n > 1 else None,
+                    )
+                )
+            except GoogleAPICallError as e:
+                if e.code in OVERLOAD_STATUSES:  # ResourceExhausted, ServiceUnavailable
+                    raise ProviderOverloadedError(self.NAME, e.code, self._retry_delay(e)) from e
+                raise
+            # response.text доступен только для одного кандидата
+            return [
+                parse_score("".join(part.text for part in candidate.content.parts))
+                for candidate in response.candidates
+            ]
 
         try:
-            return await self._retry_evaluate(_call)
+            scores = await self._retry_evaluate(_call)
         except Exception as e:
             logger.error("Gemini Error: %s", e, exc_info=True)
-            return None
+            return []
+        return [score for score in scores or [] if score is not None]
 
 
 class OllamaJudge(BaseJudge):
+    NAME = "ollama"
     REQUEST_TIMEOUT = 30  # секунд
+    # Грубая оценка длины промпта без токенизатора: в коде и русском тексте ~3 символа на токен
+    CHARS_PER_TOKEN = 3
+    RESPONSE_TOKENS = 256  # Запас контекста под ответ
 
     def __init__(self):
         self._settings = get_settings()
-        timeout = aiohttp.ClientTimeout(total=self.REQUEST_TIMEOUT)
-        self._session = aiohttp.ClientSession(timeout=timeout)
+        self._session = None
+        self._num_ctx_by_model = {}  # Наибольшее выданное num_ctx по модели
+        urls = [host.rstrip('/').replace('/v1', '') for host in self._settings.OLLAMA_HOST.split(',')]
+        # Реплики до super().__init__(): от их числа зависит лимит bulkhead
+        self.replicas = ReplicaPool(
+            urls,
+            health_path="/api/version",
+            health_interval=self._settings.OLLAMA_HEALTH_CHECK_INTERVAL_SECONDS,
+        )
+        super().__init__()
+
+    def _concurrency_limit(self, settings) -> int:
+        """Явный JUDGE_CONCURRENCY_LIMITS["ollama"], иначе OLLAMA_CONCURRENCY_PER_REPLICA на каждую реплику."""
+        if self.NAME in settings.JUDGE_CONCURRENCY_LIMITS:
+            return settings.JUDGE_CONCURRENCY_LIMITS[self.NAME]
+        return settings.OLLAMA_CONCURRENCY_PER_REPLICA * len(self.replicas)
+
+    def _get_session(self):
+        """Создаёт ClientSession при первом вызове — уже внутри работающего event loop."""
+        if self._session is None or self._session.closed:
+            import aiohttp
+            timeout = aiohttp.ClientTimeout(total=self.REQUEST_TIMEOUT)
+            self._session = aiohttp.ClientSession(timeout=timeout)
+        return self._session
 
     async def close(self):
-        """Закрывает ClientSession. Вызывается при shutdown приложения."""
+        """Останавливает проверки реплик и закрывает ClientSession. Вызывается при shutdown приложения."""
+        await self.replicas.close()
         if self._session and not self._session.closed:
             await self._session.close()
 
+    @property
+    def model_name(self) -> str:
+        return self._settings.OLLAMA_MODEL
+
+    def _num_ctx(self, messages: list[dict]) -> int:
+        """
+        Окно контекста под промпт: OLLAMA_NUM_CTX_MIN, удваиваемый до OLLAMA_NUM_CTX_MAX.
+
+        Окно модели только растёт: каждое новое num_ctx заставляет Ollama перезагрузить
+        модель и теряет KV-кэш общего префикса, поэтому после длинного промпта короткие
+        идут с тем же окном, а не переключают его туда и обратно.
+        """
+        needed = sum(len(message["content"]) for message in messages) // self.CHARS_PER_TOKEN + self.RESPONSE_TOKENS
+        num_ctx = self._settings.OLLAMA_NUM_CTX_MIN
+        while num_ctx < needed and num_ctx < self._settings.OLLAMA_NUM_CTX_MAX:
+            num_ctx *= 2
+        num_ctx = min(num_ctx, self._settings.OLLAMA_NUM_CTX_MAX)
+
+        model = self._settings.OLLAMA_MODEL
+        num_ctx = max(num_ctx, self._num_ctx_by_model.get(model, 0))
+        self._num_ctx_by_model[model] = num_ctx
+        return num_ctx
+
+    @staticmethod
+    async def _read_score_stream(response) -> float | None:
+        """
+        Читает NDJSON-поток /api/chat до первой завершённой оценки.
+
+        Как только число в ответе закончилось, соединение закрывается: Ollama
+        прекращает генерацию и освобождает слот модели, не дописывая пояснения.
+        """
+        content = ""
+        async for line in response.content:
+            if not line.strip():
+                continue
+            chunk = json.loads(line)
+            content += chunk.get("message", {}).get("content", "")
+            match = COMPLETE_SCORE_PATTERN.search(content)
+            if match:
+                response.close()
+                return parse_score(match.group())
+            if chunk.get("done"):
+                break
+        return parse_score(content)
+
+    async def _post_chat(self, replica: Replica, payload: dict) -> float | None:
+        """Один запрос /api/chat к реплике."""
+        with replica.track():
+            async with self._get_session().post(f"{replica.url}/api/chat", json=payload) as response:
+                if response.status in OVERLOAD_STATUSES:
+                    retry_after = retry_after_from_headers(response.headers)
+                    raise ProviderOverloadedError(self.NAME, response.status, retry_after)
+                if response.status != HTTPStatus.OK:
+                    # Ошибка эндпоинта — сбой для breaker, а не здоровый ответ для bulkhead
+                    raise ProviderError(self.NAME, response.status, await response.text())
+                if payload["stream"]:
+                    return await self._read_score_stream(response)
+                result = await response.json()
+                content = result.get("message", {}).get("content", "")
+                return parse_score(content)
+
+    async def _post_hedge(self, replica: Replica, payload: dict) -> float | None:
+        """Дубль запроса в слоте bulkhead, занятом через try_acquire()."""
+        try:
+            return await self._post_chat(replica, payload)
+        finally:
+            self.bulkhead.release()
+
+    async def _hedged_post_chat(self, replica: Replica, payload: dict, hedge_after: float) -> float | None:
+        """
+        Запрос к реплике, продублированный на вторую, если первая не ответила за hedge_after
+        (её p95). Берётся первый успешный ответ, второй запрос отменяется.
+
+        Дубль занимает свой слот bulkhead — без ожидания: если свободного слота нет,
+        провайдер и так загружен до лимита, и дубль не отправляется.
+        """
+        primary = asyncio.create_task(self._post_chat(replica, payload))
+        tasks = {primary}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=hedge_after)
+            second = None
+            if not done and self.bulkhead.try_acquire():
+                second = self.replicas.pick(exclude=(replica,))
+                if second is None:
+                    self.bulkhead.release()
+            if second is not None:
+                logger.info("Ollama replica '%s' is slower than its p95 (%.1fs), hedging to '%s'",
+                            replica.url, hedge_after, second.url)
+                tasks.add(asyncio.create_task(self._post_hedge(second, payload)))
+            elif not done:
+                logger.debug("Ollama replica '%s' is slower than its p95, no free slot to hedge", replica.url)
+
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+            # Все реплики упали — наружу ошибка основного запроса, её классифицирует retry
+            raise primary.exception()
+        finally:
+            # Проигравший запрос (или оба, если отменили нас самих) обрывается, освобождая реплику
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
     async def evaluate(self, code: str, doc: str, temperature: float = 0.1) -> float | None:
         if not code or not doc:
             logger.warning("Empty code or doc in OllamaJudge.evaluate")
             return None
 
-        base_url = self._settings.OLLAMA_HOST.rstrip('/').replace('/v1', '')
-        url = f"{base_url}/api/chat"
-
+        messages = judge_messages(code, doc)
         payload = {
             "model": self._settings.OLLAMA_MODEL,
-            "messages": [
-                {"role": "user", "content": JUDGE_PROMPT.format(code=code, doc=doc)}
-            ],
-            "stream": False,
+            "messages": messages,
+            "stream": self._settings.OLLAMA_STREAMING,
+            "keep_alive": self._settings.OLLAMA_KEEP_ALIVE,
+            "format": SCORE_SCHEMA,
             "options": {
-                "temperature": temperature
+                "temperature": temperature,
+                "num_ctx": self._num_ctx(messages),
+                "num_predict": self._settings.JUDGE_MAX_OUTPUT_TOKENS,
             }
         }
 
         async def _call():
-            async with self._session.post(url, json=payload) as response:
-                if response.status != 200:
-                    error_text = await response.text()
-                    logger.error("Ollama Error %d: %s", response.status, error_text)
-                    return None
-                result = await response.json()
-                content = result.get("message", {}).get("content", "")
-                return self._extract_score(content)
+            self.replicas.maybe_check_health(self._get_session())
+            replica = self.replicas.pick()
+            hedge_after = None
+            if self._settings.OLLAMA_HEDGING and len(self.replicas) > 1:
+                hedge_after = replica.p95(self._settings.OLLAMA_HEDGE_MIN_SAMPLES)
+            if hedge_after is None:
+                return await self._post_chat(replica, payload)
+            return await self._hedged_post_chat(replica, payload, hedge_after)
 
         try:
             return await self._retry_evaluate(_call)
@@ -191,32 +685,73 @@ class OllamaJudge(BaseJudge):
 
 
 class QwenJudge(BaseJudge):
+    """
+    Qwen через OpenAI-совместимый эндпоинт DashScope.
+
+    Ключ передаётся заголовком сессии конкретного судьи — глобальный
+    dashscope.api_key не трогается, а запросы не занимают потоки executor.
+    """
+    NAME = "qwen"
+    MAX_SAMPLES_PER_CALL = 4  # n OpenAI-совместимого API DashScope
+    REQUEST_TIMEOUT = 30  # секунд
+
     def __init__(self):
+        super().__init__()
         self._settings = get_settings()
+        self._session = None
+
+    def _get_session(self):
+        """Создаёт ClientSession с ключом судьи при первом вызове — уже внутри работающего event loop."""
+        if self._session is None or self._session.closed:
+            import aiohttp
+            timeout = aiohttp.ClientTimeout(total=self.REQUEST_TIMEOUT)
+            headers = {"Authorization": f"Bearer {self._settings.QWEN_API_KEY}"}
+            self._session = aiohttp.ClientSession(timeout=timeout, headers=headers)
+        return self._session
+
+    async def close(self):
+        """Закрывает ClientSession. Вызывается при shutdown приложения."""
+        if self._session and not self._session.closed:
+            await self._session.close()
+
+    @property
+    def model_name(self) -> str:
+        return self._settings.QWEN_MODEL
 
     async def evaluate(self, code: str, doc: str, temperature: float = 0.1) -> float | None:
+        scores = await self.evaluate_samples(code, doc, temperature=temperature, n=1)
+        return scores[0] if scores else None
+
+    async def evaluate_samples(self, code: str, doc: str, temperature: float, n: int) -> list[float]:
         if not self._settings.QWEN_API_KEY:
-            return None
-        dashscope.api_key = self._settings.QWEN_API_KEY
+            return []
+
+        url = f"{self._settings.QWEN_BASE_URL.rstrip('/')}/chat/completions"
+        payload = {
+            "model": self._settings.QWEN_MODEL,
+            "messages": judge_messages(code, doc),
+            "temperature": temperature,
+            "max_tokens": self._settings.JUDGE_MAX_OUTPUT_TOKENS,
+            # JSON mode DashScope; схему OpenAI-совместимый эндпоинт не принимает
+            "response_format": {"type": "json_object"},
+        }
+        if n > 1:
+            payload["n"] = n
 
         async def _call():
-            response = await asyncio.to_thread(
-                dashscope.Generation.call,
-                model=self._settings.QWEN_MODEL,
-                messages=[
-                    {'role': 'user', 'content': JUDGE_PROMPT.format(code=code, doc=doc)}
-                ],
-                result_format='message',
-            )
-            if response.status_code == HTTPStatus.OK:
-                content = response.output.choices[0]['message']['content']
-                return self._extract_score(content)
-            else:
-                logger.error("Qwen Error: %s - %s", response.code, response.message)
-                return None
+            async with self._get_session().post(url, json=payload) as response:
+                if response.status in OVERLOAD_STATUSES:
+                    retry_after = retry_after_from_headers(response.headers)
+                    raise ProviderOverloadedError(self.NAME, response.status, retry_after)
+                if response.status != HTTPStatus.OK:
+                    raise ProviderError(self.NAME, response.status, await response.text())
+                self._observe_quota(response.headers)
+                result = await response.json()
+                return [parse_score(choice["message"]["content"]) for choice in result["choices"]]
 
         try:
-            return await self._retry_evaluate(_call)
+            scores = await self._retry_evaluate(_call)
         except Exception as e:
             logger.error("Qwen Connection Error: %s", e, exc_info=True)
-            return None
+            return []
+        return [score for score in scores or [] if score is not None]
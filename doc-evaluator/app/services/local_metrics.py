@@ -1,9 +1,17 @@
+import os
 import re
 import threading
-import textstat
 import logging
-from sentence_transformers import SentenceTransformer, util
+import numpy as np
 from app.core.config import get_settings
+from app.core.process_stats import current_rss_mb
+from app.services.coverage_index import DocTokenIndex, keyword_hits
+from app.services.embedding_backends import load_embedder
+from app.services.embedding_batcher import EmbeddingBatcher
+from app.services.embedding_cache import EmbeddingCache
+from app.services.embedding_chunking import pool_windows, split_into_windows
+from app.services.embedding_server import RemoteEmbedder
+from app.services.readability import readability_score
 
 logger = logging.getLogger(__name__)
 
@@ -13,7 +21,6 @@ class LocalMetricsService:
     MAX_SCORE = 10.0  # Максимальный балл для всех метрик
     MIN_TOKEN_LENGTH = 3  # Минимальная длина токена для учета в coverage
     DEFAULT_READABILITY_SCORE = 5.0  # Средний балл при ошибке расчета readability
-    READABILITY_SCALE_FACTOR = 10.0  # Коэффициент масштабирования для Flesch Reading Ease (100 -> 10)
 
     # Stopwords для фильтрации токенов при расчете coverage
     # NOTE: currently Kotlin-specific; extend via config if multi-language support is needed
@@ -30,12 +37,44 @@ class LocalMetricsService:
     _instance = None
     _lock = threading.Lock()
 
-    def __init__(self):
+    def __init__(self, use_embedding_server: bool = True, use_batcher: bool = True):
         settings = get_settings()
         model_name = settings.CODEBERT_MODEL_NAME
-        logger.info("Loading CodeBERT model '%s'... (CPU)", model_name)
+        backend = settings.EMBEDDING_BACKEND
+
+        self.embedder = None
+        self._remote = None
+        self._window_tokens = None
+        self._batcher = None
+        if use_embedding_server and settings.EMBEDDING_SERVER_ADDRESS:
+            # Многопроцессный режим: веса загружены один раз в общем процессе инференса
+            logger.info("Using shared embedding server at '%s'", settings.EMBEDDING_SERVER_ADDRESS)
+            self._remote = RemoteEmbedder(
+                settings.EMBEDDING_SERVER_ADDRESS, settings.EMBEDDING_SERVER_AUTHKEY.encode()
+            )
+        else:
+            self._load_model(settings, model_name, backend, use_batcher)
+
+        self._cache = None
+        if settings.EMBEDDING_CACHE_ENABLED:
+            # Векторы разных бэкендов (особенно int8) различаются — бэкенд входит в ключ,
+            # параметры чанкинга меняют вектор длинных текстов — тоже
+            self._cache = EmbeddingCache(
+                f"{model_name}@{backend}{self._chunking_signature(settings)}",
+                max_memory_mb=settings.EMBEDDING_CACHE_MAX_MB,
+                disk_path=settings.EMBEDDING_CACHE_DISK_PATH,
+            )
+
+    def _load_model(self, settings, model_name: str, backend: str, use_batcher: bool = True):
+        """Загружает эмбеддер в текущий процесс и настраивает чанкинг и батчинг."""
+        logger.info("Loading CodeBERT model '%s'... (CPU, backend=%s)", model_name, backend)
         try:
-            self.embedder = SentenceTransformer(model_name)
+            self.embedder = load_embedder(
+                model_name,
+                backend=backend,
+                onnx_cache_dir=settings.EMBEDDING_ONNX_CACHE_DIR,
+                quantization=settings.EMBEDDING_ONNX_QUANTIZATION,
+            )
             logger.info("CodeBERT model '%s' loaded successfully", model_name)
         except OSError as e:
             logger.error("Failed to load model - network or disk issue: %s", e)
@@ -48,6 +87,36 @@ class LocalMetricsService:
                 "Failed to initialize LocalMetricsService due to model loading error"
             ) from e
 
+        # Длинный код режется на перекрывающиеся окна вместо молчаливой обрезки энкодером
+        if settings.EMBEDDING_CHUNKING_ENABLED:
+            # -2: <s> и </s> энкодер добавляет к каждому окну сам
+            self._window_tokens = self.embedder.max_seq_length - 2
+            # Перекрытие не больше половины окна, иначе окна почти дублируют друг друга
+            self._overlap_tokens = min(settings.EMBEDDING_CHUNK_OVERLAP_TOKENS, self._window_tokens // 2)
+            self._max_windows = settings.EMBEDDING_MAX_WINDOWS
+
+        if use_batcher and settings.EMBEDDING_BATCH_ENABLED:
+            self._batcher = EmbeddingBatcher(
+                lambda texts: self.embedder.encode(texts),
+                max_batch_size=settings.EMBEDDING_BATCH_MAX_SIZE,
+                max_wait_ms=settings.EMBEDDING_BATCH_WAIT_MS,
+            )
+
+    def _chunking_signature(self, settings) -> str:
+        """
+        Часть ключа кэша эмбеддингов с параметрами чанкинга.
+
+        Окно известно только при локальной модели; в многопроцессном режиме
+        чанкинг выполняет общий процесс инференса, и окно задаётся его моделью.
+        """
+        if not settings.EMBEDDING_CHUNKING_ENABLED:
+            return "/nochunk"
+        window = self._window_tokens if self._window_tokens is not None else "server"
+        return (
+            f"/chunk:window={window},overlap={settings.EMBEDDING_CHUNK_OVERLAP_TOKENS},"
+            f"max_windows={settings.EMBEDDING_MAX_WINDOWS}"
+        )
+
     @classmethod
     def get_instance(cls):
         """
@@ -59,48 +128,181 @@ class LocalMetricsService:
                     cls._instance = cls()
         return cls._instance
 
+    def _encode(self, texts: list[str]):
+        """Encode через micro-batching планировщик (если включён) или напрямую."""
+        if self._batcher is not None:
+            return self._batcher.encode(texts)
+        return self.embedder.encode(texts)
+
+    def _split_windows(self, text: str) -> list[tuple[str, int]]:
+        """Окна текста для encode; без чанкинга — весь текст одним окном."""
+        if self._window_tokens is None:
+            return [(text, 1)]
+        return split_into_windows(
+            text,
+            self.embedder.tokenizer,
+            window_tokens=self._window_tokens,
+            overlap_tokens=self._overlap_tokens,
+            max_windows=self._max_windows,
+        )
+
+    def embed_texts(self, texts: list[str]) -> list:
+        """
+        Эмбеддинг каждого текста (окна -> encode -> pooling).
+
+        В многопроцессном режиме делегирует общему процессу инференса,
+        который в свою очередь вызывает этот же метод у своего экземпляра.
+        """
+        if self._remote is not None:
+            return self._remote.embed_texts(texts)
+
+        # Все окна всех текстов уходят одним encode: SentenceTransformer сортирует их
+        # по длине и паддит в пределах мини-батча, так что окна похожей длины идут вместе
+        windows = [self._split_windows(text) for text in texts]
+        encoded = self._encode([window for text_windows in windows for window, _ in text_windows])
+        vectors = []
+        offset = 0
+        for text_windows in windows:
+            count = len(text_windows)
+            vectors.append(pool_windows(encoded[offset:offset + count], [tokens for _, tokens in text_windows]))
+            offset += count
+        return vectors
+
+    def _embed_items(self, items: list[tuple[str, str]]) -> list:
+        """
+        Эмбеддинги пар (kind, text); encode выполняется одним вызовом только
+        для промахов кэша, повторяющиеся тексты энкодятся один раз.
+        """
+        vectors = {}
+        if self._cache is not None:
+            for item in dict.fromkeys(items):
+                vector = self._cache.get(*item)
+                if vector is not None:
+                    vectors[item] = vector
+
+        missing = [item for item in dict.fromkeys(items) if item not in vectors]
+        if missing:
+            for item, vector in zip(missing, self.embed_texts([text for _, text in missing])):
+                vectors[item] = vector
+                if self._cache is not None:
+                    self._cache.put(*item, vector)
+
+        return [vectors[item] for item in items]
+
+    def _embed_pair(self, code: str, doc: str):
+        """Эмбеддинги кода и документации; encode выполняется только для промахов кэша."""
+        code_vector, doc_vector = self._embed_items([("code", code), ("doc", doc)])
+        return code_vector, doc_vector
+
+    @staticmethod
+    def _cosine(a, b) -> float:
+        """Cosine similarity двух векторов (numpy, без импорта torch)."""
+        a = np.asarray(a, dtype=np.float32)
+        b = np.asarray(b, dtype=np.float32)
+        norm = float(np.linalg.norm(a) * np.linalg.norm(b))
+        if norm == 0.0:
+            return 0.0
+        return float(np.dot(a, b) / norm)
+
+    def memory_stats(self) -> dict:
+        """RSS текущего процесса и, в многопроцессном режиме, общего процесса инференса."""
+        stats = {"pid": os.getpid(), "rss_mb": current_rss_mb(), "model_loaded": self.embedder is not None}
+        if self._remote is not None:
+            try:
+                stats["embedding_server"] = self._remote.stats()
+            except (ConnectionError, RuntimeError) as e:
+                stats["embedding_server"] = {"error": str(e)}
+        return stats
+
+    def embedding_cache_stats(self) -> dict:
+        """Статистика кэша эмбеддингов (hit/miss, размер)."""
+        if self._cache is None:
+            return {"enabled": False}
+        return {"enabled": True, **self._cache.stats()}
+
     def calculate_semantic_similarity(self, code: str, doc: str) -> float:
         if not code or not doc or not code.strip() or not doc.strip():
             logger.warning("Empty or blank code/doc provided to calculate_semantic_similarity")
             return 0.0
 
         try:
-            embeddings = self.embedder.encode([code, doc], convert_to_tensor=True)
-            score = util.cos_sim(embeddings[0], embeddings[1]).item()
+            code_vector, doc_vector = self._embed_pair(code, doc)
+            score = self._cosine(code_vector, doc_vector)
             return max(0.0, min(1.0, score)) * self.MAX_SCORE
         except Exception as e:
             logger.error("Failed to calculate semantic similarity: %s", e)
             return 0.0
 
+    def calculate_semantic_similarity_batch(self, pairs: list[tuple[str, str]]) -> list[float]:
+        """
+        Semantic similarity для списка пар (код, документация) за один проход энкодера.
+
+        Если общий encode падает, пары пересчитываются по одной, чтобы ошибка
+        одной пары не обнуляла остальные.
+        """
+        valid = [i for i, (code, doc) in enumerate(pairs) if code and doc and code.strip() and doc.strip()]
+        scores = [0.0] * len(pairs)
+        if not valid:
+            return scores
+
+        try:
+            items = []
+            for i in valid:
+                items.extend([("code", pairs[i][0]), ("doc", pairs[i][1])])
+            vectors = self._embed_items(items)
+        except Exception as e:
+            logger.error("Batched semantic similarity failed, falling back to per-pair: %s", e)
+            return [self.calculate_semantic_similarity(code, doc) for code, doc in pairs]
+
+        for position, i in enumerate(valid):
+            score = self._cosine(vectors[2 * position], vectors[2 * position + 1])
+            scores[i] = max(0.0, min(1.0, score)) * self.MAX_SCORE
+        return scores
+
+    def _extract_keywords(self, code: str) -> set[str]:
+        tokens = re.findall(self.IDENTIFIER_PATTERN, code)
+        return {t for t in tokens if len(t) > self.MIN_TOKEN_LENGTH and t not in self.KOTLIN_STOPWORDS}
+
     def calculate_coverage(self, code: str, doc: str) -> float:
         if not code or not doc or not code.strip() or not doc.strip():
             logger.warning("Empty or blank code/doc provided to calculate_coverage")
             return 0.0
 
         try:
-            tokens = re.findall(self.IDENTIFIER_PATTERN, code)
-            keywords = {t for t in tokens if len(t) > self.MIN_TOKEN_LENGTH and t not in self.KOTLIN_STOPWORDS}
+            keywords = self._extract_keywords(code)
 
             if not keywords:
                 return self.MAX_SCORE
 
-            doc_lower = doc.lower()
+            # Документация индексируется один раз, а не сканируется заново для каждого идентификатора
+            index = DocTokenIndex(doc)
             # NOTE: substring match may over-count (e.g. 'user' matches 'users') — acceptable for scoring
-            found = sum(1 for t in keywords if t.lower() in doc_lower)
+            found = sum(1 for t in keywords if index.contains(t.lower()))
             return (found / len(keywords)) * self.MAX_SCORE
         except Exception as e:
             logger.error("Failed to calculate coverage: %s", e)
             return 0.0
 
+    def coverage_details(self, code: str, doc: str) -> dict[str, int]:
+        """
+        Детализация coverage по идентификаторам: сколько слов документации
+        содержат каждый идентификатор кода (0 — идентификатор не упомянут).
+        """
+        if not code or not doc or not code.strip() or not doc.strip():
+            return {}
+        return keyword_hits(self._extract_keywords(code), DocTokenIndex(doc))
+
     def calculate_readability(self, doc: str) -> float:
         if not doc or not doc.strip():
             logger.warning("Empty or blank doc provided to calculate_readability")
             return self.DEFAULT_READABILITY_SCORE
 
         try:
-            # NOTE: Flesch Reading Ease is designed for English; scores for Russian text are approximate
-            score = textstat.flesch_reading_ease(doc)
-            return max(0.0, min(100.0, score)) / self.READABILITY_SCALE_FACTOR
+            # Flesch для английского, формула Оборневой для русского — см. app/services/readability.py
+            score = readability_score(doc)
+            if score is None:
+                return self.DEFAULT_READABILITY_SCORE
+            return score
         except Exception as e:
             logger.warning("Failed to calculate readability score: %s", e)
             return self.DEFAULT_READABILITY_SCORE
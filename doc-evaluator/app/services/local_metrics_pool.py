@@ -0,0 +1,176 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from app.core.config import get_settings
+from app.services.local_metrics import LocalMetricsService
+
+logger = logging.getLogger(__name__)
+
+
+class LocalMetricsOverloadedError(RuntimeError):
+    """Очередь пула локальных метрик заполнена — запрос нужно отклонить (503)."""
+    pass
+
+
+def _init_process_worker():
+    """
+    Инициализатор процесса-воркера: загружает модель один раз на процесс.
+
+    Без micro-batching: в процессе один поток-исполнитель, попутчиков у батча нет,
+    а ожидание окна добавлялось бы к каждому запросу.
+    """
+    LocalMetricsService._instance = LocalMetricsService(use_batcher=False)
+
+
+def compute_local_metrics(code: str, doc: str, service: LocalMetricsService | None = None) -> tuple[float, float, float]:
+    """
+    Считает все локальные метрики (semantic, coverage, readability) за один вызов.
+
+    Функция модульного уровня, чтобы её можно было передать в ProcessPoolExecutor.
+    В процессе-воркере service не передаётся и берётся из синглтона.
+    """
+    if service is None:
+        service = LocalMetricsService.get_instance()
+    return (
+        service.calculate_semantic_similarity(code, doc),
+        service.calculate_coverage(code, doc),
+        service.calculate_readability(doc),
+    )
+
+
+def compute_local_metrics_batch(
+    pairs: list[tuple[str, str]], service: LocalMetricsService | None = None
+) -> list[tuple[float, float, float]]:
+    """
+    Локальные метрики для списка пар; эмбеддинги всех пар считаются одним encode.
+
+    Как и compute_local_metrics, пригодна для ProcessPoolExecutor.
+    """
+    if service is None:
+        service = LocalMetricsService.get_instance()
+    semantic_scores = service.calculate_semantic_similarity_batch(pairs)
+    return [
+        (semantic, service.calculate_coverage(code, doc), service.calculate_readability(doc))
+        for semantic, (code, doc) in zip(semantic_scores, pairs)
+    ]
+
+
+class LocalMetricsPool:
+    """
+    Выделенный пул воркеров для CPU-bound локальных метрик.
+
+    Не даёт forward pass CodeBERT блокировать event loop uvicorn.
+    Режимы:
+        thread  — ThreadPoolExecutor, модель общая (torch отпускает GIL во время forward)
+        process — ProcessPoolExecutor, каждый процесс загружает свою копию модели
+                  (~0.5 GB у codebert-base), поэтому по умолчанию процессов не больше
+                  двух; с EMBEDDING_SERVER_ADDRESS воркеры ходят в общий процесс
+                  инференса. Родитель модель не загружает, service не используется
+
+    Очередь ограничена LOCAL_METRICS_QUEUE_DEPTH (выполняющиеся + ожидающие задачи):
+    при переполнении submit() бросает LocalMetricsOverloadedError вместо бесконечного ожидания.
+    """
+
+    MODE_THREAD = "thread"
+    MODE_PROCESS = "process"
+    DEFAULT_THREAD_POOL_SIZE = 8
+    # Потолок процессов по умолчанию: каждый держит свою копию модели
+    DEFAULT_MAX_PROCESS_POOL_SIZE = 2
+
+    def __init__(self, service: LocalMetricsService | None = None):
+        settings = get_settings()
+        self.mode = settings.LOCAL_METRICS_EXECUTOR
+        self.pool_size = settings.LOCAL_METRICS_POOL_SIZE or self._default_pool_size()
+        self.queue_depth = settings.LOCAL_METRICS_QUEUE_DEPTH
+
+        self._service = service
+        self._slots = threading.BoundedSemaphore(self.queue_depth)
+        self._pending = 0
+        self._pending_lock = threading.Lock()
+        self._executor = self._create_executor()
+        logger.info(
+            "Local metrics pool started: mode=%s, pool_size=%d, queue_depth=%d",
+            self.mode, self.pool_size, self.queue_depth
+        )
+
+    def _default_pool_size(self) -> int:
+        if self.mode == self.MODE_PROCESS:
+            return min(os.cpu_count() or 1, self.DEFAULT_MAX_PROCESS_POOL_SIZE)
+        return self.DEFAULT_THREAD_POOL_SIZE
+
+    def _create_executor(self) -> Executor:
+        if self.mode == self.MODE_PROCESS:
+            # spawn вместо fork: torch и его внутренние потоки не переживают fork корректно
+            return ProcessPoolExecutor(
+                max_workers=self.pool_size,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_process_worker,
+            )
+        return ThreadPoolExecutor(
+            max_workers=self.pool_size,
+            thread_name_prefix="local-metrics",
+        )
+
+    @property
+    def pending(self) -> int:
+        """Количество задач в пуле (выполняющихся и ожидающих)."""
+        return self._pending
+
+    def submit(self, code: str, doc: str) -> asyncio.Future:
+        """
+        Ставит расчёт локальных метрик в пул и сразу возвращает awaitable.
+
+        Вызывается синхронно, поэтому переполнение очереди обнаруживается
+        до запуска LLM-судей.
+
+        Raises:
+            LocalMetricsOverloadedError: Если в пуле уже queue_depth задач
+        """
+        return self._submit(compute_local_metrics, code, doc)
+
+    def submit_batch(self, pairs: list[tuple[str, str]]) -> asyncio.Future:
+        """
+        Ставит в пул расчёт локальных метрик для всего батча одной задачей.
+
+        Батч занимает один слот очереди: эмбеддинги всех пар считаются
+        одним проходом энкодера.
+
+        Raises:
+            LocalMetricsOverloadedError: Если в пуле уже queue_depth задач
+        """
+        return self._submit(compute_local_metrics_batch, pairs)
+
+    def _submit(self, fn, *args) -> asyncio.Future:
+        if not self._slots.acquire(blocking=False):
+            logger.warning("Local metrics queue is full (%d tasks)", self.queue_depth)
+            raise LocalMetricsOverloadedError(
+                f"Local metrics queue is full ({self.queue_depth} tasks)"
+            )
+
+        with self._pending_lock:
+            self._pending += 1
+
+        try:
+            if self.mode == self.MODE_PROCESS:
+                future = self._executor.submit(fn, *args)
+            else:
+                service = self._service or LocalMetricsService.get_instance()
+                future = self._executor.submit(fn, *args, service)
+        except Exception:
+            self._release()
+            raise
+
+        future.add_done_callback(lambda _: self._release())
+        return asyncio.wrap_future(future)
+
+    def _release(self):
+        with self._pending_lock:
+            self._pending -= 1
+        self._slots.release()
+
+    def shutdown(self):
+        """Останавливает пул. Вызывается при shutdown приложения."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -1,9 +1,12 @@
 import asyncio
 import logging
 import statistics
+from typing import AsyncIterator
 from app.schemas.evaluation import EvaluateRequest, EvaluateResponse, LlmScores
 from app.services.local_metrics import LocalMetricsService
-from app.services.llm_judges import GigaChatJudge, GeminiJudge, OllamaJudge, QwenJudge
+from app.services.local_metrics_pool import LocalMetricsPool
+from app.services.circuit_breaker import CircuitOpenError
+from app.services.llm_judges import GigaChatJudge, GeminiJudge, OllamaJudge, QwenJudge, request_prompt_scope
 from app.core.config import get_settings
 
 logger = logging.getLogger(__name__)
@@ -16,11 +19,60 @@ TEMPERATURE_STEP = 0.2  # Шаг увеличения температуры м
 # Количество локальных метрик для fallback расчёта
 LOCAL_METRICS_COUNT = 3  # semantic, coverage, readability
 
+class JudgeVotes:
+    """Оценки судей за один запрос (по всем раундам) и судьи, не давшие оценку."""
+
+    def __init__(self, judge_names: list[str]):
+        # scores_by_judge = {"gigachat": [8, 9, 8], ...}
+        self.scores_by_judge = {name: [] for name in judge_names}
+        self.timed_out = set()  # хотя бы один вызов не успел к дедлайну
+        self.skipped = set()  # вызовы пропущены открытым circuit breaker
+        self.answered = set()  # хотя бы один вызов завершился (успешно или с ошибкой)
+        self.rounds = 0
+
+    def all_scores(self) -> list[float]:
+        return [score for scores in self.scores_by_judge.values() for score in scores]
+
+    def variance(self) -> float:
+        scores = self.all_scores()
+        return statistics.variance(scores) if len(scores) > 1 else 0.0
+
+    def add_result(self, name: str, task: asyncio.Task):
+        """Учитывает завершившийся вызов судьи."""
+        # Открытый circuit breaker — провайдер недавно падал, вызов пропущен без ожидания
+        if isinstance(task.exception(), CircuitOpenError):
+            self.skipped.add(name)
+            return
+        self.answered.add(name)
+        # Упавший судья не мешает остальным — его исключение просто логируем
+        if task.exception() is not None:
+            logger.warning("Error in judge %s: %s", name, task.exception())
+            return
+
+        result = task.result()
+        if isinstance(result, list):  # несколько раундов одним вызовом
+            self.scores_by_judge[name].extend(result)
+        elif result is not None:
+            self.scores_by_judge[name].append(result)
+
+    def contributing_judges(self) -> list[str]:
+        return sorted(name for name, scores in self.scores_by_judge.items() if scores)
+
+    def skipped_judges(self) -> list[str]:
+        # Судья пропущен, только если ни один его вызов не был отправлен (в half-open идёт проба)
+        return sorted(self.skipped - self.answered - self.timed_out)
+
+
 class EvaluationOrchestrator:
     def __init__(self):
         self._settings = get_settings()
-        # Инициализируем локальные метрики (загрузятся при первом вызове, если еще не загружены)
-        self.local = LocalMetricsService.get_instance()
+        # Инициализируем локальные метрики (загрузятся при первом вызове, если еще не загружены).
+        # В режиме process модель загружает каждый процесс-воркер пула — копия в родителе не нужна
+        self.local = None
+        if self._settings.LOCAL_METRICS_EXECUTOR != LocalMetricsPool.MODE_PROCESS:
+            self.local = LocalMetricsService.get_instance()
+        # Пул воркеров для локальных метрик (CPU-bound, не должны блокировать event loop)
+        self.local_pool = LocalMetricsPool(self.local)
         # Инициализируем судей
         self.judges = [
             ("gigachat", GigaChatJudge()),
@@ -33,56 +85,192 @@ class EvaluationOrchestrator:
         code = request.code_snippet
         doc = request.generated_doc
 
-        # 1. Локальные метрики (CPU bound, но быстрые)
-        sem_score = self.local.calculate_semantic_similarity(code, doc)
-        coverage_score = self.local.calculate_coverage(code, doc)
-        readability_score = self.local.calculate_readability(doc)
+        # 1. Локальные метрики (CPU bound) — отправляем в пул, считаются параллельно с LLM
+        local_future = self.local_pool.submit(code, doc)
 
         # 2. LLM метрики (IO bound - запускаем параллельно)
+        votes = await self._collect_judge_scores(code, doc)
+
+        sem_score, coverage_score, readability_score = await local_future
+        return self._build_response(sem_score, coverage_score, readability_score, votes)
+
+    def evaluate_batch(self, requests: list[EvaluateRequest]) -> AsyncIterator[tuple[int, EvaluateResponse | None, Exception | None]]:
+        """
+        Оценивает батч пар и отдаёт результаты по мере готовности (не в порядке запроса).
+
+        Локальные метрики всего батча считаются одной задачей пула (один проход
+        энкодера), LLM-судьи опрашиваются не более чем для
+        EVALUATE_BATCH_CONCURRENCY пар одновременно. Ошибка одной пары
+        возвращается в её элементе и не прерывает батч.
+
+        Метод синхронный: задача в пул ставится сразу, поэтому переполнение
+        очереди (LocalMetricsOverloadedError) всплывает до начала стриминга.
+
+        Yields:
+            (индекс пары в запросе, ответ или None, исключение или None)
+        """
+        local_future = self.local_pool.submit_batch([(r.code_snippet, r.generated_doc) for r in requests])
+        return self._stream_batch(requests, local_future)
+
+    async def _stream_batch(self, requests: list[EvaluateRequest], local_future: asyncio.Future):
+        semaphore = asyncio.Semaphore(self._settings.EVALUATE_BATCH_CONCURRENCY)
+
+        async def evaluate_item(index: int, request: EvaluateRequest):
+            try:
+                async with semaphore:
+                    votes = await self._collect_judge_scores(request.code_snippet, request.generated_doc)
+                # Future батча общий: await из нескольких задач возвращает один и тот же результат
+                sem_score, coverage_score, readability_score = (await local_future)[index]
+                response = self._build_response(sem_score, coverage_score, readability_score, votes)
+                return index, response, None
+            except Exception as e:
+                logger.warning("Batch item %d failed: %s", index, e)
+                return index, None, e
+
+        tasks = [asyncio.create_task(evaluate_item(i, r)) for i, r in enumerate(requests)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            # Клиент отключился посреди стрима — не продолжаем тратить запросы к LLM
+            for task in tasks:
+                task.cancel()
+
+    async def _collect_judge_scores(self, code: str, doc: str) -> JudgeVotes:
+        """
+        Опрашивает судей по раундам self-consistency (раунд = все судьи при одной температуре).
+
+        fixed    — все SELF_CONSISTENCY_ROUNDS раундов запускаются сразу
+        adaptive — раунды идут по одному; следующий запускается, только если
+                   дисперсия оценок выше SELF_CONSISTENCY_VARIANCE_THRESHOLD
+
+        Общий дедлайн JUDGE_DEADLINE_SECONDS на все раунды: оценки, успевшие
+        к дедлайну, сохраняются, отменяются только зависшие вызовы.
+        Повторные пары берутся из кэша вердиктов, судьи с открытым
+        circuit breaker не вызываются.
+        """
         # Self-Consistency: запускаем N раундов с разной температурой
         rounds = self._settings.SELF_CONSISTENCY_ROUNDS
-        all_tasks = []
 
         # Генерируем температуры с шагом TEMPERATURE_STEP
         temperatures = [MIN_TEMPERATURE + (i * TEMPERATURE_STEP) for i in range(rounds)]
 
-        for temp in temperatures:
-            for name, judge in self.judges:
-                all_tasks.append((name, judge.evaluate(code, doc, temperature=temp)))
+        adaptive = self._settings.SELF_CONSISTENCY_MODE == "adaptive"
+        waves = [[temp] for temp in temperatures] if adaptive else [temperatures]
 
-        # Запускаем все задачи
-        # all_tasks - это список кортежей (name, coroutine), нам нужно запустить корутины
-        judge_names_flat = [t[0] for t in all_tasks]
-        coroutines = [t[1] for t in all_tasks]
+        votes = JudgeVotes([name for name, _ in self.judges])
+        loop = asyncio.get_running_loop()
+        deadline_at = loop.time() + self._settings.JUDGE_DEADLINE_SECONDS
+        # Промпт собирается один раз на все раунды и судей запроса и не переживает запрос
+        with request_prompt_scope():
+            for wave in waves:
+                await self._run_wave(code, doc, wave, deadline_at - loop.time(), votes)
+                if votes.timed_out:
+                    break  # дедлайн исчерпан — новые раунды не успеют
+                if adaptive and votes.variance() <= self._settings.SELF_CONSISTENCY_VARIANCE_THRESHOLD:
+                    break  # судьи согласны — дополнительные раунды не изменят итог
 
-        # return_exceptions=True гарантирует, что если одна корутина упадет, остальные доработают
-        try:
-            results_flat = await asyncio.wait_for(
-                asyncio.gather(*coroutines, return_exceptions=True),
-                timeout=60.0,
-            )
-        except asyncio.TimeoutError:
-            logger.error("LLM evaluation timed out after 60 seconds")
-            results_flat = [TimeoutError("LLM evaluation timed out")] * len(coroutines)
+        if adaptive:
+            logger.debug("Adaptive self-consistency: %d/%d rounds, variance=%.2f",
+                         votes.rounds, rounds, votes.variance())
+        return votes
 
-        # Собираем результаты по судьям
-        # scores_by_judge = {"gigachat": [8, 9, 8], ...}
-        scores_by_judge = {name: [] for name, _ in self.judges}
-        
-        for name, result in zip(judge_names_flat, results_flat):
-            # Если вернулось исключение (return_exceptions=True) или None, пропускаем
-            if isinstance(result, Exception):
-                logger.warning("Error in judge %s: %s", name, result)
+    async def _run_wave(self, code: str, doc: str, temperatures: list[float], timeout: float, votes: JudgeVotes):
+        """
+        Запускает раунды при заданных температурах параллельно и добавляет результаты в votes.
+
+        Результаты собираются по мере готовности: при включённом кворуме
+        (JUDGE_QUORUM) волна завершается, как только достаточно судей
+        согласны, а оставшиеся вызовы отменяются.
+        """
+        # task -> имя судьи
+        # guarded_evaluate: кэш вердиктов -> circuit breaker -> вызов провайдера
+        tasks = {}
+        multi_sample = self._settings.SELF_CONSISTENCY_MULTI_SAMPLE and len(temperatures) > 1
+        for name, judge in self.judges:
+            step = judge.MAX_SAMPLES_PER_CALL if multi_sample else 1
+            if step > 1:
+                # Несколько раундов одним вызовом: провайдер обрабатывает код и документацию один раз
+                for i in range(0, len(temperatures), step):
+                    group = temperatures[i:i + step]
+                    tasks[asyncio.create_task(judge.guarded_evaluate_samples(code, doc, group))] = name
                 continue
-                
-            if result is not None:
-                scores_by_judge[name].append(result)
+            for temp in temperatures:
+                tasks[asyncio.create_task(judge.guarded_evaluate(code, doc, temperature=temp))] = name
+        votes.rounds += len(temperatures)
+
+        loop = asyncio.get_running_loop()
+        wave_started = loop.time()
+        wave_deadline = wave_started + max(timeout, 0.0)
+        pending = set(tasks)
+        quorum_reached = False
+        try:
+            while pending:
+                remaining = wave_deadline - loop.time()
+                if remaining <= 0:
+                    break
+                done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    votes.add_result(tasks[task], task)
+                if pending and self._quorum_reached(votes):
+                    quorum_reached = True
+                    break
+        except asyncio.CancelledError:
+            # Запрос отменён (клиент отключился) — не оставляем вызовы судей висеть
+            for task in tasks:
+                task.cancel()
+            raise
+
+        if not pending:
+            return
+
+        for task in pending:
+            task.cancel()
+        stragglers = {tasks[task] for task in pending}
+        if quorum_reached:
+            logger.info("Judge quorum reached (%s), cancelled: %s",
+                        ", ".join(votes.contributing_judges()), ", ".join(sorted(stragglers)))
+        else:
+            logger.error("LLM judges timed out after %.0f seconds: %s",
+                         self._settings.JUDGE_DEADLINE_SECONDS, ", ".join(sorted(stragglers)))
+            # Зависание провайдера — такой же сбой для breaker, как исчерпанные retry,
+            # и признак перегрузки для bulkhead. Но только если вызов большую часть
+            # ожидания провёл у провайдера: застрявшие в нашей очереди bulkhead или
+            # rate limiter (или получившие слот перед самым дедлайном) его не нагружали
+            judges = dict(self.judges)
+            waited = loop.time() - wave_started
+            overloaded = set()
+            for task in pending:
+                at_provider = judges[tasks[task]].provider_seconds(task)
+                if at_provider is not None and at_provider >= waited / 2:
+                    overloaded.add(tasks[task])
+            for name in overloaded:
+                judges[name].breaker.record_failure()
+                judges[name].bulkhead.record_overload()
+            votes.timed_out |= stragglers
+        # Дожидаемся отмены, чтобы соединения судей освободились до ответа
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    def _quorum_reached(self, votes: JudgeVotes) -> bool:
+        """JUDGE_QUORUM судей дали оценки, и их средние расходятся не больше чем на JUDGE_QUORUM_MAX_SPREAD."""
+        quorum = self._settings.JUDGE_QUORUM
+        if quorum <= 0:
+            return False
+        means = [sum(scores) / len(scores) for scores in votes.scores_by_judge.values() if scores]
+        return len(means) >= quorum and max(means) - min(means) <= self._settings.JUDGE_QUORUM_MAX_SPREAD
 
+    def _build_response(
+            self,
+            sem_score: float,
+            coverage_score: float,
+            readability_score: float,
+            votes: JudgeVotes,
+    ) -> EvaluateResponse:
         # Считаем среднее для каждого судьи
         final_llm_scores_map = {}
         all_valid_scores = []
         
-        for name, scores in scores_by_judge.items():
+        for name, scores in votes.scores_by_judge.items():
             if scores:
                 avg = sum(scores) / len(scores)
                 final_llm_scores_map[name] = avg
@@ -129,5 +317,9 @@ class EvaluationOrchestrator:
             ),
             final_score=round(final, 2),
             score_variance=round(variance, 2),
-            confidence_score=round(confidence, 2)
+            confidence_score=round(confidence, 2),
+            timed_out_judges=sorted(votes.timed_out),
+            skipped_judges=votes.skipped_judges(),
+            self_consistency_rounds=votes.rounds,
+            contributing_judges=votes.contributing_judges(),
         )
\ No newline at end of file
@@ -0,0 +1,137 @@
+import asyncio
+import logging
+import re
+import time
+from email.utils import parsedate_to_datetime
+
+logger = logging.getLogger(__name__)
+
+# "6m0s", "1.5s", "20ms" — формат x-ratelimit-reset-* у OpenAI-совместимых API
+DURATION_PART_PATTERN = re.compile(r'(\d+(?:\.\d+)?)(ms|s|m|h)')
+DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+# Значения больше — абсолютное время (unix epoch), а не задержка
+EPOCH_THRESHOLD = 1e9
+
+QUOTA_REMAINING_HEADERS = ("x-ratelimit-remaining-requests", "x-ratelimit-remaining")
+QUOTA_RESET_HEADERS = ("x-ratelimit-reset-requests", "x-ratelimit-reset")
+
+
+def parse_delay(value: str | None) -> float | None:
+    """Задержка в секундах из Retry-After / x-ratelimit-reset: число, длительность "1m30s" или HTTP-дата."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        delay = float(value)
+    except ValueError:
+        parts = DURATION_PART_PATTERN.findall(value)
+        if parts and "".join(number + unit for number, unit in parts) == value:
+            return sum(float(number) * DURATION_UNITS[unit] for number, unit in parts)
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+    if delay > EPOCH_THRESHOLD:
+        delay -= time.time()
+    return max(0.0, delay)
+
+
+def _first_header(headers, names: tuple[str, ...]) -> str | None:
+    for name in names:
+        value = headers.get(name)
+        if value:
+            return value
+    return None
+
+
+def retry_after_from_headers(headers) -> float | None:
+    """Сколько просит подождать провайдер в ответе 429/503: Retry-After, иначе сброс квоты."""
+    if not headers:
+        return None
+    delay = parse_delay(headers.get("Retry-After"))
+    if delay is None:
+        delay = parse_delay(_first_header(headers, QUOTA_RESET_HEADERS))
+    return delay
+
+
+def exhausted_quota_delay(headers) -> float | None:
+    """Для успешного ответа: если квота запросов исчерпана — через сколько она сбросится."""
+    if not headers:
+        return None
+    remaining = _first_header(headers, QUOTA_REMAINING_HEADERS)
+    if remaining is None or remaining.strip() != "0":
+        return None
+    return parse_delay(_first_header(headers, QUOTA_RESET_HEADERS))
+
+
+class TokenBucket:
+    """
+    Token bucket провайдера LLM-судьи: не больше rate_per_minute вызовов в минуту
+    с всплеском до burst. Вызовы сверх квоты ждут своей очереди (FIFO), а не
+    уходят к провайдеру за заведомым 429.
+
+    pause() останавливает выдачу токенов на время, которое провайдер попросил
+    подождать (Retry-After или сброс исчерпанной квоты). Без rate_per_minute
+    ограничения нет, но паузы соблюдаются.
+    """
+
+    def __init__(self, name: str, rate_per_minute: float | None, burst: int = 1):
+        self.name = name
+        self.rate_per_minute = rate_per_minute
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()  # FIFO-очередь ожидающих
+        self._waits = 0
+        self._pauses = 0
+
+    def _refill(self, now: float):
+        if now > self._updated:
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate_per_minute / 60)
+            self._updated = now
+
+    async def acquire(self):
+        """Ждёт, пока провайдер не на паузе и в bucket есть токен, и забирает его."""
+        async with self._lock:
+            waited = False
+            while True:
+                now = time.monotonic()
+                wait = self._paused_until - now
+                if wait <= 0:
+                    if not self.rate_per_minute:
+                        break
+                    self._refill(now)
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        break
+                    wait = (1 - self._tokens) * 60 / self.rate_per_minute
+                waited = True
+                await asyncio.sleep(wait)
+            self._waits += waited
+
+    def pause(self, seconds: float):
+        """Не выдавать токены seconds секунд; после паузы — один вызов, дальше по ставке."""
+        paused_until = time.monotonic() + seconds
+        if paused_until <= self._paused_until:
+            return
+        self._paused_until = paused_until
+        self._pauses += 1
+        # Квота у провайдера исчерпана — после паузы не отправляем сразу весь burst
+        self._tokens = min(self._tokens, 1.0)
+        self._updated = paused_until
+        logger.warning("Rate limiter '%s' paused for %.1fs at provider's request", self.name, seconds)
+
+    def snapshot(self) -> dict:
+        """Состояние для /stats/rate-limits."""
+        now = time.monotonic()
+        if self.rate_per_minute:
+            self._refill(now)
+        return {
+            "rate_per_minute": self.rate_per_minute,
+            "burst": self.burst,
+            "tokens": round(self._tokens, 2) if self.rate_per_minute else None,
+            "paused_for_seconds": round(max(0.0, self._paused_until - now), 1),
+            "waited_calls": self._waits,
+            "pauses": self._pauses,
+        }
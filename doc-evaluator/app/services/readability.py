@@ -0,0 +1,102 @@
+"""
+Читаемость документации: Flesch Reading Ease для английского и русского текста.
+
+Русский — формула Оборневой (адаптация Flesch, 2005), английский — классический
+Flesch. Язык выбирается по большинству слов (кириллица/латиница), поэтому
+латинские идентификаторы в русской документации не переключают формулу.
+readability_score переводит значение на шкалу 0-10 с диапазоном под язык.
+Подробности и источники — RESEARCH.md, «Часть 2: Русский Readability».
+"""
+import re
+from collections import Counter
+from functools import lru_cache
+
+WORD_PATTERN = re.compile(r'[^\W\d_]+')
+# Предложение — хотя бы одна буква и группа знаков конца ('...', '?!' — один конец)
+SENTENCE_PATTERN = re.compile(r'[^\W\d_][^.!?…]*[.!?…]+')
+SENTENCE_END_CHARS = ".!?…"
+CYRILLIC_PATTERN = re.compile(r'[а-яё]')
+
+# В русском слоге ровно одна гласная — слоги считаются по гласным без словарей
+RUSSIAN_VOWEL_PATTERN = re.compile(r'[аеёиоуыэюя]')
+# Для английского — группы гласных с поправкой на немую e (textstat для этого грузит словарь переносов pyphen)
+ENGLISH_VOWEL_GROUP_PATTERN = re.compile(r'[aeiouy]+')
+
+# FRE = BASE - ASL_WEIGHT * ASL - ASW_WEIGHT * ASW
+FLESCH_COEFFICIENTS = {
+    "en": (206.835, 1.015, 84.6),
+    "ru": (206.835, 1.52, 65.14),  # Оборнева
+}
+
+# Значения FRE, которые отображаются в 0 и 10 баллов (между ними — линейно, за пределами — обрезка).
+# Английский — классическая шкала 0-100. У русского слова длиннее, и формула Оборневой
+# для технической документации даёт примерно -50…30: на шкале 0-100 почти любой такой
+# текст получал 0. Диапазон -60…60 подобран так, чтобы обычный абзац документации
+# оказывался в середине шкалы, а короткие простые фразы — выше
+READABILITY_RANGES = {
+    "en": (0.0, 100.0),
+    "ru": (-60.0, 60.0),
+}
+MAX_READABILITY_SCORE = 10.0
+
+
+@lru_cache(maxsize=65536)
+def count_syllables(word: str) -> tuple[int, bool]:
+    """
+    Слоги в слове (в нижнем регистре) и признак кириллического слова.
+
+    Кэш по слову: в длинной документации одни и те же слова повторяются,
+    так что на практике каждое слово разбирается один раз.
+    """
+    if CYRILLIC_PATTERN.search(word):
+        return max(1, len(RUSSIAN_VOWEL_PATTERN.findall(word))), True
+
+    syllables = len(ENGLISH_VOWEL_GROUP_PATTERN.findall(word))
+    if syllables > 1 and word.endswith("e") and not word.endswith(("le", "ee")):
+        syllables -= 1  # немая e: make, code
+    return max(1, syllables), False
+
+
+def flesch_reading_ease(text: str) -> float | None:
+    """
+    Flesch Reading Ease (шкала 0-100, выше — легче) с формулой под язык текста.
+
+    Returns:
+        Неограниченное значение формулы или None, если в тексте нет слов.
+    """
+    result = _flesch_with_language(text)
+    return result[0] if result is not None else None
+
+
+def readability_score(text: str) -> float | None:
+    """Читаемость по шкале 0-10 (диапазон FRE — READABILITY_RANGES языка); None, если слов нет."""
+    result = _flesch_with_language(text)
+    if result is None:
+        return None
+    score, language = result
+    low, high = READABILITY_RANGES[language]
+    return max(0.0, min(1.0, (score - low) / (high - low))) * MAX_READABILITY_SCORE
+
+
+def _flesch_with_language(text: str) -> tuple[float, str] | None:
+    text = text.lower()
+    # Разбор идёт regex-ами на C; в Python-цикле только уникальные слова (их на порядки меньше)
+    word_counts = Counter(WORD_PATTERN.findall(text))
+    words = sum(word_counts.values())
+    if words == 0:
+        return None
+
+    sentences = len(SENTENCE_PATTERN.findall(text))
+    tail = text[max(text.rfind(ch) for ch in SENTENCE_END_CHARS) + 1:]
+    if WORD_PATTERN.search(tail):
+        sentences += 1  # последнее предложение без точки
+
+    syllables = cyrillic_words = 0
+    for word, count in word_counts.items():
+        word_syllables, is_cyrillic = count_syllables(word)
+        syllables += word_syllables * count
+        cyrillic_words += is_cyrillic * count
+
+    language = "ru" if cyrillic_words * 2 >= words else "en"
+    base, asl_weight, asw_weight = FLESCH_COEFFICIENTS[language]
+    return base - asl_weight * (words / sentences) - asw_weight * (syllables / words), language
@@ -0,0 +1,144 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class Replica:
+    """Одна реплика провайдера: вызовы в полёте, здоровье и недавние латентности."""
+
+    # Сколько последних латентностей хранится для p95
+    LATENCY_WINDOW = 200
+
+    def __init__(self, url: str):
+        self.url = url
+        self.in_flight = 0
+        self.healthy = True
+        self._latencies = deque(maxlen=self.LATENCY_WINDOW)
+        self._requests = 0
+        self._failures = 0
+
+    @contextmanager
+    def track(self):
+        """
+        Учитывает вызов в in_flight и его латентность; ошибка соединения или таймаут
+        помечает реплику нездоровой до health check.
+        """
+        self.in_flight += 1
+        self._requests += 1
+        started = time.monotonic()
+        try:
+            yield
+        except OSError:  # ConnectionError и TimeoutError — его подклассы
+            self._failures += 1
+            if self.healthy:
+                logger.warning("Replica '%s' marked unhealthy after a connection error", self.url)
+            self.healthy = False
+            raise
+        except asyncio.CancelledError:
+            # Отменённый запрос (проигравший hedge, дедлайн) шёл не меньше этого — нижняя
+            # оценка латентности. Без неё медленный хвост выпадает из p95, порог hedging
+            # сжимается и дублируется всё больше запросов
+            self._latencies.append(time.monotonic() - started)
+            raise
+        else:
+            self._latencies.append(time.monotonic() - started)
+        finally:
+            self.in_flight -= 1
+
+    def p95(self, min_samples: int) -> float | None:
+        """95-й перцентиль латентности в секундах; None, пока замеров меньше min_samples."""
+        if len(self._latencies) < max(1, min_samples):
+            return None
+        ordered = sorted(self._latencies)
+        return ordered[int(0.95 * (len(ordered) - 1))]
+
+    def snapshot(self) -> dict:
+        p95 = self.p95(1)
+        return {
+            "healthy": self.healthy,
+            "in_flight": self.in_flight,
+            "requests": self._requests,
+            "failures": self._failures,
+            "p95_seconds": round(p95, 3) if p95 is not None else None,
+        }
+
+
+class ReplicaPool:
+    """
+    Набор реплик одного провайдера (например, несколько Ollama на CPU-нодах).
+
+    Вызов уходит на здоровую реплику с наименьшим числом запросов в полёте
+    (least outstanding requests); при равенстве — на ту, что дольше не выбиралась.
+    Если здоровых нет, выбираются из всех: лучше попытаться, чем сразу отказать.
+
+    Здоровье проверяется GET health_path не чаще раза в health_interval секунд,
+    в фоне при очередном выборе реплики; ошибка соединения или таймаут помечает
+    реплику нездоровой сразу. Работает в одном event loop, поэтому без блокировок.
+    """
+
+    HEALTH_CHECK_TIMEOUT = 2.0  # секунд
+
+    def __init__(self, urls: list[str], health_path: str, health_interval: float):
+        self.replicas = [Replica(url) for url in urls]
+        self.health_path = health_path
+        self.health_interval = health_interval
+        self._last_picked = {replica.url: 0 for replica in self.replicas}
+        self._picks = 0
+        self._last_health_check = time.monotonic()
+        self._health_task = None
+
+    def __len__(self) -> int:
+        return len(self.replicas)
+
+    def pick(self, exclude: tuple[Replica, ...] = ()) -> Replica | None:
+        """Реплика для следующего вызова; None, если кроме exclude выбирать не из чего."""
+        candidates = [replica for replica in self.replicas if replica not in exclude]
+        if not candidates:
+            return None
+        candidates = [replica for replica in candidates if replica.healthy] or candidates
+        replica = min(candidates, key=lambda r: (r.in_flight, self._last_picked[r.url]))
+        self._picks += 1
+        self._last_picked[replica.url] = self._picks
+        return replica
+
+    def maybe_check_health(self, session):
+        """Запускает фоновую проверку реплик, если прошло health_interval с предыдущей."""
+        if len(self.replicas) < 2 and self.replicas[0].healthy:
+            return  # с одной здоровой репликой выбирать не из чего
+        now = time.monotonic()
+        if now - self._last_health_check < self.health_interval:
+            return
+        if self._health_task is not None and not self._health_task.done():
+            return
+        self._last_health_check = now
+        self._health_task = asyncio.create_task(self.check_health(session))
+
+    async def check_health(self, session):
+        """Проверяет все реплики параллельно и обновляет их статус."""
+        await asyncio.gather(*(self._check_replica(session, replica) for replica in self.replicas))
+
+    async def _check_replica(self, session, replica: Replica):
+        import aiohttp
+
+        try:
+            timeout = aiohttp.ClientTimeout(total=self.HEALTH_CHECK_TIMEOUT)
+            async with session.get(f"{replica.url}{self.health_path}", timeout=timeout) as response:
+                healthy = response.status == 200
+        except (asyncio.TimeoutError, aiohttp.ClientError, OSError):
+            healthy = False
+        if healthy != replica.healthy:
+            logger.info("Replica '%s' is %s", replica.url, "healthy again" if healthy else "unhealthy")
+        replica.healthy = healthy
+
+    async def close(self):
+        if self._health_task is not None and not self._health_task.done():
+            self._health_task.cancel()
+            await asyncio.gather(self._health_task, return_exceptions=True)
+
+    def snapshot(self) -> dict:
+        """Состояние для /stats/ollama-replicas."""
+        return {replica.url: replica.snapshot() for replica in self.replicas}
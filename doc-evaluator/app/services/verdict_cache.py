@@ -0,0 +1,168 @@
+import asyncio
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+class VerdictCache:
+    """
+    Персистентный кэш оценок LLM-судей (SQLite).
+
+    Ключ — sha256 от (судья, модель провайдера, температура, версия промпта,
+    код, документация): смена модели в конфиге или правка промпта судей
+    автоматически инвалидирует старые вердикты. Кэшируются только полученные
+    оценки — None (сбой, провайдер не настроен) не кэшируется.
+
+    Записи старше ttl_seconds считаются промахом и удаляются; при превышении
+    max_entries вытесняются давно не запрошенные.
+
+    Судьи вызывают aget/aput: SQLite работает в потоке, а не в event loop.
+    База в режиме WAL с synchronous=NORMAL — commit без fsync на каждую запись.
+    Попадание ничего не пишет: время доступа копится в памяти и сбрасывается
+    пачкой (приближённый LRU).
+    """
+
+    # Истёкшие записи чистятся не на каждой записи, а раз в PURGE_EVERY вставок
+    PURGE_EVERY = 256
+    # Время доступа попаданий сбрасывается на диск раз в ACCESS_FLUSH_EVERY попаданий и перед вытеснением
+    ACCESS_FLUSH_EVERY = 256
+
+    def __init__(self, path: str, ttl_seconds: float, max_entries: int):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._puts_since_purge = 0
+        self._accessed = {}  # key -> время последнего попадания, ещё не записанное в базу
+
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS verdicts ("
+            "key TEXT PRIMARY KEY, score REAL NOT NULL, created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS verdicts_accessed_at ON verdicts (accessed_at)")
+        self._db.commit()
+        self._count = self._db.execute("SELECT COUNT(*) FROM verdicts").fetchone()[0]
+        logger.info("Verdict cache opened at '%s' (%d entries)", path, self._count)
+
+    @staticmethod
+    def key(judge: str, model: str, temperature: float, prompt_version: str, code: str, doc: str,
+            sample: int | None = None) -> str:
+        """sample — номер выборки из вызова с несколькими выборками; такие вердикты не смешиваются с обычными."""
+        digest = hashlib.sha256()
+        parts = (judge, model, f"{temperature:.3f}", prompt_version, code, doc)
+        if sample is not None:
+            parts += (f"sample={sample}",)
+        # \0 между частями: ("ab", "c") и ("a", "bc") дают разные ключи
+        for part in parts:
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def get(self, key: str) -> float | None:
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT score, created_at FROM verdicts WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            score, created_at = row
+            if now - created_at > self.ttl_seconds:
+                self._db.execute("DELETE FROM verdicts WHERE key = ?", (key,))
+                self._db.commit()
+                self._count -= 1
+                self.misses += 1
+                return None
+            self._accessed[key] = now
+            if len(self._accessed) >= self.ACCESS_FLUSH_EVERY:
+                self._flush_accessed()
+                self._db.commit()
+            self.hits += 1
+            return score
+
+    async def aget(self, key: str) -> float | None:
+        """get в потоке — чтение SQLite не блокирует event loop."""
+        return await asyncio.to_thread(self.get, key)
+
+    def put(self, key: str, score: float):
+        now = time.time()
+        with self._lock:
+            inserted = self._db.execute(
+                "INSERT OR IGNORE INTO verdicts (key, score, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, score, now, now),
+            ).rowcount
+            if not inserted:
+                self._db.execute(
+                    "UPDATE verdicts SET score = ?, created_at = ?, accessed_at = ? WHERE key = ?",
+                    (score, now, now, key),
+                )
+            self._count += inserted
+            self._accessed.pop(key, None)
+
+            self._puts_since_purge += 1
+            if self._puts_since_purge >= self.PURGE_EVERY:
+                self._puts_since_purge = 0
+                self._count -= self._db.execute(
+                    "DELETE FROM verdicts WHERE created_at < ?", (now - self.ttl_seconds,)
+                ).rowcount
+
+            if self._count > self.max_entries:
+                self._flush_accessed()  # вытесняем по актуальному времени доступа
+                self._count -= self._db.execute(
+                    "DELETE FROM verdicts WHERE key IN (SELECT key FROM verdicts ORDER BY accessed_at LIMIT ?)",
+                    (self._count - self.max_entries,),
+                ).rowcount
+            self._db.commit()
+
+    async def aput(self, key: str, score: float):
+        """put в потоке — запись SQLite не блокирует event loop."""
+        await asyncio.to_thread(self.put, key, score)
+
+    def _flush_accessed(self):
+        """Записывает накопленное время доступа попаданий; вызывается под self._lock."""
+        if self._accessed:
+            self._db.executemany(
+                "UPDATE verdicts SET accessed_at = ? WHERE key = ?",
+                [(accessed_at, key) for key, accessed_at in self._accessed.items()],
+            )
+            self._accessed.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entries": self._count,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+    def close(self):
+        with self._lock:
+            self._flush_accessed()
+            self._db.commit()
+            self._db.close()
+
+
+@lru_cache
+def get_verdict_cache() -> VerdictCache | None:
+    """Общий кэш вердиктов всех судей; None, если VERDICT_CACHE_PATH не задан."""
+    settings = get_settings()
+    if not settings.VERDICT_CACHE_PATH:
+        return None
+    return VerdictCache(
+        settings.VERDICT_CACHE_PATH,
+        ttl_seconds=settings.VERDICT_CACHE_TTL_HOURS * 3600,
+        max_entries=settings.VERDICT_CACHE_MAX_ENTRIES,
+    )
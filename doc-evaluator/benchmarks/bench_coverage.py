@@ -0,0 +1,86 @@
+"""
+Бенчмарк keyword coverage на больших входах (100 КБ+ кода и документации).
+
+Сравнивает прежний алгоритм (`keyword.lower() in doc.lower()` для каждого
+идентификатора, O(идентификаторы × длина документации)) с индексом слов
+документации, который строится одним проходом. Проверяет, что баллы совпадают.
+
+Запуск (из корня doc-evaluator):
+    python -m benchmarks.bench_coverage --size-kb 100 400 --repeat 20
+"""
+import argparse
+import random
+import re
+from app.services.coverage_index import DocTokenIndex, keyword_hits
+from app.services.local_metrics import LocalMetricsService
+from benchmarks.common import format_latency, measure_ms
+
+WORDS = [
+    "user", "order", "item", "price", "repository", "service", "cache", "request",
+    "response", "payload", "session", "token", "account", "invoice", "report", "event",
+]
+
+
+def make_identifier(rng: random.Random) -> str:
+    parts = rng.sample(WORDS, rng.randint(2, 3))
+    return parts[0] + "".join(part.capitalize() for part in parts[1:]) + str(rng.randint(0, 999))
+
+
+def make_inputs(size_kb: int, seed: int = 7) -> tuple[str, str]:
+    """Kotlin-подобный класс и многословная документация примерно по size_kb каждая."""
+    rng = random.Random(seed)
+    identifiers = [make_identifier(rng) for _ in range(max(size_kb * 8, 100))]
+
+    code_lines, code_size = [], 0
+    while code_size < size_kb * 1024:
+        name, arg, call = rng.choice(identifiers), rng.choice(identifiers), rng.choice(identifiers)
+        line = f"    fun {name}({arg}: Long): Result = {call}({arg})\n"
+        code_lines.append(line)
+        code_size += len(line)
+
+    doc_words, doc_size = [], 0
+    while doc_size < size_kb * 1024:
+        # Примерно половина идентификаторов упоминается в документации
+        word = rng.choice(identifiers[: len(identifiers) // 2]) if rng.random() < 0.2 else rng.choice(WORDS + ["the", "and", "returns"])
+        doc_words.append(word)
+        doc_size += len(word) + 1
+    return "class Generated {\n" + "".join(code_lines) + "}\n", " ".join(doc_words)
+
+
+def legacy_coverage(code: str, doc: str) -> float:
+    tokens = re.findall(LocalMetricsService.IDENTIFIER_PATTERN, code)
+    keywords = {
+        t for t in tokens
+        if len(t) > LocalMetricsService.MIN_TOKEN_LENGTH and t not in LocalMetricsService.KOTLIN_STOPWORDS
+    }
+    doc_lower = doc.lower()
+    found = sum(1 for t in keywords if t.lower() in doc_lower)
+    return (found / len(keywords)) * LocalMetricsService.MAX_SCORE
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-kb", type=int, nargs="+", default=[100, 400])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    service = LocalMetricsService.__new__(LocalMetricsService)  # coverage не требует модели
+    for size_kb in args.size_kb:
+        code, doc = make_inputs(size_kb)
+        keywords = service._extract_keywords(code)
+        print(f"code={len(code) / 1024:.0f} KB, doc={len(doc) / 1024:.0f} KB, identifiers={len(keywords)}")
+
+        legacy = legacy_coverage(code, doc)
+        indexed = service.calculate_coverage(code, doc)
+        assert abs(legacy - indexed) < 1e-9, (legacy, indexed)
+
+        print(format_latency("legacy substring scan", measure_ms(lambda: legacy_coverage(code, doc), args.repeat, warmup=1)))
+        print(format_latency("token index", measure_ms(lambda: service.calculate_coverage(code, doc), args.repeat, warmup=1)))
+        print(format_latency("token index + details", measure_ms(
+            lambda: keyword_hits(keywords, DocTokenIndex(doc)), args.repeat, warmup=1
+        )))
+        print(f"score={indexed:.3f} (identical)\n")
+
+
+if __name__ == "__main__":
+    main()
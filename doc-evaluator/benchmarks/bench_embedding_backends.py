@@ -0,0 +1,76 @@
+"""
+Бенчмарк бэкендов эмбеддера: torch vs onnx vs onnx-int8.
+
+Для каждого бэкенда меряет латентность encode одной пары (код, документация)
+(p50/p99) и отклонение cosine similarity от torch-пути на тех же парах.
+
+Запуск (из корня doc-evaluator):
+    python -m benchmarks.bench_embedding_backends --backends torch onnx onnx-int8 --repeat 50
+"""
+import argparse
+from sentence_transformers import util
+from app.core.config import get_settings
+from app.services.embedding_backends import EXPECTED_MAX_COSINE_DELTA, SUPPORTED_BACKENDS, load_embedder
+from benchmarks.common import format_latency, measure_ms
+
+SAMPLE_PAIRS = [
+    (
+        "fun calculateTotal(items: List<Item>): Double = items.sumOf { it.price }",
+        "Calculates total price of all items in the list by summing their prices",
+    ),
+    (
+        "def bubble_sort(arr):\n    n = len(arr)\n    for i in range(n):\n"
+        "        for j in range(0, n - i - 1):\n            if arr[j] > arr[j + 1]:\n"
+        "                arr[j], arr[j + 1] = arr[j + 1], arr[j]\n    return arr",
+        "Sorts an array in ascending order using the bubble sort algorithm.",
+    ),
+    (
+        "class UserRepository(private val db: Database) {\n"
+        "    fun findByEmail(email: String): User? = db.users.firstOrNull { it.email == email }\n}",
+        "Репозиторий пользователей. findByEmail ищет пользователя по email и возвращает null, если не найден.",
+    ),
+]
+
+
+def cosine_scores(model) -> list[float]:
+    scores = []
+    for code, doc in SAMPLE_PAIRS:
+        vectors = model.encode([code, doc])
+        scores.append(util.cos_sim(vectors[0], vectors[1]).item())
+    return scores
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=list(SUPPORTED_BACKENDS), choices=SUPPORTED_BACKENDS)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    settings = get_settings()
+    model_name = settings.CODEBERT_MODEL_NAME
+    print(f"Model: {model_name}, repeat={args.repeat}\n")
+
+    reference = None
+    for backend in args.backends:
+        model = load_embedder(
+            model_name,
+            backend=backend,
+            onnx_cache_dir=settings.EMBEDDING_ONNX_CACHE_DIR,
+            quantization=settings.EMBEDDING_ONNX_QUANTIZATION,
+        )
+        code, doc = SAMPLE_PAIRS[0]
+        samples = measure_ms(lambda: model.encode([code, doc]), repeat=args.repeat)
+        print(format_latency(backend, samples))
+
+        scores = cosine_scores(model)
+        if reference is None:
+            reference = scores
+            print(f"{'':<28} reference cosine: {', '.join(f'{s:.4f}' for s in scores)}")
+        else:
+            max_delta = max(abs(a - b) for a, b in zip(scores, reference))
+            print(f"{'':<28} max |Δ cosine| vs {args.backends[0]}: {max_delta:.5f}"
+                  f" (expected <= {EXPECTED_MAX_COSINE_DELTA.get(backend, 0.0)})")
+
+
+if __name__ == "__main__":
+    main()
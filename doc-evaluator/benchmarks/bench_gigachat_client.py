@@ -0,0 +1,145 @@
+"""
+Бенчмарк накладных расходов клиента GigaChat на вызов судьи.
+
+Локальный стенд (aiohttp) изображает OAuth-эндпоинт и /chat/completions
+с заданными задержками. Сравниваются прежняя схема — новый `GigaChat` на
+каждый вызов (новое соединение и обмен токена) — и один долгоживущий клиент
+GigaChatJudge. Стенд считает запросы токена и открытые TCP-соединения.
+
+Запуск (из корня doc-evaluator):
+    python -m benchmarks.bench_gigachat_client --calls 50 --auth-delay-ms 30
+"""
+import argparse
+import asyncio
+import base64
+import time
+from aiohttp import web
+from gigachat import GigaChat
+from gigachat.models import Chat, Messages, MessagesRole
+from benchmarks.common import format_latency
+
+CHAT_COMPLETION = {
+    "choices": [{"message": {"role": "assistant", "content": "4"}, "index": 0, "finish_reason": "stop"}],
+    "created": 0,
+    "model": "GigaChat",
+    "usage": {"prompt_tokens": 10, "completion_tokens": 1, "total_tokens": 11},
+    "object": "chat.completion",
+}
+
+
+class StandInServer:
+    """OAuth + chat/completions с фиксированными задержками и счётчиками."""
+
+    def __init__(self, auth_delay_ms: float, chat_delay_ms: float):
+        self.auth_delay = auth_delay_ms / 1000
+        self.chat_delay = chat_delay_ms / 1000
+        self.token_requests = 0
+        self._peers = set()
+        self._runner = None
+        self.port = None
+
+    @property
+    def connections(self) -> int:
+        """Число разных TCP-соединений (клиентских портов), пришедших на стенд."""
+        return len(self._peers)
+
+    @web.middleware
+    async def _track_connection(self, request: web.Request, handler):
+        self._peers.add(request.transport.get_extra_info("peername"))
+        return await handler(request)
+
+    async def _oauth(self, request: web.Request) -> web.Response:
+        self.token_requests += 1
+        await asyncio.sleep(self.auth_delay)
+        expires_at = int((time.time() + 1800) * 1000)
+        return web.json_response({"access_token": f"token-{self.token_requests}", "expires_at": expires_at})
+
+    async def _chat(self, request: web.Request) -> web.Response:
+        await request.read()
+        await asyncio.sleep(self.chat_delay)
+        return web.json_response(CHAT_COMPLETION)
+
+    async def start(self):
+        app = web.Application(middlewares=[self._track_connection])
+        app.router.add_post("/oauth", self._oauth)
+        app.router.add_post("/chat/completions", self._chat)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        self.port = self._runner.addresses[0][1]
+
+    async def stop(self):
+        await self._runner.cleanup()
+
+    def client_kwargs(self) -> dict:
+        return {
+            "base_url": f"http://127.0.0.1:{self.port}",
+            "auth_url": f"http://127.0.0.1:{self.port}/oauth",
+            "credentials": base64.b64encode(b"bench:secret").decode(),
+            "model": "GigaChat",
+            "verify_ssl_certs": False,
+        }
+
+    def reset(self):
+        self.token_requests = 0
+        self._peers.clear()
+
+
+def make_payload() -> Chat:
+    return Chat(messages=[Messages(role=MessagesRole.USER, content="Оцени документацию")], temperature=0.1)
+
+
+async def per_call_client(server: StandInServer, calls: int) -> list[float]:
+    """Прежняя схема: `async with GigaChat(...)` внутри каждого вызова."""
+    samples = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        async with GigaChat(**server.client_kwargs()) as giga:
+            await giga.achat(make_payload())
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+async def shared_client(server: StandInServer, calls: int) -> list[float]:
+    """Один клиент на процесс, как в GigaChatJudge._get_client."""
+    giga = GigaChat(**server.client_kwargs())
+    samples = []
+    try:
+        for _ in range(calls):
+            start = time.perf_counter()
+            await giga.achat(make_payload())
+            samples.append((time.perf_counter() - start) * 1000)
+    finally:
+        await giga.aclose()
+    return samples
+
+
+async def run(calls: int, auth_delay_ms: float, chat_delay_ms: float):
+    server = StandInServer(auth_delay_ms, chat_delay_ms)
+    await server.start()
+    try:
+        print(f"calls={calls}, auth delay={auth_delay_ms} ms, chat delay={chat_delay_ms} ms")
+        for name, scenario in (("client per call", per_call_client), ("shared client", shared_client)):
+            server.reset()
+            samples = await scenario(server, calls)
+            print(format_latency(name, samples))
+            print(f"{'':<28} token requests={server.token_requests}   "
+                  f"tcp connections={server.connections}   total={sum(samples):.0f} ms")
+    finally:
+        await server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=50)
+    parser.add_argument("--auth-delay-ms", type=float, default=30.0,
+                        help="Задержка OAuth-эндпоинта (обмен credentials на токен)")
+    parser.add_argument("--chat-delay-ms", type=float, default=5.0,
+                        help="Задержка ответа модели")
+    args = parser.parse_args()
+    asyncio.run(run(args.calls, args.auth_delay_ms, args.chat_delay_ms))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Бенчмарк времени импорта (python -X importtime).
+
+Сравнивает импорт модулей сервиса с ленивой загрузкой SDK и «eager»-вариант,
+в котором SDK провайдеров и ML-библиотеки импортируются сразу (как было раньше).
+Каждый замер — отдельный чистый процесс.
+
+Запуск (из корня doc-evaluator):
+    python -m benchmarks.bench_import_time --repeat 5
+"""
+import argparse
+import re
+import statistics
+import subprocess
+import sys
+
+TARGETS = {
+    "app.main": "import app.main",
+    "app.client": "import app.client",
+    "app.main + eager SDKs": (
+        "import app.main, gigachat, google.generativeai, aiohttp, "
+        "sentence_transformers"
+    ),
+}
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def import_profile(statement: str) -> dict[str, int]:
+    """Запускает statement в новом процессе и возвращает cumulative-время (мкс) модулей верхнего уровня."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        capture_output=True, text=True, check=True,
+    )
+    top_level = {}
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        # Один пробел отступа = модуль, импортированный непосредственно из statement
+        if match and len(match.group(3)) == 1:
+            top_level[match.group(4)] = int(match.group(2))
+    return top_level
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=8, help="Сколько самых тяжёлых модулей показать")
+    args = parser.parse_args()
+
+    for name, statement in TARGETS.items():
+        totals_ms = []
+        profile = {}
+        for _ in range(args.repeat):
+            profile = import_profile(statement)
+            totals_ms.append(sum(profile.values()) / 1000)
+
+        print(f"{name:<24} median={statistics.median(totals_ms):8.1f} ms   min={min(totals_ms):8.1f} ms")
+        heaviest = sorted(profile.items(), key=lambda item: item[1], reverse=True)[:args.top]
+        for module, micros in heaviest:
+            print(f"    {module:<40} {micros / 1000:8.1f} ms")
+        print()
+
+
+if __name__ == "__main__":
+    main()
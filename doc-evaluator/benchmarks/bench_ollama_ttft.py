@@ -0,0 +1,133 @@
+"""
+Бенчмарк time-to-first-token судьи на локальной Ollama: прежняя раскладка
+промпта против префикс-кэшируемой.
+
+  legacy — один user-message, код и документация перед рубрикой, без keep_alive/num_ctx
+  prefix — рубрика в system, код и документация последними, keep_alive и num_ctx
+           как в OllamaJudge
+
+Каждая пара код/документация оценивается --rounds раз подряд (как раунды
+self-consistency). Для каждого вызова замеряется TTFT (стриминг /api/chat)
+и prompt_eval_count из финального чанка — сколько токенов промпта Ollama
+реально прогнала через модель, а не взяла из KV-кэша.
+
+Нужна запущенная Ollama с моделью OLLAMA_MODEL. Запуск (из корня doc-evaluator):
+    python -m benchmarks.bench_ollama_ttft --pairs 5 --rounds 3 --size-kb 4
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+import aiohttp
+from app.core.config import get_settings
+from app.services.llm_judges import OllamaJudge, judge_messages
+from benchmarks.bench_coverage import make_inputs
+from benchmarks.common import format_latency
+
+# Промпт до переноса рубрики в system-сообщение
+LEGACY_PROMPT = """
+Ты — Senior Technical Writer с 10-летним опытом.
+Оцени качество документации к данному коду.
+
+Код:
+```
+{code}
+```
+
+Документация:
+```
+{doc}
+```
+
+Критерии оценки:
+1. Полнота — описаны ли все параметры, возвращаемое значение, исключения, побочные эффекты?
+2. Точность — соответствует ли документация реальному поведению кода?
+3. Ясность — понятна ли документация разработчику без изучения кода?
+4. Структура — есть ли форматирование, разделы, примеры использования?
+
+Шкала:
+0-2: документация отсутствует или полностью неверна
+3-4: минимальная документация, много пропусков
+5-6: средняя документация, покрыты основные аспекты
+7-8: хорошая документация, мелкие недочёты
+9-10: отличная документация, полная и точная
+
+Верни ТОЛЬКО одно число от 0 до 10 (допускается дробное, например 7.5).
+"""
+
+
+def legacy_payload(model: str, code: str, doc: str) -> dict:
+    return {
+        "model": model,
+        "messages": [{"role": "user", "content": LEGACY_PROMPT.format(code=code, doc=doc)}],
+        "stream": True,
+        "options": {"temperature": 0.1},
+    }
+
+
+def prefix_payload(model: str, code: str, doc: str) -> dict:
+    judge = OllamaJudge()
+    messages = judge_messages(code, doc)
+    return {
+        "model": model,
+        "messages": messages,
+        "stream": True,
+        "keep_alive": get_settings().OLLAMA_KEEP_ALIVE,
+        "options": {"temperature": 0.1, "num_ctx": judge._num_ctx(messages)},
+    }
+
+
+async def stream_chat(session: aiohttp.ClientSession, url: str, payload: dict) -> tuple[float, int]:
+    """TTFT в мс и prompt_eval_count одного стримингового запроса."""
+    start = time.perf_counter()
+    ttft = None
+    prompt_eval_count = 0
+    async with session.post(url, json=payload) as response:
+        response.raise_for_status()
+        async for line in response.content:
+            if not line.strip():
+                continue
+            chunk = json.loads(line)
+            if ttft is None and chunk.get("message", {}).get("content"):
+                ttft = (time.perf_counter() - start) * 1000
+            if chunk.get("done"):
+                prompt_eval_count = chunk.get("prompt_eval_count", 0)
+    return ttft if ttft is not None else (time.perf_counter() - start) * 1000, prompt_eval_count
+
+
+async def run(pairs: int, rounds: int, size_kb: int):
+    settings = get_settings()
+    url = f"{settings.OLLAMA_HOST.rstrip('/').replace('/v1', '')}/api/chat"
+    inputs = [make_inputs(size_kb, seed=seed) for seed in range(pairs)]
+
+    timeout = aiohttp.ClientTimeout(total=600)
+    async with aiohttp.ClientSession(timeout=timeout) as session:
+        # Прогрев: загрузка модели не должна попасть в замеры первой раскладки
+        await stream_chat(session, url, prefix_payload(settings.OLLAMA_MODEL, "fun warmup() = Unit", "Warmup"))
+
+        print(f"model={settings.OLLAMA_MODEL}, pairs={pairs}, rounds={rounds}, size={size_kb} KB")
+        for name, build in (("legacy", legacy_payload), ("prefix", prefix_payload)):
+            first, repeated, evaluated = [], [], []
+            for code, doc in inputs:
+                for round_index in range(rounds):
+                    ttft, prompt_eval_count = await stream_chat(session, url, build(settings.OLLAMA_MODEL, code, doc))
+                    (first if round_index == 0 else repeated).append(ttft)
+                    evaluated.append(prompt_eval_count)
+            print(format_latency(f"{name}: first round", first))
+            if repeated:
+                print(format_latency(f"{name}: next rounds", repeated))
+            print(f"{'':<28} prompt tokens evaluated per call: mean={statistics.fmean(evaluated):.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pairs", type=int, default=5, help="Разных пар код/документация")
+    parser.add_argument("--rounds", type=int, default=3, help="Вызовов на пару (раунды self-consistency)")
+    parser.add_argument("--size-kb", type=int, default=4, help="Размер кода и документации каждой пары")
+    args = parser.parse_args()
+    asyncio.run(run(args.pairs, args.rounds, args.size_kb))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Бенчмарк readability: встроенный движок vs textstat.flesch_reading_ease.
+
+textstat больше не зависимость сервиса; для сравнения его нужно поставить
+отдельно (pip install textstat). Без него печатается только встроенный движок.
+
+Запуск (из корня doc-evaluator):
+    python -m benchmarks.bench_readability --size-kb 2 8 32 --repeat 50
+"""
+import argparse
+import itertools
+from app.services.readability import count_syllables, flesch_reading_ease
+from benchmarks.common import format_latency, measure_ms
+
+SAMPLE_EN = (
+    "Calculates the total price of all items in the order. "
+    "Discounts are applied before taxes, and the result is rounded to two decimal places. "
+    "Returns zero when the order is empty! Throws IllegalStateException if the currency is unknown. "
+)
+SAMPLE_RU = (
+    "Вычисляет итоговую стоимость всех позиций заказа. "
+    "Скидки применяются до налогов, результат округляется до двух знаков после запятой. "
+    "Для пустого заказа возвращает ноль! Если валюта неизвестна, выбрасывает IllegalStateException. "
+)
+
+
+def make_doc(sample: str, size_kb: int) -> str:
+    return sample * (size_kb * 1024 // len(sample) + 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-kb", type=int, nargs="+", default=[2, 8, 32])
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    try:
+        import textstat
+    except ImportError:
+        textstat = None
+        print("textstat is not installed — reporting the built-in engine only\n")
+
+    for language, sample in (("en", SAMPLE_EN), ("ru", SAMPLE_RU)):
+        for size_kb in args.size_kb:
+            doc = make_doc(sample, size_kb)
+            print(f"[{language}] doc={len(doc) / 1024:.0f} KB, FRE={flesch_reading_ease(doc):.1f}")
+
+            variant = itertools.count()
+
+            def builtin():
+                # Кэш слогов сбрасывается: меряем холодный разбор, а не попадания в кэш с прошлой итерации
+                count_syllables.cache_clear()
+                flesch_reading_ease(doc)
+
+            def with_textstat():
+                # textstat кэширует по тексту все промежуточные счётчики — каждый раз новый текст
+                textstat.flesch_reading_ease(f"{doc} {next(variant)}")
+
+            print(format_latency("built-in engine", measure_ms(builtin, args.repeat)))
+            if textstat is not None:
+                print(format_latency("textstat", measure_ms(with_textstat, args.repeat)))
+            print()
+
+
+if __name__ == "__main__":
+    main()
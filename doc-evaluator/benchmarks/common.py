@@ -0,0 +1,37 @@
+"""
+Общие утилиты для бенчмарков doc-evaluator.
+
+Скрипты запускаются из корня doc-evaluator как модули:
+    python -m benchmarks.bench_embedding_backends
+"""
+import statistics
+import time
+from typing import Callable
+
+
+def percentile(samples: list[float], q: float) -> float:
+    """Перцентиль q (0-100) по списку замеров."""
+    if len(samples) == 1:
+        return samples[0]
+    return statistics.quantiles(samples, n=100, method="inclusive")[int(q) - 1]
+
+
+def measure_ms(fn: Callable[[], object], repeat: int, warmup: int = 3) -> list[float]:
+    """Вызывает fn repeat раз (после warmup прогревочных) и возвращает длительности в мс."""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def format_latency(name: str, samples_ms: list[float]) -> str:
+    """Строка отчёта: p50 / p99 / mean в миллисекундах."""
+    return (
+        f"{name:<28} p50={percentile(samples_ms, 50):8.2f} ms   "
+        f"p99={percentile(samples_ms, 99):8.2f} ms   "
+        f"mean={statistics.fmean(samples_ms):8.2f} ms"
+    )
@@ -15,6 +15,7 @@ def mock_local_metrics(monkeypatch):
     mock_service.calculate_semantic_similarity.return_value = 0.8
     mock_service.calculate_coverage.return_value = 9.0
     mock_service.calculate_readability.return_value = 7.5
+    mock_service.calculate_semantic_similarity_batch.side_effect = lambda pairs: [0.8] * len(pairs)
 
     monkeypatch.setattr(LocalMetricsService, "get_instance", lambda: mock_service)
     return mock_service
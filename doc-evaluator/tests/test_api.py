@@ -1,3 +1,6 @@
+import pytest
+
+
 def test_evaluate_endpoint(client, mock_local_metrics, mock_llm_judges):
     response = client.post(
         "/evaluate",
@@ -46,3 +49,74 @@ def test_health_check(client):
     data = response.json()
     assert data["status"] == "ok"
     assert data["service"] == "Doc Evaluator"
+
+
+@pytest.fixture
+def fresh_orchestrator(mock_local_metrics, mock_llm_judges):
+    """get_orchestrator закэширован — батч-тестам нужен оркестратор с моками текущего теста"""
+    from app.main import app, get_orchestrator
+    from app.services.orchestrator import EvaluationOrchestrator
+
+    orchestrator = EvaluationOrchestrator()
+    app.dependency_overrides[get_orchestrator] = lambda: orchestrator
+    yield
+    app.dependency_overrides.clear()
+
+
+def _batch_lines(response):
+    import json
+    return [json.loads(line) for line in response.text.splitlines() if line]
+
+
+def test_evaluate_batch_streams_ndjson(client, mock_local_metrics, mock_llm_judges, fresh_orchestrator):
+    items = [
+        {"code_snippet": f"def foo{i}(): pass", "generated_doc": f"Documentation for foo{i}"}
+        for i in range(3)
+    ]
+    response = client.post("/evaluate/batch", json={"items": items})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = _batch_lines(response)
+    assert sorted(line["index"] for line in lines) == [0, 1, 2]
+    assert all(line["error"] is None and line["result"]["final_score"] > 0 for line in lines)
+    # Эмбеддинги всего батча — один вызов
+    mock_local_metrics.calculate_semantic_similarity_batch.assert_called_once()
+
+
+def test_evaluate_batch_item_error_does_not_fail_batch(client, mock_local_metrics, mock_llm_judges, fresh_orchestrator):
+    # Покрытие вне диапазона 0-10 ломает валидацию ответа только для этой пары
+    mock_local_metrics.calculate_coverage.side_effect = lambda code, doc: 42.0 if "broken" in code else 9.0
+    items = [
+        {"code_snippet": "def ok(): pass", "generated_doc": "Documentation for ok"},
+        {"code_snippet": "def broken(): pass", "generated_doc": "Documentation for broken"},
+    ]
+    response = client.post("/evaluate/batch", json={"items": items})
+
+    assert response.status_code == 200
+    lines = {line["index"]: line for line in _batch_lines(response)}
+    assert lines[0]["error"] is None and lines[0]["result"] is not None
+    assert lines[1]["result"] is None and "ValidationError" in lines[1]["error"]
+
+
+def test_evaluate_batch_too_large(client, monkeypatch, fresh_orchestrator):
+    from app.main import settings
+    monkeypatch.setattr(settings, "EVALUATE_BATCH_MAX_ITEMS", 1)
+    item = {"code_snippet": "def foo(): pass", "generated_doc": "Documentation for foo"}
+
+    response = client.post("/evaluate/batch", json={"items": [item, item]})
+    assert response.status_code == 413
+
+
+def test_evaluate_batch_empty_rejected(client, fresh_orchestrator):
+    response = client.post("/evaluate/batch", json={"items": []})
+    assert response.status_code == 422
+
+
+def test_circuit_breaker_stats(client, fresh_orchestrator):
+    response = client.get("/stats/circuit-breakers")
+
+    assert response.status_code == 200
+    data = response.json()
+    assert set(data) == {"gigachat", "gemini", "ollama", "qwen"}
+    assert data["ollama"]["state"] == "closed"
@@ -0,0 +1,91 @@
+import asyncio
+import pytest
+from app.services.bulkhead import Bulkhead
+
+
+async def _hold(bulkhead: Bulkhead, release: asyncio.Event, started: list, name: str):
+    async with bulkhead.slot():
+        started.append(name)
+        await release.wait()
+
+
+@pytest.mark.asyncio
+async def test_slots_cap_concurrent_calls_in_fifo_order():
+    bulkhead = Bulkhead("ollama", max_limit=2)
+    release = asyncio.Event()
+    started = []
+
+    tasks = [asyncio.create_task(_hold(bulkhead, release, started, f"call-{i}")) for i in range(5)]
+    await asyncio.sleep(0)
+    assert started == ["call-0", "call-1"]
+    assert bulkhead.snapshot()["in_flight"] == 2
+    assert bulkhead.snapshot()["queued"] == 3
+
+    release.set()
+    await asyncio.gather(*tasks)
+    assert started == [f"call-{i}" for i in range(5)]
+    assert bulkhead.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_leak_a_slot():
+    bulkhead = Bulkhead("ollama", max_limit=1)
+    release = asyncio.Event()
+    started = []
+
+    holder = asyncio.create_task(_hold(bulkhead, release, started, "holder"))
+    waiter = asyncio.create_task(_hold(bulkhead, release, started, "waiter"))
+    await asyncio.sleep(0)
+    waiter.cancel()
+    release.set()
+    await asyncio.gather(holder, waiter, return_exceptions=True)
+
+    assert started == ["holder"]
+    assert bulkhead.in_flight == 0
+    assert bulkhead.snapshot()["queued"] == 0
+
+
+def test_fixed_mode_ignores_latency_and_overloads():
+    bulkhead = Bulkhead("gemini", max_limit=4)
+    for _ in range(10):
+        bulkhead.record_success(0.1)
+    bulkhead.record_overload()
+
+    assert bulkhead.limit == 4
+    assert bulkhead.snapshot()["overloads"] == 1
+
+
+def test_adaptive_limit_grows_while_latency_is_flat():
+    bulkhead = Bulkhead("ollama", max_limit=4, adaptive=True)
+    assert bulkhead.limit == 2  # старт с половины потолка
+
+    for _ in range(2):
+        bulkhead.record_success(1.0)
+    assert bulkhead.limit == 3
+
+    # Латентность выросла втрое — лимит не растёт
+    for _ in range(3):
+        bulkhead.record_success(3.0)
+    assert bulkhead.limit == 3
+
+    for _ in range(3 + 4):
+        bulkhead.record_success(1.0)
+    assert bulkhead.limit == 4  # не выше потолка
+
+
+def test_adaptive_limit_halves_once_per_burst_of_overloads():
+    bulkhead = Bulkhead("ollama", max_limit=8, adaptive=True)
+    bulkhead.record_success(60.0)  # базовая латентность — минута
+    assert bulkhead.limit == 4
+
+    for _ in range(3):
+        bulkhead.record_overload()
+    assert bulkhead.limit == 2
+    assert bulkhead.snapshot()["overloads"] == 3
+
+
+def test_adaptive_limit_never_drops_below_minimum():
+    bulkhead = Bulkhead("ollama", max_limit=2, adaptive=True)
+    for _ in range(5):
+        bulkhead.record_overload()
+    assert bulkhead.limit == 1
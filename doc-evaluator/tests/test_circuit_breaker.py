@@ -0,0 +1,82 @@
+import pytest
+from app.services import circuit_breaker
+from app.services.circuit_breaker import CircuitBreaker
+from app.services.llm_judges import OllamaJudge
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Управляемое время для circuit_breaker"""
+    now = [1000.0]
+    monkeypatch.setattr(circuit_breaker.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker("ollama", failure_threshold=3, recovery_seconds=30)
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.allow_request()
+
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.STATE_OPEN
+    assert not breaker.allow_request()
+    assert breaker.snapshot()["skipped_calls"] == 1
+
+
+def test_success_resets_failure_count(clock):
+    breaker = CircuitBreaker("ollama", failure_threshold=2, recovery_seconds=30)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.STATE_CLOSED
+
+
+def test_half_open_allows_single_probe(clock):
+    breaker = CircuitBreaker("ollama", failure_threshold=1, recovery_seconds=30)
+    breaker.record_failure()
+
+    clock[0] += 31
+    assert breaker.state == CircuitBreaker.STATE_HALF_OPEN
+    assert breaker.allow_request()  # проба
+    assert not breaker.allow_request()  # остальные ждут результата пробы
+
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.STATE_CLOSED
+    assert breaker.allow_request()
+
+
+def test_failed_probe_reopens(clock):
+    breaker = CircuitBreaker("ollama", failure_threshold=3, recovery_seconds=30)
+    for _ in range(3):
+        breaker.record_failure()
+
+    clock[0] += 31
+    assert breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.STATE_OPEN
+    assert breaker.snapshot()["retry_in_seconds"] == 30.0
+
+
+def test_disabled_breaker_always_allows(clock):
+    breaker = CircuitBreaker("ollama", failure_threshold=1, recovery_seconds=30, enabled=False)
+    breaker.record_failure()
+    assert breaker.allow_request()
+
+
+@pytest.mark.asyncio
+async def test_exhausted_retries_count_as_failure(monkeypatch):
+    monkeypatch.setattr("app.services.llm_judges.RETRY_DELAY_SECONDS", 0)
+    judge = OllamaJudge()
+
+    async def refused():
+        raise ConnectionError("connection refused")
+
+    assert await judge._retry_evaluate(refused) is None
+    assert judge.breaker.snapshot()["consecutive_failures"] == 1
+
+    async def ok():
+        return 7.0
+
+    assert await judge._retry_evaluate(ok) == 7.0
+    assert judge.breaker.snapshot()["consecutive_failures"] == 0
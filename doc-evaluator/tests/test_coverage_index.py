@@ -0,0 +1,41 @@
+import random
+from app.services.coverage_index import DocTokenIndex, keyword_hits
+
+
+def _legacy_contains(keyword: str, doc: str) -> bool:
+    """Прежняя семантика coverage: подстрока в документации без учёта регистра"""
+    return keyword.lower() in doc.lower()
+
+
+def test_exact_and_partial_matches():
+    index = DocTokenIndex("Returns the list of Users for the given user_id.")
+
+    assert index.contains("user_id")
+    assert index.contains("user")  # часть слова 'users'
+    assert index.contains("turn")  # часть слова 'returns'
+    assert not index.contains("userid")
+
+
+def test_no_match_across_word_boundaries():
+    # 'the list' в документации не должен совпадать с идентификатором 'thelist'
+    index = DocTokenIndex("the list")
+    assert not index.contains("thelist")
+    assert not _legacy_contains("thelist", "the list")
+
+
+def test_matches_legacy_substring_semantics():
+    rng = random.Random(42)
+    alphabet = "abcdeUSER_1 \n.,(){}"
+    for _ in range(200):
+        doc = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 80)))
+        index = DocTokenIndex(doc)
+        for _ in range(20):
+            keyword = "".join(rng.choice("abcdeUSER_1") for _ in range(rng.randint(1, 4)))
+            assert index.contains(keyword.lower()) == _legacy_contains(keyword, doc), (keyword, doc)
+
+
+def test_keyword_hits_counts_doc_words():
+    index = DocTokenIndex("user and users; User again. No match here")
+    hits = keyword_hits({"user", "Users", "findAll"}, index)
+
+    assert hits == {"Users": 1, "findAll": 0, "user": 3}
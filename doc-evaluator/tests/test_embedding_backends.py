@@ -0,0 +1,93 @@
+import pytest
+from app.services.embedding_backends import load_embedder, onnx_model_dir, quantized_file_name
+
+
+class FakeSentenceTransformer:
+    """Записывает аргументы загрузки; save() создаёт onnx/model.onnx как настоящий экспорт"""
+    calls = []
+
+    def __init__(self, name_or_path, backend="torch", model_kwargs=None):
+        self.name_or_path = name_or_path
+        self.backend = backend
+        self.model_kwargs = model_kwargs
+        FakeSentenceTransformer.calls.append((name_or_path, backend, model_kwargs))
+
+    def save(self, path):
+        from pathlib import Path
+        target = Path(path) / "onnx"
+        target.mkdir(parents=True, exist_ok=True)
+        (target / "model.onnx").write_bytes(b"onnx")
+
+
+@pytest.fixture
+def fake_st(monkeypatch):
+    FakeSentenceTransformer.calls = []
+    monkeypatch.setattr("sentence_transformers.SentenceTransformer", FakeSentenceTransformer)
+    return FakeSentenceTransformer
+
+
+def test_torch_backend_loads_model_directly(fake_st, tmp_path):
+    model = load_embedder("microsoft/codebert-base", backend="torch", onnx_cache_dir=str(tmp_path))
+
+    assert model.backend == "torch"
+    assert fake_st.calls == [("microsoft/codebert-base", "torch", None)]
+
+
+def test_onnx_backend_exports_once(fake_st, tmp_path):
+    load_embedder("microsoft/codebert-base", backend="onnx", onnx_cache_dir=str(tmp_path))
+    local_dir = str(onnx_model_dir(str(tmp_path), "microsoft/codebert-base"))
+    assert fake_st.calls == [
+        ("microsoft/codebert-base", "onnx", None),  # экспорт из HF
+        (local_dir, "onnx", None),
+    ]
+
+    fake_st.calls = []
+    load_embedder("microsoft/codebert-base", backend="onnx", onnx_cache_dir=str(tmp_path))
+    assert fake_st.calls == [(local_dir, "onnx", None)]
+
+
+def test_onnx_int8_backend_quantizes_once(fake_st, tmp_path, monkeypatch):
+    exports = []
+
+    def fake_export(model, quantization, path):
+        exports.append((quantization, path))
+        (tmp_path / "microsoft__codebert-base" / "onnx" / quantized_file_name(quantization)).write_bytes(b"q")
+
+    monkeypatch.setattr("sentence_transformers.export_dynamic_quantized_onnx_model", fake_export)
+
+    model = load_embedder("microsoft/codebert-base", backend="onnx-int8", onnx_cache_dir=str(tmp_path), quantization="avx2")
+    assert model.model_kwargs == {"file_name": "model_qint8_avx2.onnx"}
+    assert len(exports) == 1
+
+    load_embedder("microsoft/codebert-base", backend="onnx-int8", onnx_cache_dir=str(tmp_path), quantization="avx2")
+    assert len(exports) == 1
+
+
+def test_unknown_backend_rejected(fake_st, tmp_path):
+    with pytest.raises(ValueError):
+        load_embedder("microsoft/codebert-base", backend="tensorrt", onnx_cache_dir=str(tmp_path))
+
+
+@pytest.mark.parametrize("backend", ["onnx", "onnx-int8"])
+def test_onnx_backends_stay_within_expected_tolerance(backend, tmp_path_factory):
+    """Реальные модели: cosine пар код/док не отходит от torch дальше EXPECTED_MAX_COSINE_DELTA"""
+    pytest.importorskip("onnxruntime")
+    pytest.importorskip("optimum.onnxruntime")
+    from app.core.config import get_settings
+    from app.services.embedding_backends import EXPECTED_MAX_COSINE_DELTA
+    from benchmarks.bench_embedding_backends import cosine_scores
+
+    settings = get_settings()
+    try:
+        reference = load_embedder(settings.CODEBERT_MODEL_NAME, backend="torch")
+    except OSError:
+        pytest.skip(f"model '{settings.CODEBERT_MODEL_NAME}' is not available offline")
+    model = load_embedder(
+        settings.CODEBERT_MODEL_NAME,
+        backend=backend,
+        onnx_cache_dir=str(tmp_path_factory.getbasetemp() / "onnx"),
+        quantization=settings.EMBEDDING_ONNX_QUANTIZATION,
+    )
+
+    deltas = [abs(a - b) for a, b in zip(cosine_scores(model), cosine_scores(reference))]
+    assert max(deltas) <= EXPECTED_MAX_COSINE_DELTA[backend]
@@ -0,0 +1,84 @@
+import threading
+import pytest
+from app.services.embedding_batcher import EmbeddingBatcher
+
+
+class FakeEncoder:
+    """Эмбеддер-заглушка: вектор текста = [len(text)], запоминает размеры батчей"""
+
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, texts):
+        self.batches.append(list(texts))
+        return [[float(len(t))] for t in texts]
+
+
+def test_single_request_preserves_order():
+    encoder = FakeEncoder()
+    batcher = EmbeddingBatcher(encoder, max_batch_size=8, max_wait_ms=1)
+    try:
+        vectors = batcher.encode(["a", "bbb"])
+    finally:
+        batcher.close()
+
+    assert vectors == [[1.0], [3.0]]
+
+
+def test_concurrent_requests_are_batched():
+    """Конкурентные encode-вызовы склеиваются в меньшее число forward pass"""
+    encoder = FakeEncoder()
+    batcher = EmbeddingBatcher(encoder, max_batch_size=64, max_wait_ms=200)
+    results = {}
+    start = threading.Barrier(8)
+
+    def worker(i):
+        start.wait()
+        results[i] = batcher.encode(["x" * i, "y" * (i + 10)])
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+    try:
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(timeout=5)
+    finally:
+        batcher.close()
+
+    # Каждый запрос получил именно свои векторы
+    for i in range(8):
+        assert results[i] == [[float(i)], [float(i + 10)]]
+    assert len(encoder.batches) < 8
+    assert sum(len(b) for b in encoder.batches) == 16
+
+
+def test_batch_respects_max_size():
+    encoder = FakeEncoder()
+    batcher = EmbeddingBatcher(encoder, max_batch_size=4, max_wait_ms=200)
+    try:
+        futures = [batcher.submit(["a", "b"]) for _ in range(4)]
+        for f in futures:
+            f.result(timeout=5)
+    finally:
+        batcher.close()
+
+    assert all(len(b) <= 4 for b in encoder.batches)
+
+
+def test_encode_error_propagates_to_all_waiters():
+    def failing(texts):
+        raise RuntimeError("model crashed")
+
+    batcher = EmbeddingBatcher(failing, max_batch_size=8, max_wait_ms=1)
+    try:
+        with pytest.raises(RuntimeError, match="model crashed"):
+            batcher.encode(["a", "b"])
+    finally:
+        batcher.close()
+
+
+def test_submit_after_close_raises():
+    batcher = EmbeddingBatcher(FakeEncoder(), max_batch_size=8, max_wait_ms=1)
+    batcher.close()
+    with pytest.raises(RuntimeError):
+        batcher.submit(["a"])
@@ -0,0 +1,62 @@
+import numpy as np
+from app.services.embedding_cache import EmbeddingCache
+
+
+def _vector(value: float, dim: int = 256) -> np.ndarray:
+    return np.full(dim, value, dtype=np.float32)
+
+
+def test_cache_hit_and_miss_counters():
+    cache = EmbeddingCache("test-model", max_memory_mb=1)
+
+    assert cache.get("code", "fun foo() = 1") is None
+    cache.put("code", "fun foo() = 1", _vector(1.0))
+    np.testing.assert_array_equal(cache.get("code", "fun foo() = 1"), _vector(1.0))
+
+    stats = cache.stats()
+    assert stats["misses"] == 1
+    assert stats["memory_hits"] == 1
+    assert stats["hit_rate"] == 0.5
+
+
+def test_code_and_doc_are_stored_separately():
+    cache = EmbeddingCache("test-model", max_memory_mb=1)
+    cache.put("code", "same text", _vector(1.0))
+
+    assert cache.get("doc", "same text") is None
+
+
+def test_model_name_is_part_of_key(tmp_path):
+    path = str(tmp_path / "embeddings.sqlite")
+    EmbeddingCache("model-a", max_memory_mb=1, disk_path=path).put("code", "text", _vector(1.0))
+
+    assert EmbeddingCache("model-b", max_memory_mb=1, disk_path=path).get("code", "text") is None
+
+
+def test_lru_evicts_by_size_not_entries():
+    # 256 float32 = 1 KB на вектор, лимит ~2.5 KB -> помещаются 2 вектора
+    cache = EmbeddingCache("test-model", max_memory_mb=2.5 / 1024)
+    cache.put("code", "a", _vector(1.0))
+    cache.put("code", "b", _vector(2.0))
+    cache.get("code", "a")  # "a" становится самым свежим
+    cache.put("code", "c", _vector(3.0))
+
+    assert cache.get("code", "b") is None
+    assert cache.get("code", "a") is not None
+    assert cache.get("code", "c") is not None
+    assert cache.stats()["memory_entries"] == 2
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    path = str(tmp_path / "embeddings.sqlite")
+    cache = EmbeddingCache("test-model", max_memory_mb=1, disk_path=path)
+    cache.put("doc", "Returns the sum", _vector(0.5))
+    cache.close()
+
+    restarted = EmbeddingCache("test-model", max_memory_mb=1, disk_path=path)
+    np.testing.assert_array_equal(restarted.get("doc", "Returns the sum"), _vector(0.5))
+    assert restarted.stats()["disk_hits"] == 1
+
+    # После подъёма с диска вектор лежит в памяти
+    restarted.get("doc", "Returns the sum")
+    assert restarted.stats()["memory_hits"] == 1
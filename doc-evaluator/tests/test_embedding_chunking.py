@@ -0,0 +1,58 @@
+import re
+import numpy as np
+from app.services.embedding_chunking import pool_windows, split_into_windows
+
+
+def whitespace_tokenizer(text, add_special_tokens=False, return_offsets_mapping=False):
+    """Токенизатор-заглушка: токен = слово, offsets как у HF fast-токенизатора"""
+    return {"offset_mapping": [(m.start(), m.end()) for m in re.finditer(r"\S+", text)]}
+
+
+def slow_tokenizer(text, add_special_tokens=False, return_offsets_mapping=False):
+    raise NotImplementedError("return_offset_mapping is not available when using Python tokenizers")
+
+
+def _words(n: int) -> str:
+    return " ".join(f"w{i}" for i in range(n))
+
+
+def test_short_text_is_single_window():
+    windows = split_into_windows("fun foo() = 1", whitespace_tokenizer, window_tokens=10, overlap_tokens=2, max_windows=4)
+    assert windows == [("fun foo() = 1", 4)]
+
+
+def test_long_text_is_split_into_overlapping_windows():
+    text = _words(25)
+    windows = split_into_windows(text, whitespace_tokenizer, window_tokens=10, overlap_tokens=3, max_windows=10)
+
+    assert [tokens for _, tokens in windows] == [10, 10, 10, 4]
+    # Окна вырезаются из оригинальной строки и перекрываются на 3 токена
+    assert windows[0][0] == _words(10)
+    assert windows[1][0].split()[:3] == windows[0][0].split()[-3:]
+    # Последнее окно доходит до конца текста
+    assert windows[-1][0].endswith("w24")
+
+
+def test_window_count_is_capped():
+    text = _words(1000)
+    windows = split_into_windows(text, whitespace_tokenizer, window_tokens=10, overlap_tokens=0, max_windows=5)
+
+    assert len(windows) == 5
+    assert windows[0][0].startswith("w0 ")
+    assert windows[-1][0].endswith("w999")
+
+
+def test_tokenizer_without_offsets_falls_back_to_whole_text():
+    text = _words(100)
+    windows = split_into_windows(text, slow_tokenizer, window_tokens=10, overlap_tokens=2, max_windows=4)
+    assert windows == [(text, 10)]
+
+
+def test_pool_windows_weighted_by_tokens():
+    pooled = pool_windows([[1.0, 0.0], [0.0, 1.0]], [3, 1])
+    np.testing.assert_allclose(pooled, [0.75, 0.25])
+
+
+def test_pool_single_window_returns_vector_unchanged():
+    pooled = pool_windows([[0.2, 0.4]], [7])
+    np.testing.assert_allclose(pooled, [0.2, 0.4])
@@ -0,0 +1,72 @@
+import threading
+import time
+import numpy as np
+import pytest
+from app.services.embedding_server import EmbeddingServer, RemoteEmbedder
+from app.services.local_metrics import LocalMetricsService
+
+AUTHKEY = b"test-key"
+
+
+class FakeEmbeddingService:
+    """Вектор = [длина текста, 1.0]; текст 'boom' вызывает ошибку"""
+
+    def embed_texts(self, texts):
+        if "boom" in texts:
+            raise ValueError("encode failed")
+        return [np.array([len(text), 1.0], dtype=np.float32) for text in texts]
+
+
+@pytest.fixture
+def server_address(tmp_path):
+    address = str(tmp_path / "embed.sock")
+    server = EmbeddingServer(FakeEmbeddingService(), address, AUTHKEY)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    client = RemoteEmbedder(address, AUTHKEY)
+    for _ in range(100):
+        try:
+            client.stats()
+            break
+        except ConnectionError:
+            time.sleep(0.01)
+    yield address
+    server.shutdown()
+
+
+def test_remote_embedder_returns_vectors(server_address):
+    vectors = RemoteEmbedder(server_address, AUTHKEY).embed_texts(["abc", "hello"])
+    np.testing.assert_allclose(vectors, [[3.0, 1.0], [5.0, 1.0]])
+
+
+def test_remote_stats_report_server_process(server_address):
+    stats = RemoteEmbedder(server_address, AUTHKEY).stats()
+    assert stats["pid"] > 0
+    assert "rss_mb" in stats
+
+
+def test_server_errors_are_propagated(server_address):
+    client = RemoteEmbedder(server_address, AUTHKEY)
+    with pytest.raises(RuntimeError, match="encode failed"):
+        client.embed_texts(["boom"])
+    # Соединение остаётся рабочим после ошибки
+    assert len(client.embed_texts(["ok"])) == 1
+
+
+def test_unavailable_server_raises_connection_error(tmp_path):
+    with pytest.raises(ConnectionError):
+        RemoteEmbedder(str(tmp_path / "missing.sock"), AUTHKEY).embed_texts(["abc"])
+
+
+def test_local_metrics_delegates_to_remote_embedder(server_address, monkeypatch):
+    """В многопроцессном режиме воркер не грузит модель, а считает similarity через сервер"""
+    monkeypatch.setattr(LocalMetricsService, "__init__", lambda self: None)
+    service = LocalMetricsService.__new__(LocalMetricsService)
+    service.embedder = None
+    service._remote = RemoteEmbedder(server_address, AUTHKEY)
+    service._cache = None
+
+    # [3, 1] и [3, 1] — одинаковая длина, косинус 1
+    assert service.calculate_semantic_similarity("abc", "xyz") == pytest.approx(10.0)
+    assert service.memory_stats()["model_loaded"] is False
+    assert service.memory_stats()["embedding_server"]["pid"] > 0
@@ -0,0 +1,606 @@
+import asyncio
+import json
+import logging
+import sys
+import pytest
+from aiohttp import web
+from types import SimpleNamespace
+from app.core.config import get_settings
+from app.services.llm_judges import (
+    JUDGE_SYSTEM_PROMPT, SCORE_SCHEMA, GeminiJudge, GigaChatJudge, OllamaJudge, QwenJudge, parse_score,
+    render_user_prompt, request_prompt_scope,
+)
+
+
+class FakeGigaChat:
+    """Клиент GigaChat без сети: считает созданные экземпляры и закрытия."""
+
+    instances = []
+
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+        self.calls = 0
+        self.closed = False
+        FakeGigaChat.instances.append(self)
+
+    async def achat(self, payload):
+        self.calls += 1
+        message = SimpleNamespace(content="8")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+    async def aclose(self):
+        self.closed = True
+
+
+@pytest.fixture
+def fake_gigachat(monkeypatch):
+    import gigachat
+
+    FakeGigaChat.instances = []
+    monkeypatch.setattr(gigachat, "GigaChat", FakeGigaChat)
+    monkeypatch.setattr(get_settings(), "GIGACHAT_CREDENTIALS", "credentials")
+    return FakeGigaChat
+
+
+@pytest.mark.asyncio
+async def test_gigachat_client_is_reused_across_calls(fake_gigachat):
+    judge = GigaChatJudge()
+
+    assert fake_gigachat.instances == []  # клиент создаётся лениво
+    for temperature in (0.1, 0.5, 0.9):
+        assert await judge.evaluate("def foo(): pass", "Docs", temperature) == 8.0
+
+    assert len(fake_gigachat.instances) == 1
+    assert fake_gigachat.instances[0].calls == 3
+    assert fake_gigachat.instances[0].kwargs["model"] == get_settings().GIGACHAT_MODEL
+
+
+@pytest.mark.asyncio
+async def test_gigachat_close_releases_client(fake_gigachat):
+    judge = GigaChatJudge()
+    await judge.close()  # без клиента — no-op
+
+    await judge.evaluate("def foo(): pass", "Docs")
+    client = fake_gigachat.instances[0]
+    await judge.close()
+    assert client.closed
+
+    # После close следующий вызов открывает новый клиент
+    await judge.evaluate("def foo(): pass", "Docs")
+    assert len(fake_gigachat.instances) == 2
+
+
+class FakeGenerativeModel:
+    """GenerativeModel без сети: только async API, sync-вызов — ошибка."""
+
+    instances = []
+
+    def __init__(self, model_name, system_instruction=None):
+        self.model_name = model_name
+        self.system_instruction = system_instruction
+        self.temperatures = []
+        FakeGenerativeModel.instances.append(self)
+
+    def generate_content(self, *args, **kwargs):
+        raise AssertionError("blocking generate_content must not be used")
+
+    async def generate_content_async(self, prompt, generation_config):
+        self.temperatures.append(generation_config.temperature)
+        self.generation_config = generation_config
+        # Кандидат n — оценка 9 - n; text, как и в SDK, только у ответа с одним кандидатом
+        candidates = [
+            SimpleNamespace(content=SimpleNamespace(parts=[SimpleNamespace(text='{"score": '), SimpleNamespace(text=f'{9 - i}}}')]))
+            for i in range(generation_config.candidate_count or 1)
+        ]
+        return SimpleNamespace(candidates=candidates)
+
+
+@pytest.mark.asyncio
+async def test_gemini_reuses_model_and_uses_async_api(monkeypatch):
+    monkeypatch.setattr(get_settings(), "GEMINI_API_KEY", "key")
+    FakeGenerativeModel.instances = []
+    judge = GeminiJudge()
+    judge._genai = SimpleNamespace(
+        GenerativeModel=FakeGenerativeModel,
+        types=SimpleNamespace(GenerationConfig=lambda **config: SimpleNamespace(**config)),
+    )
+
+    for temperature in (0.1, 0.7):
+        assert await judge.evaluate("def foo(): pass", "Docs", temperature) == 9.0
+
+    assert len(FakeGenerativeModel.instances) == 1
+    assert FakeGenerativeModel.instances[0].model_name == get_settings().GEMINI_MODEL
+    assert FakeGenerativeModel.instances[0].temperatures == [0.1, 0.7]
+    assert FakeGenerativeModel.instances[0].system_instruction == JUDGE_SYSTEM_PROMPT
+    config = FakeGenerativeModel.instances[0].generation_config
+    assert config.response_schema == SCORE_SCHEMA
+    assert config.max_output_tokens == get_settings().JUDGE_MAX_OUTPUT_TOKENS
+    assert config.candidate_count is None
+
+
+@pytest.mark.asyncio
+async def test_gemini_samples_come_from_one_call(monkeypatch):
+    monkeypatch.setattr(get_settings(), "GEMINI_API_KEY", "key")
+    FakeGenerativeModel.instances = []
+    judge = GeminiJudge()
+    judge._genai = SimpleNamespace(
+        GenerativeModel=FakeGenerativeModel,
+        types=SimpleNamespace(GenerationConfig=lambda **config: SimpleNamespace(**config)),
+    )
+
+    assert await judge.evaluate_samples("def foo(): pass", "Docs", 0.5, n=3) == [9.0, 8.0, 7.0]
+    assert FakeGenerativeModel.instances[0].temperatures == [0.5]
+    assert FakeGenerativeModel.instances[0].generation_config.candidate_count == 3
+
+
+@pytest.fixture
+async def dashscope_stand_in():
+    """
+    Локальный OpenAI-совместимый /chat/completions; запоминает заголовки и тела запросов.
+    Ответы (статус, заголовки) из списка statuses отдаются первыми, затем — 200 с оценкой.
+    """
+    requests = []
+    statuses = []
+
+    async def chat(request: web.Request) -> web.Response:
+        requests.append((request.headers.get("Authorization"), await request.json()))
+        if statuses:
+            status, headers = statuses.pop(0)
+            return web.Response(status=status, text="slow down", headers=headers)
+        # Выборка i — оценка 7 - i
+        choices = [
+            {"index": i, "message": {"role": "assistant", "content": f'{{"score": {7 - i}}}'}}
+            for i in range(requests[-1][1].get("n", 1))
+        ]
+        return web.json_response({"choices": choices})
+
+    app = web.Application()
+    app.router.add_post("/compatible-mode/v1/chat/completions", chat)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = runner.addresses[0][1]
+    yield f"http://127.0.0.1:{port}/compatible-mode/v1", requests, statuses
+    await runner.cleanup()
+
+
+@pytest.mark.asyncio
+async def test_qwen_uses_openai_compatible_endpoint(dashscope_stand_in, monkeypatch):
+    base_url, requests, _ = dashscope_stand_in
+    settings = get_settings()
+    monkeypatch.setattr(settings, "QWEN_API_KEY", "sk-judge")
+    monkeypatch.setattr(settings, "QWEN_BASE_URL", base_url)
+
+    judge = QwenJudge()
+    try:
+        assert await judge.evaluate("def foo(): pass", "Docs", 0.5) == 7.0
+    finally:
+        await judge.close()
+
+    authorization, body = requests[0]
+    assert authorization == "Bearer sk-judge"
+    assert body["model"] == settings.QWEN_MODEL
+    assert body["temperature"] == 0.5
+    assert [message["role"] for message in body["messages"]] == ["system", "user"]
+    assert body["response_format"] == {"type": "json_object"}
+    assert body["max_tokens"] == settings.JUDGE_MAX_OUTPUT_TOKENS
+    assert "n" not in body
+    assert "dashscope" not in sys.modules  # глобальный dashscope.api_key больше не используется
+
+
+@pytest.mark.asyncio
+async def test_qwen_samples_rounds_in_one_call_and_caches_each(dashscope_stand_in, monkeypatch, tmp_path):
+    from app.services.verdict_cache import VerdictCache
+
+    base_url, requests, _ = dashscope_stand_in
+    settings = get_settings()
+    monkeypatch.setattr(settings, "QWEN_API_KEY", "sk-judge")
+    monkeypatch.setattr(settings, "QWEN_BASE_URL", base_url)
+    code, doc = "def foo(): pass", "Docs"
+
+    judge = QwenJudge()
+    judge._verdict_cache = VerdictCache(str(tmp_path / "verdicts.db"), ttl_seconds=3600, max_entries=100)
+    try:
+        assert await judge.guarded_evaluate_samples(code, doc, [0.1, 0.3, 0.5]) == [7.0, 6.0, 5.0]
+        # Повтор тех же раундов — из кэша, без вызова провайдера
+        assert await judge.guarded_evaluate_samples(code, doc, [0.1, 0.3, 0.5]) == [7.0, 6.0, 5.0]
+        assert len(requests) == 1
+        _, body = requests[0]
+        assert body["n"] == 3
+        assert body["temperature"] == pytest.approx(0.3)
+
+        # Выборки при t=0.3 не выдаются за оценку отдельного раунда при t=0.1
+        assert await judge.guarded_evaluate(code, "Other docs", temperature=0.1) == 7.0
+        assert await judge.guarded_evaluate(code, doc, temperature=0.1) == 7.0
+        assert len(requests) == 3
+        assert requests[2][1]["temperature"] == 0.1
+
+        # Раунд t=0.1 теперь в кэше — вызов только для остальных, при их средней температуре
+        assert await judge.guarded_evaluate_samples(code, "Other docs", [0.1, 0.3, 0.5]) == [7.0, 7.0, 6.0]
+        _, body = requests[3]
+        assert body["n"] == 2
+        assert body["temperature"] == pytest.approx(0.4)
+    finally:
+        await judge.close()
+        judge._verdict_cache.close()
+
+
+@pytest.mark.asyncio
+async def test_short_sample_batch_counts_missing_rounds_as_failed(monkeypatch, caplog):
+    """Провайдер вернул меньше выборок, чем просили, — недостающие раунды не выдумываются"""
+    judge = QwenJudge()
+    judge._verdict_cache = None
+
+    async def evaluate_samples(code, doc, temperature, n):
+        return [7.0]
+
+    monkeypatch.setattr(judge, "evaluate_samples", evaluate_samples)
+    with caplog.at_level(logging.WARNING, logger="app.services.llm_judges"):
+        assert await judge.guarded_evaluate_samples("def foo(): pass", "Docs", [0.1, 0.3, 0.5]) == [7.0]
+    assert "returned 1 of 3 samples" in caplog.text
+
+
+@pytest.mark.asyncio
+async def test_qwen_error_responses_open_the_breaker(dashscope_stand_in, monkeypatch):
+    from app.services.circuit_breaker import CircuitOpenError
+
+    base_url, requests, statuses = dashscope_stand_in
+    settings = get_settings()
+    monkeypatch.setattr(settings, "QWEN_API_KEY", "sk-judge")
+    monkeypatch.setattr(settings, "QWEN_BASE_URL", base_url)
+
+    judge = QwenJudge()
+    statuses.extend([(500, {})] * judge.breaker.failure_threshold)
+    try:
+        for _ in range(judge.breaker.failure_threshold):
+            assert await judge.guarded_evaluate("def foo(): pass", "Docs") is None
+        with pytest.raises(CircuitOpenError):
+            await judge.guarded_evaluate("def foo(): pass", "Docs")
+    finally:
+        await judge.close()
+
+    assert judge.breaker.state == "open"
+    assert len(requests) == judge.breaker.failure_threshold
+
+
+@pytest.mark.asyncio
+async def test_overloaded_provider_is_retried_and_reported_to_bulkhead(dashscope_stand_in, monkeypatch):
+    import app.services.llm_judges as llm_judges
+
+    base_url, requests, statuses = dashscope_stand_in
+    statuses.extend([(429, {}), (503, {})])
+    settings = get_settings()
+    monkeypatch.setattr(settings, "QWEN_API_KEY", "sk-judge")
+    monkeypatch.setattr(settings, "QWEN_BASE_URL", base_url)
+    monkeypatch.setattr(llm_judges, "RETRY_DELAY_SECONDS", 0.0)
+
+    judge = QwenJudge()
+    try:
+        assert await judge.evaluate("def foo(): pass", "Docs") == 7.0
+    finally:
+        await judge.close()
+
+    assert len(requests) == 3
+    assert judge.bulkhead.snapshot()["overloads"] == 2
+    assert judge.bulkhead.in_flight == 0
+    assert judge.breaker.state == "closed"
+
+
+@pytest.mark.asyncio
+async def test_retry_after_replaces_fixed_backoff(dashscope_stand_in, monkeypatch):
+    import app.services.llm_judges as llm_judges
+
+    base_url, requests, statuses = dashscope_stand_in
+    statuses.append((429, {"Retry-After": "0.2"}))
+    settings = get_settings()
+    monkeypatch.setattr(settings, "QWEN_API_KEY", "sk-judge")
+    monkeypatch.setattr(settings, "QWEN_BASE_URL", base_url)
+    monkeypatch.setattr(llm_judges, "RETRY_DELAY_SECONDS", 30.0)  # backoff не должен использоваться
+
+    judge = QwenJudge()
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    try:
+        assert await judge.evaluate("def foo(): pass", "Docs") == 7.0
+    finally:
+        await judge.close()
+
+    assert 0.15 <= loop.time() - started < 5
+    assert len(requests) == 2
+    assert judge.rate_limiter.snapshot()["pauses"] == 1
+
+
+@pytest.mark.asyncio
+async def test_retry_after_beyond_deadline_gives_up_without_retrying(dashscope_stand_in, monkeypatch):
+    base_url, requests, statuses = dashscope_stand_in
+    statuses.append((429, {"Retry-After": "3600"}))
+    settings = get_settings()
+    monkeypatch.setattr(settings, "QWEN_API_KEY", "sk-judge")
+    monkeypatch.setattr(settings, "QWEN_BASE_URL", base_url)
+
+    judge = QwenJudge()
+    try:
+        assert await judge.evaluate("def foo(): pass", "Docs") is None
+    finally:
+        await judge.close()
+
+    assert len(requests) == 1
+    assert judge.rate_limiter.snapshot()["paused_for_seconds"] > 3000
+
+
+def test_prompt_puts_static_rubric_before_code_and_doc():
+    code, doc = "def foo(): pass", "Docs"
+    user_prompt = render_user_prompt(code, doc)
+
+    assert "{code}" not in JUDGE_SYSTEM_PROMPT and "{doc}" not in JUDGE_SYSTEM_PROMPT
+    assert user_prompt.endswith("```")
+    assert code in user_prompt and doc in user_prompt
+
+
+@pytest.mark.asyncio
+async def test_user_prompt_is_rendered_once_per_request():
+    code, doc = "def foo(): pass", "Docs"
+
+    async def judge_call():
+        return render_user_prompt(code, doc)
+
+    with request_prompt_scope():
+        first = render_user_prompt(code, doc)
+        # Задачи судей и раундов наследуют область запроса
+        assert all(prompt is first for prompt in await asyncio.gather(judge_call(), judge_call()))
+
+    # После запроса текст не удерживается процессом
+    with request_prompt_scope():
+        assert render_user_prompt(code, doc) is not first
+    assert render_user_prompt(code, doc) is not render_user_prompt(code, doc)
+
+
+def test_ollama_num_ctx_grows_in_powers_of_two(monkeypatch):
+    settings = get_settings()
+    monkeypatch.setattr(settings, "OLLAMA_NUM_CTX_MIN", 4096)
+    monkeypatch.setattr(settings, "OLLAMA_NUM_CTX_MAX", 32768)
+
+    def num_ctx(chars: int, judge: OllamaJudge) -> int:
+        return judge._num_ctx([{"role": "user", "content": "x" * chars}])
+
+    assert num_ctx(1000, OllamaJudge()) == 4096
+    assert num_ctx(20_000, OllamaJudge()) == 8192
+    assert num_ctx(60_000, OllamaJudge()) == 32768
+    assert num_ctx(1_000_000, OllamaJudge()) == 32768
+
+
+def test_ollama_num_ctx_never_shrinks_for_a_model(monkeypatch):
+    """Смена num_ctx — перезагрузка модели в Ollama: после длинного промпта окно не уменьшается"""
+    settings = get_settings()
+    monkeypatch.setattr(settings, "OLLAMA_NUM_CTX_MIN", 4096)
+    monkeypatch.setattr(settings, "OLLAMA_NUM_CTX_MAX", 32768)
+    judge = OllamaJudge()
+
+    def num_ctx(chars: int) -> int:
+        return judge._num_ctx([{"role": "user", "content": "x" * chars}])
+
+    assert num_ctx(1000) == 4096
+    assert num_ctx(20_000) == 8192
+    assert num_ctx(1000) == 8192
+
+    monkeypatch.setattr(settings, "OLLAMA_MODEL", "llama3")
+    assert num_ctx(1000) == 4096  # у другой модели своё окно
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('{"score": 7.5}', 7.5),
+    ('{"score": "8"}', 8.0),
+    ('  {"score": 10}\n', 10.0),
+    ("6", 6.0),
+    ("Оценка: 4.5 из 10", 4.5),
+    ('{"score": 7', 7.0),  # ответ обрезан лимитом токенов
+    ('{"score": 11}', None),
+    ('{"score": -1}', None),
+    ('{"score": true}', None),
+    ('{"score": NaN}', None),
+    ("без оценки", None),
+    ("", None),
+    (None, None),
+])
+def test_parse_score(text, expected):
+    assert parse_score(text) == expected
+
+
+@pytest.fixture
+async def ollama_stream_stand_in():
+    """Стриминговый /api/chat: отдаёт чанки с паузой и отмечает, что клиент оборвал поток."""
+    state = {"chunks": [], "payloads": [], "aborted": False}
+
+    async def chat(request: web.Request) -> web.StreamResponse:
+        state["payloads"].append(await request.json())
+        response = web.StreamResponse()
+        await response.prepare(request)
+        try:
+            for content in state["chunks"]:
+                await response.write(json.dumps({"message": {"content": content}, "done": False}).encode() + b"\n")
+                await asyncio.sleep(0.05)
+            await response.write(json.dumps({"message": {"content": ""}, "done": True}).encode() + b"\n")
+        except (ConnectionResetError, asyncio.CancelledError):
+            state["aborted"] = True
+            raise
+        return response
+
+    app = web.Application()
+    app.router.add_post("/api/chat", chat)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    state["host"] = f"http://127.0.0.1:{runner.addresses[0][1]}"
+    yield state
+    await runner.cleanup()
+
+
+@pytest.mark.asyncio
+async def test_ollama_stream_stops_at_first_complete_score(ollama_stream_stand_in, monkeypatch):
+    state = ollama_stream_stand_in
+    # Число приходит по частям, затем модель «болтает» ещё 40 чанков (~2 с)
+    state["chunks"] = ['{"score": ', "7", ".5", "}"] + [" пояснение"] * 40
+    settings = get_settings()
+    monkeypatch.setattr(settings, "OLLAMA_HOST", state["host"])
+    monkeypatch.setattr(settings, "OLLAMA_STREAMING", True)
+
+    judge = OllamaJudge()
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    try:
+        assert await judge.evaluate("def foo(): pass", "Docs") == 7.5
+    finally:
+        await judge.close()
+    assert loop.time() - started < 1.0
+    assert state["payloads"][0]["stream"] is True
+
+    for _ in range(40):  # сервер узнаёт об обрыве на следующей записи
+        if state["aborted"]:
+            break
+        await asyncio.sleep(0.05)
+    assert state["aborted"]
+
+
+@pytest.mark.asyncio
+async def test_ollama_stream_parses_score_at_end_of_stream(ollama_stream_stand_in, monkeypatch):
+    state = ollama_stream_stand_in
+    state["chunks"] = ["Оценка: ", "8"]  # число без завершающего символа — до done
+    settings = get_settings()
+    monkeypatch.setattr(settings, "OLLAMA_HOST", state["host"])
+    monkeypatch.setattr(settings, "OLLAMA_STREAMING", True)
+
+    judge = OllamaJudge()
+    try:
+        assert await judge.evaluate("def foo(): pass", "Docs") == 8.0
+    finally:
+        await judge.close()
+
+
+@pytest.fixture
+async def ollama_replicas():
+    """Фабрика нестриминговых реплик /api/chat с заданной задержкой ответа (и статусом, если не 200)."""
+    runners, servers = [], []
+
+    async def start(delay: float, status: int = 200) -> dict:
+        server = {"requests": 0}
+
+        async def chat(request: web.Request) -> web.Response:
+            server["requests"] += 1
+            await request.read()
+            await asyncio.sleep(delay)
+            if status != 200:
+                return web.Response(status=status, text="internal error")
+            return web.json_response({"message": {"content": '{"score": 6}'}, "done": True})
+
+        app = web.Application()
+        app.router.add_post("/api/chat", chat)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        server["url"] = f"http://127.0.0.1:{runner.addresses[0][1]}"
+        runners.append(runner)
+        servers.append(server)
+        return server
+
+    yield start
+    for runner in runners:
+        await runner.cleanup()
+
+
+@pytest.mark.asyncio
+async def test_ollama_routes_to_least_loaded_replica(ollama_replicas, monkeypatch):
+    first, second = await ollama_replicas(0.2), await ollama_replicas(0.2)
+    settings = get_settings()
+    monkeypatch.setattr(settings, "OLLAMA_HOST", f"{first['url']},{second['url']}/v1")
+    monkeypatch.setitem(settings.JUDGE_CONCURRENCY_LIMITS, "ollama", 4)
+
+    judge = OllamaJudge()
+    try:
+        scores = await asyncio.gather(*(judge.evaluate("def foo(): pass", "Docs", t) for t in (0.1, 0.3, 0.5, 0.7)))
+    finally:
+        await judge.close()
+
+    assert scores == [6.0] * 4
+    assert first["requests"] == second["requests"] == 2
+
+
+@pytest.mark.asyncio
+async def test_ollama_hedges_slow_replica(ollama_replicas, monkeypatch):
+    slow, fast = await ollama_replicas(3.0), await ollama_replicas(0.01)
+    settings = get_settings()
+    monkeypatch.setattr(settings, "OLLAMA_HOST", f"{slow['url']},{fast['url']}")
+    monkeypatch.setattr(settings, "OLLAMA_HEDGING", True)
+    monkeypatch.setattr(settings, "OLLAMA_HEDGE_MIN_SAMPLES", 5)
+
+    judge = OllamaJudge()
+    slow_replica = judge.replicas.replicas[0]
+    slow_replica._latencies.extend([0.1] * 5)  # обычно эта реплика отвечает за 0.1 с
+
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    try:
+        assert await judge.evaluate("def foo(): pass", "Docs") == 6.0
+    finally:
+        await judge.close()
+
+    assert loop.time() - started < 1.5
+    assert slow["requests"] == fast["requests"] == 1
+    assert slow_replica.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_ollama_hedge_needs_a_free_bulkhead_slot(ollama_replicas, monkeypatch):
+    """Дубль не выходит за лимит bulkhead: при занятом слоте ждём медленную реплику"""
+    slow, fast = await ollama_replicas(0.5), await ollama_replicas(0.01)
+    settings = get_settings()
+    monkeypatch.setattr(settings, "OLLAMA_HOST", f"{slow['url']},{fast['url']}")
+    monkeypatch.setattr(settings, "OLLAMA_HEDGING", True)
+    monkeypatch.setattr(settings, "OLLAMA_HEDGE_MIN_SAMPLES", 5)
+    monkeypatch.setitem(settings.JUDGE_CONCURRENCY_LIMITS, "ollama", 1)
+
+    judge = OllamaJudge()
+    judge.replicas.replicas[0]._latencies.extend([0.1] * 5)
+    try:
+        assert await judge.evaluate("def foo(): pass", "Docs") == 6.0
+    finally:
+        await judge.close()
+
+    assert slow["requests"] == 1
+    assert fast["requests"] == 0
+    assert judge.bulkhead.snapshot()["in_flight"] == 0
+
+
+def test_ollama_concurrency_limit_scales_with_replicas(monkeypatch):
+    settings = get_settings()
+    monkeypatch.setattr(settings, "OLLAMA_HOST", "http://a:11434/v1,http://b:11434/v1,http://c:11434/v1")
+    monkeypatch.setattr(settings, "OLLAMA_CONCURRENCY_PER_REPLICA", 2)
+    monkeypatch.setattr(settings, "JUDGE_CONCURRENCY_LIMITS", {})
+    assert OllamaJudge().bulkhead.max_limit == 6
+
+    monkeypatch.setattr(settings, "JUDGE_CONCURRENCY_LIMITS", {"ollama": 3})
+    assert OllamaJudge().bulkhead.max_limit == 3
+
+
+@pytest.mark.asyncio
+async def test_ollama_error_responses_open_the_breaker(ollama_replicas, monkeypatch):
+    """Эндпоинт, отвечающий 500, — сбой провайдера, а не здоровый ответ без оценки"""
+    from app.services.circuit_breaker import CircuitOpenError
+
+    server = await ollama_replicas(0.0, status=500)
+    monkeypatch.setattr(get_settings(), "OLLAMA_HOST", f"{server['url']}/v1")
+
+    judge = OllamaJudge()
+    try:
+        for _ in range(judge.breaker.failure_threshold):
+            assert await judge.guarded_evaluate("def foo(): pass", "Docs") is None
+        with pytest.raises(CircuitOpenError):
+            await judge.guarded_evaluate("def foo(): pass", "Docs")
+    finally:
+        await judge.close()
+
+    assert judge.breaker.state == "open"
+    assert server["requests"] == judge.breaker.failure_threshold  # 500 не повторяется
+    assert judge.bulkhead.snapshot()["overloads"] == 0
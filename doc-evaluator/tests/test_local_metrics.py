@@ -94,3 +94,111 @@ def test_calculate_readability_empty(local_service):
 def test_calculate_readability_blank(local_service):
     score = local_service.calculate_readability("   ")
     assert score == LocalMetricsService.DEFAULT_READABILITY_SCORE
+
+
+# --- calculate_semantic_similarity + embedding cache ---
+
+def test_semantic_similarity_reuses_cached_code_embedding(local_service):
+    """Повторный запрос с тем же кодом не должен заново энкодить код"""
+    import numpy as np
+    from unittest.mock import MagicMock
+    from app.services.embedding_cache import EmbeddingCache
+
+    local_service.embedder = MagicMock()
+    local_service.embedder.encode.side_effect = lambda texts: np.ones((len(texts), 8), dtype=np.float32)
+    local_service._remote = None
+    local_service._batcher = None
+    local_service._window_tokens = None
+    local_service._cache = EmbeddingCache("test-model", max_memory_mb=1)
+
+    code = "fun sum(a: Int, b: Int) = a + b"
+    first = local_service.calculate_semantic_similarity(code, "Adds two numbers")
+    second = local_service.calculate_semantic_similarity(code, "Returns the sum of a and b")
+
+    assert first == second == pytest.approx(10.0)
+    encoded = [call.args[0] for call in local_service.embedder.encode.call_args_list]
+    assert encoded == [[code, "Adds two numbers"], ["Returns the sum of a and b"]]
+    assert local_service.embedding_cache_stats()["memory_hits"] == 1
+
+
+def test_semantic_similarity_encodes_long_code_in_windows(local_service):
+    """Длинный код режется на окна, окна кода и документации уходят в один encode"""
+    import re
+    import numpy as np
+    from unittest.mock import MagicMock
+
+    local_service.embedder = MagicMock()
+    local_service.embedder.tokenizer = lambda text, **kwargs: {
+        "offset_mapping": [(m.start(), m.end()) for m in re.finditer(r"\S+", text)]
+    }
+    local_service.embedder.encode.side_effect = lambda texts: np.ones((len(texts), 8), dtype=np.float32)
+    local_service._remote = None
+    local_service._batcher = None
+    local_service._cache = None
+    local_service._window_tokens = 10
+    local_service._overlap_tokens = 2
+    local_service._max_windows = 16
+
+    code = " ".join(f"token{i}" for i in range(30))
+    score = local_service.calculate_semantic_similarity(code, "Short documentation")
+
+    assert score == pytest.approx(10.0)
+    encoded = local_service.embedder.encode.call_args.args[0]
+    assert len(encoded) == 5  # 4 окна кода + 1 документации
+    assert encoded[-1] == "Short documentation"
+
+
+def test_coverage_details_per_identifier(local_service):
+    code = "fun findUser(userId: Long) = repository.findById(userId)"
+    doc = "findUser loads a user by userId"
+
+    details = local_service.coverage_details(code, doc)
+
+    assert details == {"Long": 0, "findById": 0, "findUser": 1, "repository": 0, "userId": 1}
+    assert local_service.calculate_coverage(code, doc) == 4.0
+
+
+def test_semantic_similarity_batch_single_encode(local_service):
+    """Батч пар энкодится одним вызовом; одинаковая документация энкодится один раз"""
+    import numpy as np
+    from unittest.mock import MagicMock
+
+    local_service.embedder = MagicMock()
+    local_service.embedder.encode.side_effect = lambda texts: np.ones((len(texts), 8), dtype=np.float32)
+    local_service._remote = None
+    local_service._batcher = None
+    local_service._window_tokens = None
+    local_service._cache = None
+
+    pairs = [("fun a() = 1", "Same doc"), ("fun b() = 2", "Same doc"), ("", "Blank code")]
+    scores = local_service.calculate_semantic_similarity_batch(pairs)
+
+    assert scores == [pytest.approx(10.0), pytest.approx(10.0), 0.0]
+    local_service.embedder.encode.assert_called_once_with(["fun a() = 1", "Same doc", "fun b() = 2"])
+
+
+def test_embedding_cache_key_includes_chunking_parameters(monkeypatch):
+    """Смена параметров чанкинга не должна отдавать векторы, посчитанные со старыми"""
+    from app.core.config import get_settings
+
+    settings = get_settings()
+    monkeypatch.setattr(settings, "EMBEDDING_SERVER_ADDRESS", "127.0.0.1:0")  # без загрузки модели
+    monkeypatch.setattr(settings, "EMBEDDING_SERVER_AUTHKEY", "secret")
+    monkeypatch.setattr(settings, "EMBEDDING_CACHE_ENABLED", True)
+
+    def cache_key(**overrides):
+        for name, value in overrides.items():
+            monkeypatch.setattr(settings, name, value)
+        return LocalMetricsService()._cache.model_name
+
+    keys = {
+        cache_key(EMBEDDING_CHUNKING_ENABLED=False),
+        cache_key(EMBEDDING_CHUNKING_ENABLED=True, EMBEDDING_CHUNK_OVERLAP_TOKENS=64, EMBEDDING_MAX_WINDOWS=16),
+        cache_key(EMBEDDING_CHUNK_OVERLAP_TOKENS=32),
+        cache_key(EMBEDDING_MAX_WINDOWS=4),
+    }
+    assert len(keys) == 4
+
+    local_service = LocalMetricsService.__new__(LocalMetricsService)
+    local_service._window_tokens = 510
+    assert "window=510" in local_service._chunking_signature(settings)
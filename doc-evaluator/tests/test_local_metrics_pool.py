@@ -0,0 +1,123 @@
+import asyncio
+import threading
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from app.core.config import get_settings
+from app.services.local_metrics import LocalMetricsService
+from app.services.local_metrics_pool import LocalMetricsPool, LocalMetricsOverloadedError
+
+
+@pytest.fixture
+def service():
+    mock_service = MagicMock(spec=LocalMetricsService)
+    mock_service.calculate_semantic_similarity.return_value = 6.0
+    mock_service.calculate_coverage.return_value = 7.0
+    mock_service.calculate_readability.return_value = 8.0
+    return mock_service
+
+
+@pytest.mark.asyncio
+async def test_pool_computes_all_metrics(service):
+    pool = LocalMetricsPool(service)
+    try:
+        result = await pool.submit("def foo(): pass", "Documentation for foo")
+    finally:
+        pool.shutdown()
+
+    assert result == (6.0, 7.0, 8.0)
+    service.calculate_semantic_similarity.assert_called_once_with("def foo(): pass", "Documentation for foo")
+    service.calculate_readability.assert_called_once_with("Documentation for foo")
+
+
+@pytest.mark.asyncio
+async def test_pool_runs_off_event_loop_thread(service):
+    """Расчёт должен выполняться в потоке пула, а не в потоке event loop"""
+    worker_threads = []
+    service.calculate_semantic_similarity.side_effect = (
+        lambda code, doc: worker_threads.append(threading.current_thread().name) or 6.0
+    )
+
+    pool = LocalMetricsPool(service)
+    try:
+        await pool.submit("def foo(): pass", "Documentation for foo")
+    finally:
+        pool.shutdown()
+
+    assert worker_threads[0] != threading.current_thread().name
+    assert worker_threads[0].startswith("local-metrics")
+
+
+@pytest.mark.asyncio
+async def test_pool_rejects_when_queue_full(service, monkeypatch):
+    """При переполнении очереди submit бросает LocalMetricsOverloadedError, после освобождения — снова принимает"""
+    monkeypatch.setattr(get_settings(), "LOCAL_METRICS_QUEUE_DEPTH", 1)
+    release = threading.Event()
+    service.calculate_semantic_similarity.side_effect = lambda code, doc: release.wait(5) and 6.0
+
+    pool = LocalMetricsPool(service)
+    try:
+        first = pool.submit("def foo(): pass", "Documentation for foo")
+        assert pool.pending == 1
+
+        with pytest.raises(LocalMetricsOverloadedError):
+            pool.submit("def bar(): pass", "Documentation for bar")
+
+        release.set()
+        await first
+        await asyncio.sleep(0)
+        assert pool.pending == 0
+
+        second = await pool.submit("def bar(): pass", "Documentation for bar")
+        assert second == (6.0, 7.0, 8.0)
+    finally:
+        pool.shutdown()
+
+
+def test_evaluate_endpoint_overloaded_returns_503(client):
+    """Переполненный пул локальных метрик превращается в 503, а не в 500"""
+    from app.main import app, get_orchestrator
+
+    orchestrator = MagicMock()
+    orchestrator.evaluate = AsyncMock(side_effect=LocalMetricsOverloadedError("Local metrics queue is full"))
+    app.dependency_overrides[get_orchestrator] = lambda: orchestrator
+    try:
+        response = client.post(
+            "/evaluate",
+            json={"code_snippet": "def foo(): pass", "generated_doc": "Documentation for foo"}
+        )
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 503
+
+
+@pytest.mark.parametrize("mode, expected", [("thread", 8), ("process", 2)])
+def test_default_pool_size_depends_on_mode(mode, expected, monkeypatch):
+    """Каждый процесс держит свою копию модели — по умолчанию процессов не больше двух"""
+    import os
+
+    monkeypatch.setattr(os, "cpu_count", lambda: 16)
+    monkeypatch.setattr(get_settings(), "LOCAL_METRICS_EXECUTOR", mode)
+    monkeypatch.setattr(get_settings(), "LOCAL_METRICS_POOL_SIZE", None)
+    pool = LocalMetricsPool()
+    pool.shutdown()
+    assert pool.pool_size == expected
+
+    monkeypatch.setattr(get_settings(), "LOCAL_METRICS_POOL_SIZE", 3)
+    pool = LocalMetricsPool()
+    pool.shutdown()
+    assert pool.pool_size == 3
+
+
+def test_process_worker_loads_model_without_batcher(monkeypatch):
+    """В процессе-воркере один поток — micro-batching только добавлял бы ожидание"""
+    from app.services import local_metrics_pool
+
+    created = []
+    monkeypatch.setattr(LocalMetricsService, "__init__", lambda self, **kwargs: created.append(kwargs))
+    monkeypatch.setattr(LocalMetricsService, "_instance", None)
+
+    local_metrics_pool._init_process_worker()
+
+    assert created == [{"use_batcher": False}]
+    assert LocalMetricsService._instance is not None
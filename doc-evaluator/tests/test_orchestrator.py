@@ -77,3 +77,283 @@ async def test_evaluate_weighted_formula(mock_local_metrics, mock_llm_judges):
 
     # 10*0.15 + 10*0.15 + 10*0.1 + 10*0.6 = 10.0
     assert response.final_score == 10.0
+
+
+@pytest.mark.asyncio
+async def test_evaluate_batch_bounds_judge_fan_out(mock_local_metrics, mock_llm_judges, monkeypatch):
+    """Не больше EVALUATE_BATCH_CONCURRENCY пар одновременно опрашивают судей"""
+    import asyncio
+    from app.core.config import get_settings
+
+    monkeypatch.setattr(get_settings(), "EVALUATE_BATCH_CONCURRENCY", 2)
+    in_flight, peak = set(), 0
+
+    async def slow_judge(code, doc, temperature=0.1):
+        nonlocal peak
+        in_flight.add(code)
+        peak = max(peak, len(in_flight))
+        await asyncio.sleep(0.01)
+        in_flight.discard(code)
+        return 8.0
+
+    mock_llm_judges["gigachat"].side_effect = slow_judge
+
+    orchestrator = EvaluationOrchestrator()
+    requests = [
+        EvaluateRequest(code_snippet=f"def foo{i}(): pass", generated_doc=f"Documentation {i}")
+        for i in range(6)
+    ]
+    results = [item async for item in orchestrator.evaluate_batch(requests)]
+
+    assert sorted(index for index, _, _ in results) == list(range(6))
+    assert all(error is None and response.llm_scores.gigachat == 8.0 for _, response, error in results)
+    assert peak == 2
+    mock_local_metrics.calculate_semantic_similarity_batch.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_deadline_keeps_partial_scores(mock_local_metrics, mock_llm_judges, monkeypatch):
+    """Зависший судья отменяется по дедлайну, оценки остальных сохраняются"""
+    import asyncio
+    from app.core.config import get_settings
+
+    monkeypatch.setattr(get_settings(), "JUDGE_DEADLINE_SECONDS", 0.05)
+    cancelled = asyncio.Event()
+
+    async def hanging_judge(code, doc, temperature=0.1):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    mock_llm_judges["ollama"].side_effect = hanging_judge
+
+    orchestrator = EvaluationOrchestrator()
+    request = EvaluateRequest(code_snippet="def foo(): pass", generated_doc="Documentation for foo")
+    response = await orchestrator.evaluate(request)
+
+    assert response.timed_out_judges == ["ollama"]
+    assert response.llm_scores.ollama is None
+    assert response.llm_scores.gigachat == 8.5
+    assert response.llm_scores.qwen == 7.5
+    assert response.confidence_score > 0  # не откатились на одни локальные метрики
+    assert cancelled.is_set()
+
+
+@pytest.mark.asyncio
+async def test_open_breaker_skips_judge(mock_local_metrics, mock_llm_judges):
+    """Судья с открытым circuit breaker не вызывается и попадает в skipped_judges"""
+    orchestrator = EvaluationOrchestrator()
+    ollama = dict(orchestrator.judges)["ollama"]
+    for _ in range(ollama.breaker.failure_threshold):
+        ollama.breaker.record_failure()
+
+    request = EvaluateRequest(code_snippet="def foo(): pass", generated_doc="Documentation for foo")
+    response = await orchestrator.evaluate(request)
+
+    mock_llm_judges["ollama"].assert_not_called()
+    assert response.skipped_judges == ["ollama"]
+    assert response.llm_scores.ollama is None
+    assert response.llm_scores.gemini == 9.0
+
+
+@pytest.mark.asyncio
+async def test_deadline_timeout_counts_as_breaker_failure(mock_local_metrics, mock_llm_judges, monkeypatch):
+    import asyncio
+    from app.core.config import get_settings
+
+    monkeypatch.setattr(get_settings(), "JUDGE_DEADLINE_SECONDS", 0.05)
+
+    orchestrator = EvaluationOrchestrator()
+    gemini = dict(orchestrator.judges)["gemini"]
+
+    async def hanging_judge(code, doc, temperature=0.1):
+        # Через _retry_evaluate: вызов занимает слот bulkhead, т.е. висит у провайдера
+        return await gemini._retry_evaluate(lambda: asyncio.sleep(10))
+
+    mock_llm_judges["gemini"].side_effect = hanging_judge
+
+    await orchestrator.evaluate(EvaluateRequest(code_snippet="def foo(): pass", generated_doc="Documentation"))
+
+    assert dict(orchestrator.judges)["gemini"].breaker.snapshot()["consecutive_failures"] == 1
+
+
+@pytest.mark.asyncio
+async def test_deadline_does_not_charge_calls_queued_in_bulkhead(mock_local_metrics, mock_llm_judges, monkeypatch):
+    """Вызовы, не дождавшиеся слота bulkhead, — очередь у нас, а не сбой провайдера"""
+    import asyncio
+    from app.core.config import get_settings
+
+    settings = get_settings()
+    monkeypatch.setattr(settings, "JUDGE_DEADLINE_SECONDS", 0.1)
+    monkeypatch.setattr(settings, "JUDGE_CONCURRENCY_LIMITS", {"ollama": 1})
+
+    orchestrator = EvaluationOrchestrator()
+    ollama = dict(orchestrator.judges)["ollama"]
+
+    async def healthy_judge(code, doc, temperature=0.1):
+        return await ollama._retry_evaluate(lambda: asyncio.sleep(0.04, result=8.0))
+
+    mock_llm_judges["ollama"].side_effect = healthy_judge
+
+    # Всплеск: 6 запросов через один слот — последние не дожидаются очереди
+    responses = await asyncio.gather(*(
+        orchestrator.evaluate(EvaluateRequest(code_snippet=f"def foo{i}(): pass", generated_doc="Documentation"))
+        for i in range(6)
+    ))
+
+    assert sum(response.timed_out_judges == ["ollama"] for response in responses) >= 3
+    # Провайдер отвечал за 40 мс — таймауты из-за нашей очереди, а не его сбои
+    assert ollama.breaker.state == "closed"
+    assert ollama.breaker.snapshot()["consecutive_failures"] == 0
+    assert ollama.bulkhead.snapshot()["overloads"] == 0
+
+
+@pytest.mark.asyncio
+async def test_adaptive_rounds_stop_when_judges_agree(mock_local_metrics, mock_llm_judges, monkeypatch):
+    from app.core.config import get_settings
+
+    settings = get_settings()
+    monkeypatch.setattr(settings, "SELF_CONSISTENCY_MODE", "adaptive")
+    monkeypatch.setattr(settings, "SELF_CONSISTENCY_ROUNDS", 3)
+    monkeypatch.setattr(settings, "SELF_CONSISTENCY_VARIANCE_THRESHOLD", 1.0)
+
+    # 8.5 / 9.0 / 8.0 / 7.5 — дисперсия ~0.42, ниже порога
+    orchestrator = EvaluationOrchestrator()
+    response = await orchestrator.evaluate(
+        EvaluateRequest(code_snippet="def foo(): pass", generated_doc="Documentation for foo")
+    )
+
+    assert response.self_consistency_rounds == 1
+    for judge in mock_llm_judges.values():
+        judge.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_adaptive_rounds_continue_while_judges_disagree(mock_local_metrics, mock_llm_judges, monkeypatch):
+    from app.core.config import get_settings
+
+    settings = get_settings()
+    monkeypatch.setattr(settings, "SELF_CONSISTENCY_MODE", "adaptive")
+    monkeypatch.setattr(settings, "SELF_CONSISTENCY_ROUNDS", 3)
+    monkeypatch.setattr(settings, "SELF_CONSISTENCY_VARIANCE_THRESHOLD", 1.0)
+    mock_llm_judges["gigachat"].return_value = 2.0
+
+    orchestrator = EvaluationOrchestrator()
+    response = await orchestrator.evaluate(
+        EvaluateRequest(code_snippet="def foo(): pass", generated_doc="Documentation for foo")
+    )
+
+    assert response.self_consistency_rounds == 3
+    temperatures = [call.kwargs["temperature"] for call in mock_llm_judges["gemini"].call_args_list]
+    assert temperatures == pytest.approx([0.1, 0.3, 0.5])
+
+
+@pytest.mark.asyncio
+async def test_multi_sample_requests_rounds_in_one_call(mock_local_metrics, mock_llm_judges, monkeypatch):
+    """Раунды одной волны — один вызов судьи с n выборками; Ollama остаётся по вызову на раунд"""
+    from unittest.mock import AsyncMock
+    from app.core.config import get_settings
+    from app.services.llm_judges import GeminiJudge, GigaChatJudge, QwenJudge
+
+    settings = get_settings()
+    monkeypatch.setattr(settings, "SELF_CONSISTENCY_ROUNDS", 5)
+    monkeypatch.setattr(settings, "SELF_CONSISTENCY_MULTI_SAMPLE", True)
+
+    async def samples(code, doc, temperature, n):
+        return [8.0] * n
+
+    sample_mocks = {}
+    for judge_cls in (GigaChatJudge, GeminiJudge, QwenJudge):
+        sample_mocks[judge_cls.NAME] = AsyncMock(side_effect=samples)
+        monkeypatch.setattr(judge_cls, "evaluate_samples", sample_mocks[judge_cls.NAME])
+
+    orchestrator = EvaluationOrchestrator()
+    response = await orchestrator.evaluate(
+        EvaluateRequest(code_snippet="def foo(): pass", generated_doc="Documentation for foo")
+    )
+
+    assert response.self_consistency_rounds == 5
+    # GigaChat и Qwen — до 4 выборок за вызов, Gemini — до 8
+    assert sorted(call.kwargs["n"] for call in sample_mocks["gigachat"].call_args_list) == [1, 4]
+    assert [call.kwargs["n"] for call in sample_mocks["gemini"].call_args_list] == [5]
+    assert sample_mocks["gemini"].call_args.kwargs["temperature"] == pytest.approx(0.5)
+    assert mock_llm_judges["ollama"].call_count == 5
+    for name in ("gigachat", "gemini", "qwen"):
+        mock_llm_judges[name].assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_quorum_returns_without_slowest_judge(mock_local_metrics, mock_llm_judges, monkeypatch):
+    """3 согласных судьи из 4 — ответ без ожидания отстающего, его вызов отменяется"""
+    import asyncio
+    from app.core.config import get_settings
+
+    settings = get_settings()
+    monkeypatch.setattr(settings, "JUDGE_QUORUM", 3)
+    monkeypatch.setattr(settings, "JUDGE_QUORUM_MAX_SPREAD", 1.0)
+    cancelled = asyncio.Event()
+
+    async def slow_judge(code, doc, temperature=0.1):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    mock_llm_judges["qwen"].side_effect = slow_judge
+
+    orchestrator = EvaluationOrchestrator()
+    response = await asyncio.wait_for(
+        orchestrator.evaluate(EvaluateRequest(code_snippet="def foo(): pass", generated_doc="Documentation")),
+        timeout=2,
+    )
+
+    assert response.contributing_judges == ["gemini", "gigachat", "ollama"]
+    assert response.timed_out_judges == []
+    assert response.llm_scores.qwen is None
+    assert cancelled.is_set()
+    # Отмена по кворуму — не сбой провайдера
+    assert dict(orchestrator.judges)["qwen"].breaker.snapshot()["consecutive_failures"] == 0
+
+
+@pytest.mark.asyncio
+async def test_quorum_waits_when_judges_disagree(mock_local_metrics, mock_llm_judges, monkeypatch):
+    import asyncio
+    from app.core.config import get_settings
+
+    settings = get_settings()
+    monkeypatch.setattr(settings, "JUDGE_QUORUM", 3)
+    monkeypatch.setattr(settings, "JUDGE_QUORUM_MAX_SPREAD", 0.5)
+
+    async def late_judge(code, doc, temperature=0.1):
+        await asyncio.sleep(0.05)
+        return 7.5
+
+    mock_llm_judges["qwen"].side_effect = late_judge
+
+    orchestrator = EvaluationOrchestrator()
+    response = await orchestrator.evaluate(EvaluateRequest(code_snippet="def foo(): pass", generated_doc="Documentation"))
+
+    # 8.5 / 9.0 / 8.0 расходятся на 1.0 > 0.5 — кворума нет, ждём qwen
+    assert response.contributing_judges == ["gemini", "gigachat", "ollama", "qwen"]
+    assert response.llm_scores.qwen == 7.5
+
+
+def test_process_executor_does_not_load_model_in_parent(mock_llm_judges, monkeypatch):
+    """В режиме process модель загружают воркеры пула — родитель не держит лишнюю копию"""
+    from unittest.mock import MagicMock
+    from app.core.config import get_settings
+    from app.services.local_metrics import LocalMetricsService
+
+    monkeypatch.setattr(get_settings(), "LOCAL_METRICS_EXECUTOR", "process")
+    get_instance = MagicMock()
+    monkeypatch.setattr(LocalMetricsService, "get_instance", get_instance)
+
+    orchestrator = EvaluationOrchestrator()
+    orchestrator.local_pool.shutdown()
+
+    assert orchestrator.local is None
+    assert orchestrator.local_pool.mode == "process"
+    get_instance.assert_not_called()
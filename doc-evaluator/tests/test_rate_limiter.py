@@ -0,0 +1,79 @@
+import asyncio
+import time
+import pytest
+from email.utils import formatdate
+from app.services.rate_limiter import TokenBucket, exhausted_quota_delay, parse_delay, retry_after_from_headers
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("30", 30.0),
+    ("1.5", 1.5),
+    ("6m0s", 360.0),
+    ("1m30s", 90.0),
+    ("250ms", 0.25),
+    ("-3", 0.0),
+    ("", None),
+    (None, None),
+    ("soon", None),
+])
+def test_parse_delay_formats(value, expected):
+    assert parse_delay(value) == expected
+
+
+def test_parse_delay_absolute_times():
+    assert 25 <= parse_delay(formatdate(time.time() + 30, usegmt=True)) <= 30
+    assert 25 <= parse_delay(str(int(time.time()) + 30)) <= 30
+
+
+def test_retry_after_prefers_header_then_quota_reset():
+    assert retry_after_from_headers({"Retry-After": "12", "x-ratelimit-reset-requests": "1m"}) == 12.0
+    assert retry_after_from_headers({"x-ratelimit-reset-requests": "1m"}) == 60.0
+    assert retry_after_from_headers({}) is None
+    assert retry_after_from_headers(None) is None
+
+
+def test_exhausted_quota_delay_only_when_nothing_remains():
+    assert exhausted_quota_delay({"x-ratelimit-remaining-requests": "0", "x-ratelimit-reset-requests": "2s"}) == 2.0
+    assert exhausted_quota_delay({"x-ratelimit-remaining-requests": "5", "x-ratelimit-reset-requests": "2s"}) is None
+    assert exhausted_quota_delay({}) is None
+
+
+@pytest.mark.asyncio
+async def test_bucket_allows_burst_then_paces_calls():
+    bucket = TokenBucket("gemini", rate_per_minute=600, burst=2)  # 10 вызовов в секунду
+
+    started = time.monotonic()
+    for _ in range(4):
+        await bucket.acquire()
+    elapsed = time.monotonic() - started
+
+    # Два вызова из burst сразу, ещё два — по 0.1 с
+    assert 0.15 <= elapsed < 0.5
+    assert bucket.snapshot()["waited_calls"] == 2
+
+
+@pytest.mark.asyncio
+async def test_unlimited_bucket_still_honours_pause():
+    bucket = TokenBucket("ollama", rate_per_minute=None)
+    await bucket.acquire()
+
+    bucket.pause(0.1)
+    bucket.pause(0.01)  # более короткая пауза не сокращает текущую
+    started = time.monotonic()
+    await bucket.acquire()
+
+    assert time.monotonic() - started >= 0.09
+    assert bucket.snapshot()["pauses"] == 1
+
+
+@pytest.mark.asyncio
+async def test_waiters_are_served_in_order():
+    bucket = TokenBucket("qwen", rate_per_minute=1200, burst=1)
+    order = []
+
+    async def call(name):
+        await bucket.acquire()
+        order.append(name)
+
+    await asyncio.gather(*(call(i) for i in range(4)))
+    assert order == [0, 1, 2, 3]
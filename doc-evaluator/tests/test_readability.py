@@ -0,0 +1,70 @@
+import pytest
+from app.services.readability import count_syllables, flesch_reading_ease, readability_score
+
+
+def test_russian_syllables_are_vowel_count():
+    assert count_syllables("документация") == (6, True)
+    assert count_syllables("в") == (1, True)  # предлог без гласных — один слог
+
+
+def test_english_syllables_handle_silent_e():
+    assert count_syllables("code") == (1, False)
+    assert count_syllables("table") == (2, False)
+    assert count_syllables("returns") == (2, False)
+
+
+def test_english_text_uses_flesch_coefficients():
+    # 6 слов, 2 предложения, 6 слогов: 206.835 - 1.015 * 3 - 84.6 * 1
+    score = flesch_reading_ease("The cat sat. The dog ran!")
+    assert score == pytest.approx(206.835 - 1.015 * 3 - 84.6)
+
+
+def test_russian_text_uses_oborneva_coefficients():
+    # 4 слова, 1 предложение, слоги 2+4+1+4=11: 206.835 - 1.52 * 4 - 65.14 * 2.75
+    score = flesch_reading_ease("Метод возвращает в результате.")
+    assert score == pytest.approx(206.835 - 1.52 * 4 - 65.14 * 2.75)
+
+
+def test_latin_identifiers_do_not_switch_russian_formula():
+    score = flesch_reading_ease("Метод getUser возвращает пользователя по идентификатору.")
+    ru_words_only = flesch_reading_ease("Метод возвращает пользователя по идентификатору.")
+    assert score is not None and ru_words_only is not None
+    assert score > ru_words_only  # короткий латинский идентификатор, но формула та же
+
+
+def test_ellipsis_and_trailing_sentence():
+    # '...' — один конец предложения, хвост без точки — ещё одно предложение
+    assert flesch_reading_ease("Go on... Stop now") == flesch_reading_ease("Go on. Stop now.")
+
+
+def test_text_without_words_returns_none():
+    assert flesch_reading_ease("123 ... !!!") is None
+
+
+RUSSIAN_DOC = (
+    "Функция вычисляет итоговую стоимость заказа с учётом скидок и налогов. "
+    "Параметр items содержит список позиций заказа, параметр discount задаёт процент скидки. "
+    "Возвращает сумму в рублях, округлённую до копеек. "
+    "Выбрасывает IllegalArgumentException, если скидка отрицательна или превышает сто процентов."
+)
+
+
+def test_typical_russian_doc_lands_mid_range():
+    # Формула Оборневой для обычной технической документации близка к нулю
+    assert flesch_reading_ease(RUSSIAN_DOC) < 30
+    assert 3.0 <= readability_score(RUSSIAN_DOC) <= 7.0
+
+
+def test_russian_readability_still_ranks_texts():
+    simple = "Сортирует массив. Возвращает новый список. Исходный массив не меняется."
+    convoluted = (
+        "Инициализирует подключение к базе данных, используя параметры конфигурации приложения, "
+        "и выполняет миграцию схемы при первом запуске, если соответствующая опция включена."
+    )
+    assert readability_score(simple) > readability_score(RUSSIAN_DOC) > readability_score(convoluted) > 0
+
+
+def test_english_readability_keeps_classic_scale():
+    text = "The cat sat. The dog ran!"
+    assert readability_score(text) == pytest.approx(min(100.0, flesch_reading_ease(text)) / 10)
+    assert readability_score("123") is None
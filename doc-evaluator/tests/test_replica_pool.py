@@ -0,0 +1,99 @@
+import aiohttp
+import pytest
+from aiohttp import web
+from app.services.replica_pool import Replica, ReplicaPool
+
+
+def make_pool(*urls: str) -> ReplicaPool:
+    return ReplicaPool(list(urls), health_path="/api/version", health_interval=15.0)
+
+
+def test_pick_prefers_fewest_in_flight_then_least_recent():
+    pool = make_pool("http://a", "http://b", "http://c")
+    a, b, c = pool.replicas
+
+    assert [pool.pick().url for _ in range(3)] == ["http://a", "http://b", "http://c"]
+
+    a.in_flight, b.in_flight, c.in_flight = 2, 0, 1
+    assert pool.pick() is b
+    assert pool.pick(exclude=(b,)) is c
+
+
+def test_pick_skips_unhealthy_unless_nothing_else_is_left():
+    pool = make_pool("http://a", "http://b")
+    a, b = pool.replicas
+    a.healthy = False
+
+    assert {pool.pick().url for _ in range(3)} == {"http://b"}
+    b.healthy = False
+    assert pool.pick() is not None  # все нездоровы — всё равно пробуем
+    assert pool.pick(exclude=(a, b)) is None
+
+
+def test_track_counts_in_flight_and_marks_connection_errors():
+    replica = Replica("http://a")
+    with replica.track():
+        assert replica.in_flight == 1
+    assert replica.in_flight == 0
+    assert replica.p95(1) is not None
+
+    with pytest.raises(ConnectionRefusedError):
+        with replica.track():
+            raise ConnectionRefusedError()
+    assert not replica.healthy
+    assert replica.snapshot()["failures"] == 1
+
+
+def test_p95_needs_enough_samples():
+    replica = Replica("http://a")
+    replica._latencies.extend([0.1] * 19 + [5.0])
+
+    assert replica.p95(min_samples=50) is None
+    assert replica.p95(min_samples=20) == 0.1
+
+
+@pytest.mark.asyncio
+async def test_cancelled_request_counts_as_lower_bound_latency():
+    """Проигравший hedge запрос не должен выпадать из p95 — иначе порог hedging только сжимается"""
+    import asyncio
+
+    replica = Replica("http://a")
+
+    async def slow_request():
+        with replica.track():
+            await asyncio.sleep(10)
+
+    task = asyncio.create_task(slow_request())
+    await asyncio.sleep(0.05)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    assert replica.healthy
+    assert replica.in_flight == 0
+    assert replica.p95(1) >= 0.05
+
+
+@pytest.mark.asyncio
+async def test_health_check_marks_replicas():
+    async def version(request: web.Request) -> web.Response:
+        return web.json_response({"version": "0.5.0"})
+
+    app = web.Application()
+    app.router.add_get("/api/version", version)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    alive = f"http://127.0.0.1:{runner.addresses[0][1]}"
+
+    pool = make_pool(alive, "http://127.0.0.1:9")  # порт discard — соединение отклоняется
+    pool.replicas[0].healthy = False
+    try:
+        async with aiohttp.ClientSession() as session:
+            await pool.check_health(session)
+    finally:
+        await runner.cleanup()
+
+    assert pool.replicas[0].healthy
+    assert not pool.replicas[1].healthy
@@ -0,0 +1,121 @@
+import pytest
+from unittest.mock import AsyncMock
+from app.services import verdict_cache
+from app.services.llm_judges import OllamaJudge
+from app.services.verdict_cache import VerdictCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = VerdictCache(str(tmp_path / "verdicts.db"), ttl_seconds=3600, max_entries=2)
+    yield cache
+    cache.close()
+
+
+def _key(**overrides):
+    parts = {"judge": "ollama", "model": "qwen2.5:7b", "temperature": 0.1,
+             "prompt_version": "v1", "code": "fun a() = 1", "doc": "Returns one"}
+    parts.update(overrides)
+    return VerdictCache.key(**parts)
+
+
+def test_put_and_get(cache):
+    cache.put(_key(), 7.5)
+    assert cache.get(_key()) == 7.5
+    assert cache.get(_key(code="fun b() = 2")) is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_key_depends_on_model_temperature_and_prompt():
+    base = _key()
+    assert base != _key(model="llama3")
+    assert base != _key(temperature=0.3)
+    assert base != _key(prompt_version="v2")
+    assert base != _key(judge="gemini")
+    assert base != _key(sample=0) != _key(sample=1)
+
+
+def test_expired_entries_are_misses(cache, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(verdict_cache.time, "time", lambda: now[0])
+    cache.put(_key(), 7.5)
+
+    now[0] += 3601
+    assert cache.get(_key()) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_least_recently_accessed_evicted(cache, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(verdict_cache.time, "time", lambda: now[0])
+    cache.put(_key(code="a"), 1.0)
+    now[0] += 1
+    cache.put(_key(code="b"), 2.0)
+    now[0] += 1
+    assert cache.get(_key(code="a")) == 1.0  # 'a' теперь свежее 'b'
+    now[0] += 1
+    cache.put(_key(code="c"), 3.0)
+
+    assert cache.stats()["entries"] == 2
+    assert cache.get(_key(code="b")) is None
+    assert cache.get(_key(code="a")) == 1.0
+
+
+def test_survives_reopen(tmp_path):
+    path = str(tmp_path / "verdicts.db")
+    first = VerdictCache(path, ttl_seconds=3600, max_entries=10)
+    first.put(_key(), 6.0)
+    first.close()
+
+    second = VerdictCache(path, ttl_seconds=3600, max_entries=10)
+    assert second.get(_key()) == 6.0
+    assert second.stats()["entries"] == 1
+    second.close()
+
+
+@pytest.mark.asyncio
+async def test_guarded_evaluate_uses_cache(cache, monkeypatch):
+    judge = OllamaJudge()
+    judge._verdict_cache = cache
+    evaluate = AsyncMock(side_effect=[8.0, None])
+    monkeypatch.setattr(judge, "evaluate", evaluate)
+
+    assert await judge.guarded_evaluate("fun a() = 1", "Returns one") == 8.0
+    assert await judge.guarded_evaluate("fun a() = 1", "Returns one") == 8.0
+    evaluate.assert_called_once()
+
+    # None (сбой провайдера) не кэшируется
+    assert await judge.guarded_evaluate("fun b() = 2", "Returns two") is None
+    assert cache.stats()["entries"] == 1
+
+
+def test_hits_do_not_write_until_flush(cache, monkeypatch):
+    monkeypatch.setattr(cache, "ACCESS_FLUSH_EVERY", 2)
+    cache.put(_key(code="a"), 1.0)
+    cache.put(_key(code="b"), 2.0)
+    changes = cache._db.total_changes
+
+    assert cache.get(_key(code="a")) == 1.0
+    assert cache._db.total_changes == changes  # попадание ничего не пишет
+    assert cache.get(_key(code="b")) == 2.0
+    assert cache._db.total_changes == changes + 2  # пачка из ACCESS_FLUSH_EVERY попаданий
+
+
+def test_uses_wal(cache):
+    assert cache._db.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+
+@pytest.mark.asyncio
+async def test_guarded_evaluate_reads_cache_off_event_loop(cache, monkeypatch):
+    import threading
+
+    threads = []
+    get = cache.get
+    monkeypatch.setattr(cache, "get", lambda key: threads.append(threading.current_thread()) or get(key))
+    cache.put(_key(), 7.0)
+    judge = OllamaJudge()
+    judge._verdict_cache = cache
+    monkeypatch.setattr(judge, "evaluate", AsyncMock(return_value=8.0))
+
+    await judge.guarded_evaluate("fun a() = 1", "Returns one")
+    assert threads and threading.current_thread() not in threads
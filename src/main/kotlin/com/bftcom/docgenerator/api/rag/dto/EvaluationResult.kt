@@ -14,4 +14,12 @@ data class EvaluationResult(
     @JsonProperty("final_score") val finalScore: Double,
     @JsonProperty("score_variance") val scoreVariance: Double,
     @JsonProperty("confidence_score") val confidenceScore: Double,
+    // Судьи, не уложившиеся в дедлайн (их оценки не учтены)
+    @JsonProperty("timed_out_judges") val timedOutJudges: List<String> = emptyList(),
+    // Судьи, пропущенные из-за открытого circuit breaker (провайдер недавно падал)
+    @JsonProperty("skipped_judges") val skippedJudges: List<String> = emptyList(),
+    // Сколько раундов self-consistency было запущено (в adaptive-режиме зависит от согласия судей)
+    @JsonProperty("self_consistency_rounds") val selfConsistencyRounds: Int = 1,
+    // Судьи, чьи оценки вошли в итог (при кворуме отстающие отменяются)
+    @JsonProperty("contributing_judges") val contributingJudges: List<String> = emptyList(),
 )